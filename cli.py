@@ -0,0 +1,281 @@
+# cli.py
+"""
+Conversión por línea de comandos entre CSV, KML, KMZ, Shapefile y
+proyectos .gwdb.
+
+No importa PySide6 ni crea la ventana: sólo se cargan el importador y el
+exportador de los formatos usados, al momento de convertir, así que el
+arranque no paga el costo de Qt. Una carpeta de entrada se procesa en
+paralelo con un pool de procesos. De un .gwdb a CSV u otro .gwdb los
+features pasan de a uno, sin reunir el proyecto en memoria.
+
+Con --zona auto la zona y el hemisferio de cada geometría se detectan a
+partir de sus coordenadas (fuentes KML, KMZ, Shapefile con .prj o .gwdb).
+KML, KMZ y Shapefile conservan la zona de cada geometría; CSV y .gwdb, de
+una sola zona, se escriben en la que tiene más vértices.
+
+Ejemplos:
+    python cli.py puntos.csv -o puntos.kml --zona 18 --hemisferio Sur
+    python cli.py entradas/ -o salidas/ --formato shp --zona 18 --workers 4
+    python cli.py trazado.kml -o trazado.shp --zona auto
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from importlib import import_module
+from itertools import chain
+
+# Igual que core.crs.AUTO_ZONE (sin importar numpy/pyproj al arrancar)
+ZONA_AUTO = "auto"
+
+# Extensión -> formato
+EXTENSIONES = {".csv": "csv", ".txt": "csv", ".kml": "kml", ".kmz": "kmz", ".shp": "shp", ".gwdb": "gwdb"}
+
+IMPORTADORES = {
+    "csv": ("importers.csv_importer", "CSVImporter"),
+    "kml": ("importers.kml_importer", "KMLImporter"),
+    "kmz": ("importers.kmz_importer", "KMZImporter"),
+    "shp": ("importers.shapefile_importer", "ShapefileImporter"),
+    "gwdb": ("importers.store_importer", "StoreImporter"),
+}
+
+EXPORTADORES = {
+    "csv": ("exporters.csv_exporter", "CSVExporter"),
+    "kml": ("exporters.kml_exporter", "KMLExporter"),
+    "kmz": ("exporters.kmz_exporter", "KMZExporter"),
+    "shp": ("exporters.shapefile_exporter", "ShapefileExporter"),
+    "gwdb": ("exporters.store_exporter", "StoreExporter"),
+}
+
+
+def _clase(tabla: dict, formato: str):
+    modulo, nombre = tabla[formato]
+    return getattr(import_module(modulo), nombre)
+
+
+def _formato_de(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXTENSIONES:
+        raise ValueError(f"Extensión '{ext}' no soportada. Use .csv, .txt, .kml, .kmz, .shp o .gwdb.")
+    return EXTENSIONES[ext]
+
+
+def import_features(path: str, hemisphere: str, zone: int) -> list[dict]:
+    """Features en UTM de la zona indicada leídos de un archivo de cualquier formato soportado."""
+    formato = _formato_de(path)
+    importador = _clase(IMPORTADORES, formato)
+    if formato == "csv":
+        if zone == ZONA_AUTO:
+            raise ValueError("Un CSV no indica su CRS: la zona no se puede detectar, indique --zona.")
+        # mismo formato que exporta e importa la GUI: id,x,y con cabecera
+        return importador.import_file(path, x_col_idx=1, y_col_idx=2, id_col_idx=0, skip_header=1)
+    return importador.import_file(path, hemisphere, zone)
+
+
+def convert_file(src: str, dst: str, hemisphere: str, zone: int,
+                 tolerance: float = None, geodesic: bool = False) -> tuple[list[str], int]:
+    """
+    Convierte un archivo; los formatos se deducen de las extensiones.
+
+    Args:
+        tolerance: (Opcional) Si se indica, fusiona puntos a menos de esa
+                   distancia en metros, como la importación CSV de la GUI.
+        geodesic: Métricas exportadas sobre el elipsoide en lugar de en UTM.
+
+    Returns:
+        (rutas de los archivos escritos, número de features exportados); un
+        Shapefile escribe un archivo por tipo de geometría (y zona).
+    """
+    formato = _formato_de(dst)
+    if _formato_de(src) == "gwdb" and formato in ("csv", "gwdb") and tolerance is None:
+        return [dst], _convertir_por_partes(src, dst, formato, hemisphere, zone)
+
+    features = import_features(src, hemisphere, zone)
+    if not features:
+        raise ValueError(f"No se encontraron geometrías en '{src}'.")
+
+    epsg_base = None
+    if zone == ZONA_AUTO:
+        from core.crs import dominant_epsg, reproject_features, utm_zone
+        # la zona con más vértices queda como zona del archivo
+        epsg_base = dominant_epsg(features)
+        hemisphere, zone = utm_zone(epsg_base)
+        if formato in ("csv", "gwdb"):
+            features = reproject_features(features, epsg_base)
+
+    if tolerance is not None:
+        from core.crs import group_by_epsg
+        from core.dedup import PointDeduplicator
+        vigentes = set()
+        # las distancias sólo se comparan dentro de una misma zona
+        for puntos in group_by_epsg((f for f in features if f["type"] == "Punto"), epsg_base).values():
+            conservados, _ = PointDeduplicator.deduplicate(puntos, tolerance)
+            vigentes.update(id(f) for f in conservados)
+        features = [f for f in features if f["type"] != "Punto" or id(f) in vigentes]
+
+    exportador = _clase(EXPORTADORES, formato)
+    salidas = [dst]
+    if formato == "csv":
+        exportador.export(features, dst)
+    elif formato == "gwdb":
+        exportador.export(features, dst, hemisphere, str(zone))
+    else:
+        from core.crs import utm_epsg
+        from core.metrics import MetricsEngine
+        epsg = utm_epsg(hemisphere, zone) if geodesic else None
+        metrics = MetricsEngine().compute(features, epsg)
+        escritos = exportador.export(features, dst, hemisphere, str(zone), metrics=metrics)
+        if formato == "shp":
+            salidas = escritos
+    return salidas, len(features)
+
+
+def _convertir_por_partes(src: str, dst: str, formato: str, hemisphere: str, zone: int) -> int:
+    """Copia los features de un .gwdb al exportador de a uno; devuelve cuántos fueron."""
+    features = _clase(IMPORTADORES, "gwdb").iter_file(src, hemisphere, zone)
+    primero = next(features, None)
+    if primero is None:
+        raise ValueError(f"No se encontraron geometrías en '{src}'.")
+    n = 0
+
+    def contados():
+        nonlocal n
+        for feat in chain([primero], features):
+            n += 1
+            yield feat
+
+    exportador = _clase(EXPORTADORES, formato)
+    if formato == "csv":
+        exportador.export(contados(), dst)
+    else:
+        if zone == ZONA_AUTO:
+            # un .gwdb es de una sola zona: la de su primer feature
+            from core.crs import utm_zone
+            hemisphere, zone = utm_zone(primero["epsg"])
+        exportador.export(contados(), dst, hemisphere, str(zone))
+    return n
+
+
+def _tareas(args) -> list[tuple[str, str]]:
+    """Pares (entrada, salida) a convertir según los argumentos."""
+    if not os.path.isdir(args.entrada):
+        if args.salida:
+            salida = args.salida
+            if os.path.isdir(salida):
+                if not args.formato:
+                    raise ValueError("Indique --formato si la salida es una carpeta.")
+                base = os.path.splitext(os.path.basename(args.entrada))[0]
+                salida = os.path.join(salida, base + "." + args.formato)
+        elif args.formato:
+            salida = os.path.splitext(args.entrada)[0] + "." + args.formato
+        else:
+            raise ValueError("Indique el archivo de salida (-o) o el formato (--formato).")
+        return [(args.entrada, salida)]
+
+    if not args.formato:
+        raise ValueError("Indique --formato para convertir una carpeta.")
+    destino = args.salida or args.entrada
+    os.makedirs(destino, exist_ok=True)
+    entradas = [
+        nombre for nombre in sorted(os.listdir(args.entrada))
+        if os.path.splitext(nombre)[1].lower() in EXTENSIONES
+        and os.path.isfile(os.path.join(args.entrada, nombre))
+    ]
+    # c.csv y c.kml irían ambos a c.<formato>: se distinguen por su extensión (c_csv, c_kml)
+    repetidos = Counter(os.path.splitext(nombre)[0].lower() for nombre in entradas)
+    tareas, salidas = [], {}
+    for nombre in entradas:
+        base, ext = os.path.splitext(nombre)
+        if repetidos[base.lower()] > 1:
+            base += "_" + ext[1:].lower()
+        ruta = os.path.join(args.entrada, nombre)
+        salida = os.path.join(destino, base + "." + args.formato)
+        if os.path.abspath(salida) == os.path.abspath(ruta):
+            continue
+        clave = os.path.normcase(os.path.abspath(salida))
+        if clave in salidas:
+            raise ValueError(f"'{salidas[clave]}' y '{nombre}' se convertirían al mismo archivo '{salida}'.")
+        salidas[clave] = nombre
+        tareas.append((ruta, salida))
+    return tareas
+
+
+def _convertir(tarea, hemisphere, zone, tolerance, geodesic):
+    src, dst = tarea
+    try:
+        return src, convert_file(src, dst, hemisphere, zone, tolerance, geodesic), None
+    except Exception as e:
+        return src, None, e
+
+
+def _reportar(resultados) -> int:
+    """Imprime el resultado de cada conversión; código de salida 1 si alguna falló."""
+    errores = 0
+    for src, resultado, error in resultados:
+        if error is not None:
+            errores += 1
+            print(f"Error en '{src}': {error}", file=sys.stderr)
+        else:
+            salidas, n = resultado
+            print(f"{src} -> {', '.join(salidas)} ({n} geometrías)")
+    return 1 if errores else 0
+
+
+def _zona(texto: str):
+    """Zona UTM 1-60 o 'auto'."""
+    if texto.strip().lower() == ZONA_AUTO:
+        return ZONA_AUTO
+    try:
+        zona = int(texto)
+    except ValueError:
+        zona = 0
+    if not 1 <= zona <= 60:
+        raise argparse.ArgumentTypeError(f"zona inválida: '{texto}' (use 1-60 o {ZONA_AUTO})")
+    return zona
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="geowizard-cli",
+        description="Convierte archivos de coordenadas entre CSV, KML, KMZ, Shapefile y .gwdb sin abrir la interfaz.",
+    )
+    parser.add_argument("entrada", help="Archivo o carpeta de entrada.")
+    parser.add_argument("-o", "--salida", help="Archivo o carpeta de salida.")
+    parser.add_argument("-f", "--formato", choices=sorted(EXPORTADORES),
+                        help="Formato de salida (obligatorio para carpetas; por defecto, el de la extensión de -o).")
+    parser.add_argument("-z", "--zona", type=_zona, required=True, metavar="1-60|auto",
+                        help="Zona UTM de las coordenadas, o 'auto' para detectarla por geometría.")
+    parser.add_argument("--hemisferio", choices=["Norte", "Sur"], default="Norte",
+                        help="Hemisferio UTM (por defecto, Norte).")
+    parser.add_argument("--tolerancia", type=float, default=None,
+                        help="Fusiona puntos duplicados a menos de esta distancia en metros.")
+    parser.add_argument("--geodesico", action="store_true",
+                        help="Exporta longitudes y áreas geodésicas (WGS84) en lugar de planas.")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos en paralelo al convertir una carpeta.")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        tareas = _tareas(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if not tareas:
+        print("No hay archivos para convertir.", file=sys.stderr)
+        return 1
+
+    parametros = (args.hemisferio, args.zona, args.tolerancia, args.geodesico)
+    if len(tareas) == 1 or args.workers <= 1:
+        return _reportar(_convertir(t, *parametros) for t in tareas)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(tareas))) as pool:
+        return _reportar(pool.map(_convertir, tareas, *([p] * len(tareas) for p in parametros)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
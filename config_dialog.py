@@ -21,6 +21,14 @@ class ConfigDialog(QDialog):
         self.scale_spin.setValue(values.get("draw_scale", 0.35))
         self.point_size_spin.setValue(values.get("point_size", 6))
         self.font_size_spin.setValue(values.get("font_size", 8))
+        self.cache_tiles_checkbox.setChecked(values.get("cache_tiles", False))
+        self.cache_mb_spin.setValue(values.get("cache_tiles_mb", 64))
+        self.map_cache_spin.setValue(values.get("map_cache_mb", 256))
+        self.map_offline_checkbox.setChecked(values.get("map_offline", False))
+        self.geodesic_checkbox.setChecked(values.get("geodesic", False))
+        self.dedup_checkbox.setChecked(values.get("import_dedup", False))
+        self.dedup_tolerance_spin.setValue(values.get("import_tolerance", 0.01))
+        self.undo_budget_spin.setValue(values.get("undo_budget_mb", 64))
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -40,6 +48,29 @@ class ConfigDialog(QDialog):
         self.default_dir_edit = QLineEdit()
         self.default_dir_edit.setPlaceholderText("Ruta por defecto")
         form.addRow("Carpeta por defecto:", self.default_dir_edit)
+
+        self.geodesic_checkbox = QCheckBox()
+        self.geodesic_checkbox.setToolTip("Medir longitudes y áreas sobre el elipsoide WGS84 en lugar del plano UTM")
+        form.addRow("Medición geodésica:", self.geodesic_checkbox)
+
+        self.dedup_checkbox = QCheckBox()
+        self.dedup_checkbox.setToolTip("Fusionar puntos repetidos o muy cercanos al importar CSV")
+        form.addRow("Fusionar duplicados:", self.dedup_checkbox)
+
+        self.dedup_tolerance_spin = QDoubleSpinBox()
+        self.dedup_tolerance_spin.setRange(0.0, 100.0)
+        self.dedup_tolerance_spin.setDecimals(3)
+        self.dedup_tolerance_spin.setSingleStep(0.01)
+        self.dedup_tolerance_spin.setSuffix(" m")
+        self.dedup_tolerance_spin.setToolTip("0 fusiona sólo coordenadas idénticas")
+        form.addRow("Tolerancia de duplicados:", self.dedup_tolerance_spin)
+
+        self.undo_budget_spin = QSpinBox()
+        self.undo_budget_spin.setRange(1, 4096)
+        self.undo_budget_spin.setSuffix(" MB")
+        self.undo_budget_spin.setValue(64)
+        self.undo_budget_spin.setToolTip("Al superarla se descartan los pasos de deshacer más antiguos")
+        form.addRow("Memoria de deshacer:", self.undo_budget_spin)
         tabs.addTab(general, "General")
 
         sim = QWidget()
@@ -59,7 +90,30 @@ class ConfigDialog(QDialog):
         self.font_size_spin.setRange(1, 24)
         self.font_size_spin.setValue(8)
         sim_form.addRow("Tamaño de letra:", self.font_size_spin)
+
+        self.cache_tiles_checkbox = QCheckBox()
+        self.cache_tiles_checkbox.setToolTip("Pinta el lienzo en teselas reutilizables al desplazar y hacer zoom")
+        sim_form.addRow("Caché de teselas:", self.cache_tiles_checkbox)
+
+        self.cache_mb_spin = QSpinBox()
+        self.cache_mb_spin.setRange(8, 2048)
+        self.cache_mb_spin.setSuffix(" MB")
+        self.cache_mb_spin.setValue(64)
+        sim_form.addRow("Memoria de caché:", self.cache_mb_spin)
         tabs.addTab(sim, "Simulación")
+
+        mapa = QWidget()
+        mapa_form = QFormLayout(mapa)
+        self.map_cache_spin = QSpinBox()
+        self.map_cache_spin.setRange(16, 8192)
+        self.map_cache_spin.setSuffix(" MB")
+        self.map_cache_spin.setValue(256)
+        mapa_form.addRow("Caché en disco:", self.map_cache_spin)
+
+        self.map_offline_checkbox = QCheckBox()
+        self.map_offline_checkbox.setToolTip("Usar sólo las teselas ya guardadas, sin acceder a la red")
+        mapa_form.addRow("Sin conexión:", self.map_offline_checkbox)
+        tabs.addTab(mapa, "Mapa base")
 
         # Botones Aceptar / Cancelar
         buttons = QDialogButtonBox(
@@ -82,4 +136,12 @@ class ConfigDialog(QDialog):
             "draw_scale":  self.scale_spin.value(),
             "point_size":  self.point_size_spin.value(),
             "font_size":   self.font_size_spin.value(),
+            "cache_tiles": self.cache_tiles_checkbox.isChecked(),
+            "cache_tiles_mb": self.cache_mb_spin.value(),
+            "map_cache_mb": self.map_cache_spin.value(),
+            "map_offline": self.map_offline_checkbox.isChecked(),
+            "geodesic":    self.geodesic_checkbox.isChecked(),
+            "import_dedup": self.dedup_checkbox.isChecked(),
+            "import_tolerance": self.dedup_tolerance_spin.value(),
+            "undo_budget_mb": self.undo_budget_spin.value(),
         }
@@ -0,0 +1,154 @@
+# core/binary_codec.py
+"""
+Codificación binaria de features para enviarlos al mapa web.
+
+Formato (little-endian), pensado para leerse en JavaScript directamente
+como vistas TypedArray sobre el mismo ArrayBuffer, sin parsear texto:
+
+    cabecera (32 bytes)
+        magic      4s   b"GWB1"
+        version    u8
+        coord_size u8   8 = Float64, 4 = Float32
+        reservado  u16
+        n_features u32
+        n_vertices u32
+        origen_x   f64  se resta a todas las X (precisión en Float32)
+        origen_y   f64  se resta a todas las Y
+    ids      Int32[n_features]
+    tipos    Uint8[n_features]       0 = punto, 1 = línea, 2 = polígono
+    (relleno hasta múltiplo de 4)
+    offsets  Uint32[n_features + 1]  índice del primer vértice de cada feature
+    (relleno hasta múltiplo de 8)
+    coords   Float64|Float32[2 * n_vertices]  x0, y0, x1, y1, ...
+"""
+import base64
+import struct
+import sys
+from array import array
+
+MAGIC = b"GWB1"
+VERSION = 1
+_CABECERA = struct.Struct("<4sBBHIIdd")
+
+TIPO_PUNTO = 0
+TIPO_LINEA = 1
+TIPO_POLIGONO = 2
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _relleno(n: int, alineacion: int) -> bytes:
+    return b"\0" * (-n % alineacion)
+
+
+def pack_features(features: list[tuple[int, int, list[tuple[float, float]]]], coord_size: int = 4) -> bytes:
+    """
+    Empaqueta features en el formato binario.
+
+    Args:
+        features: Lista de tuplas (id, tipo, coords) con tipo TIPO_PUNTO,
+                  TIPO_LINEA o TIPO_POLIGONO y coords [(x, y), ...].
+        coord_size: 8 para Float64, 4 para Float32 (relativo al origen).
+
+    Returns:
+        Bytes listos para enviarse (ver pack_features_b64 para QWebChannel).
+    """
+    if coord_size not in (4, 8):
+        raise ValueError("coord_size debe ser 4 (Float32) u 8 (Float64).")
+
+    ids = array("i")
+    tipos = array("B")
+    offsets = array("I", [0])
+    xs, ys = [], []
+    for fid, tipo, coords in features:
+        ids.append(int(fid))
+        tipos.append(tipo)
+        for x, y in coords:
+            xs.append(x)
+            ys.append(y)
+        offsets.append(len(xs))
+
+    n_vertices = len(xs)
+    if n_vertices and coord_size == 4:
+        origen_x = (min(xs) + max(xs)) / 2
+        origen_y = (min(ys) + max(ys)) / 2
+    else:
+        origen_x = origen_y = 0.0
+
+    coords = array("f" if coord_size == 4 else "d", bytes(coord_size * 2 * n_vertices))
+    coords[0::2] = array(coords.typecode, (x - origen_x for x in xs))
+    coords[1::2] = array(coords.typecode, (y - origen_y for y in ys))
+
+    partes = [_CABECERA.pack(MAGIC, VERSION, coord_size, 0, len(ids), n_vertices, origen_x, origen_y)]
+    tam = _CABECERA.size
+    for datos, alineacion in ((_le(ids), 1), (_le(tipos), 4), (_le(offsets), 8), (_le(coords), 1)):
+        partes.append(datos)
+        tam += len(datos)
+        if alineacion > 1:
+            partes.append(_relleno(tam, alineacion))
+            tam += -tam % alineacion
+    return b"".join(partes)
+
+
+def pack_features_b64(features, coord_size: int = 4) -> str:
+    """pack_features codificado en base64 (QWebChannel sólo transporta texto)."""
+    return base64.b64encode(pack_features(features, coord_size)).decode("ascii")
+
+
+def unpack_features(data: bytes) -> list[tuple[int, int, list[tuple[float, float]]]]:
+    """Operación inversa de pack_features (usada para verificación y pruebas)."""
+    magic, version, coord_size, _, n_feat, n_vert, ox, oy = _CABECERA.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Datos binarios con formato desconocido.")
+
+    pos = _CABECERA.size
+    ids = array("i"); ids.frombytes(data[pos:pos + 4 * n_feat]); pos += 4 * n_feat
+    tipos = array("B"); tipos.frombytes(data[pos:pos + n_feat]); pos += n_feat
+    pos += -pos % 4
+    offsets = array("I"); offsets.frombytes(data[pos:pos + 4 * (n_feat + 1)]); pos += 4 * (n_feat + 1)
+    pos += -pos % 8
+    coords = array("f" if coord_size == 4 else "d")
+    coords.frombytes(data[pos:pos + coord_size * 2 * n_vert])
+    if sys.byteorder == "big":
+        for arr in (ids, offsets, coords):
+            arr.byteswap()
+
+    salida = []
+    for i in range(n_feat):
+        a, b = offsets[i], offsets[i + 1]
+        pts = [(coords[2 * k] + ox, coords[2 * k + 1] + oy) for k in range(a, b)]
+        salida.append((ids[i], tipos[i], pts))
+    return salida
+
+
+_CABECERA_CLUSTERS = struct.Struct("<4sI")
+MAGIC_CLUSTERS = b"GWC1"
+
+
+def pack_clusters_b64(clusters: list[tuple[int, int, float, float]]) -> str:
+    """
+    Empaqueta grupos de puntos (ver core/clustering.py) en base64:
+
+        cabecera  magic b"GWC1", n u32
+        cantidad  Int32[n]
+        ids       Int32[n]   id representativo de cada grupo
+        coords    Float64[2 * n]  lon0, lat0, lon1, lat1, ...
+    """
+    cantidades = array("i", (c[0] for c in clusters))
+    ids = array("i", (int(c[1]) for c in clusters))
+    coords = array("d")
+    for c in clusters:
+        coords.append(c[2])
+        coords.append(c[3])
+    datos = b"".join((
+        _CABECERA_CLUSTERS.pack(MAGIC_CLUSTERS, len(clusters)),
+        _le(cantidades),
+        _le(ids),
+        _le(coords),
+    ))
+    return base64.b64encode(datos).decode("ascii")
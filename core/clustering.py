@@ -0,0 +1,101 @@
+# core/clustering.py
+"""
+Agrupamiento (clustering) de puntos por rejilla en píxeles Web Mercator.
+
+Para un nivel de zoom de Leaflet, cada punto se proyecta a píxeles del mundo
+(256 * 2^zoom) y se agrupa con los demás que caen en la misma celda de
+`cell_px` píxeles. Así el mapa recibe como mucho una marca por celda visible,
+sin importar cuántos puntos tenga el proyecto.
+"""
+import math
+
+TILE_SIZE = 256
+# Latitud máxima representable en Web Mercator
+MAX_LAT = 85.0511287798
+
+
+def mercator_unit(lon: float, lat: float) -> tuple[float, float]:
+    """Proyecta (lon, lat) a coordenadas Web Mercator normalizadas en [0, 1]."""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = (lon + 180.0) / 360.0
+    s = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return x, y
+
+
+class PointClusterer:
+    """
+    Agrupa un conjunto fijo de puntos para distintas vistas del mapa.
+
+    Las coordenadas Mercator normalizadas se calculan una vez al fijar los
+    puntos; cada consulta sólo escala, filtra por la vista y agrupa.
+    """
+
+    def __init__(self, cell_px: int = 60):
+        self.cell_px = cell_px
+        self._ids = []
+        self._lonlat = []
+        self._merc = []
+
+    def set_points(self, points: list[tuple[int, float, float]]):
+        """
+        Args:
+            points: Lista de tuplas (id, lon, lat).
+        """
+        self._ids = [p[0] for p in points]
+        self._lonlat = [(p[1], p[2]) for p in points]
+        self._merc = [mercator_unit(p[1], p[2]) for p in points]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def bounds(self):
+        """(sur, oeste, norte, este) de todos los puntos, o None si no hay."""
+        if not self._lonlat:
+            return None
+        lons = [c[0] for c in self._lonlat]
+        lats = [c[1] for c in self._lonlat]
+        return min(lats), min(lons), max(lats), max(lons)
+
+    def clusters(self, zoom: int, south: float, west: float, north: float, east: float,
+                 margin: float = 0.25) -> list[tuple[int, int, float, float]]:
+        """
+        Agrupa los puntos visibles para la vista indicada.
+
+        Args:
+            zoom: Nivel de zoom de Leaflet.
+            south, west, north, east: Límites visibles del mapa (grados).
+            margin: Fracción de la vista que se añade alrededor para que el
+                    desplazamiento corto no deje huecos.
+
+        Returns:
+            Lista de tuplas (cantidad, id_representativo, lon, lat); lon/lat es
+            el promedio de los puntos del grupo.
+        """
+        if not self._ids:
+            return []
+
+        escala = TILE_SIZE * (2 ** zoom)
+        celda = self.cell_px / escala  # tamaño de celda en unidades normalizadas
+
+        x0, y1 = mercator_unit(west, south)
+        x1, y0 = mercator_unit(east, north)
+        mx, my = (x1 - x0) * margin, (y1 - y0) * margin
+        x0, x1, y0, y1 = x0 - mx, x1 + mx, y0 - my, y1 + my
+
+        grupos = {}
+        ids, lonlat = self._ids, self._lonlat
+        for i, (x, y) in enumerate(self._merc):
+            if x < x0 or x > x1 or y < y0 or y > y1:
+                continue
+            clave = (int(x // celda), int(y // celda))
+            g = grupos.get(clave)
+            lon, lat = lonlat[i]
+            if g is None:
+                grupos[clave] = [1, ids[i], lon, lat]
+            else:
+                g[0] += 1
+                g[2] += lon
+                g[3] += lat
+
+        return [(n, fid, slon / n, slat / n) for n, fid, slon, slat in grupos.values()]
@@ -1,4 +1,7 @@
 # core/coordinate_manager.py
+import math
+
+from core.spatial_index import SpatialIndex, feature_bbox, geometry_distance
 
 class GeometryType:
     PUNTO = "Punto"
@@ -12,6 +15,11 @@ class CoordinateManager:
         self.zone       = zone
         # lista de features: cada uno es dict con { id, type, coords }
         self.features   = []
+        # índice espacial por ID, mantenido junto con la lista
+        self._por_id    = {}
+        self._orden     = {}
+        self._siguiente = 0
+        self._index     = SpatialIndex()
 
     def add_feature(self, fid: int, geom_type: str, coords: list[tuple[float,float]]):
         """
@@ -23,12 +31,30 @@ class CoordinateManager:
             coords: Lista de tuplas de coordenadas [(x1,y1), (x2,y2), ...].
 
         Raises:
-            ValueError: Si el tipo de geometría no es válido, o si la estructura
-                        de coordenadas no coincide con el tipo de geometría,
-                        o si los valores de coordenadas no son numéricos.
+            ValueError: Si ya hay un feature con ese ID, si el tipo de geometría
+                        no es válido, o si la estructura de coordenadas no
+                        coincide con el tipo de geometría, o si los valores de
+                        coordenadas no son numéricos.
             TypeError: Si 'coords' no es una lista, o si algún elemento de 'coords'
                        no es una tupla/lista.
         """
+        if fid in self._por_id:
+            raise ValueError(f"Ya existe un feature con ID {fid}.")
+        self._validate(geom_type, coords)
+        feat = {
+            "id":   fid,
+            "type": geom_type,
+            "coords": coords
+        }
+        self.features.append(feat)
+        self._por_id[fid] = feat
+        self._orden[fid] = self._siguiente
+        self._siguiente += 1
+        self._index.insert(fid, feature_bbox(coords))
+
+    @staticmethod
+    def _validate(geom_type: str, coords):
+        """Valida tipo y coordenadas de un feature (ver add_feature)."""
         # Validación del tipo de geometría
         if geom_type not in GeometryType.VALID_TYPES:
             raise ValueError(
@@ -73,15 +99,82 @@ class CoordinateManager:
                     f"Geometría '{GeometryType.POLIGONO}' debe tener al menos 3 coordenadas base (sin cierre explícito aquí). Se encontraron: {len(coords)}"
                 )
 
-        # Si todas las validaciones pasan
-        self.features.append({
-            "id":   fid,
-            "type": geom_type,
-            "coords": coords
-        })
+    def update_feature(self, fid: int, coords: list[tuple[float,float]]):
+        """
+        Reemplaza las coordenadas de un feature existente.
+
+        Raises:
+            KeyError: Si no existe un feature con ese ID.
+            ValueError, TypeError: Como en add_feature.
+        """
+        feat = self._por_id[fid]
+        self._validate(feat["type"], coords)
+        feat["coords"] = coords
+        self._index.insert(fid, feature_bbox(coords))
+
+    def remove_feature(self, fid: int):
+        """Quita el feature con ese ID (KeyError si no existe)."""
+        feat = self._por_id.pop(fid)
+        del self._orden[fid]
+        self.features.remove(feat)
+        self._index.remove(fid)
+
+    def get_feature(self, fid: int):
+        return self._por_id.get(fid)
 
     def clear(self):
         self.features.clear()
+        self._por_id.clear()
+        self._orden.clear()
+        self._index.clear()
 
     def get_features(self):
         return self.features
+
+    def _distancia(self, fid: int, x: float, y: float) -> float:
+        feat = self._por_id[fid]
+        return geometry_distance(feat["coords"], x, y, closed=feat["type"] == GeometryType.POLIGONO)
+
+    def query_bbox(self, minx: float, miny: float, maxx: float, maxy: float, geom_type: str = None) -> list[dict]:
+        """
+        Features cuya caja envolvente intersecta el rectángulo, en el orden
+        en que se añadieron.
+
+        Args:
+            geom_type: Si se indica, sólo features de ese tipo.
+        """
+        encontrados = [
+            self._por_id[fid] for fid in self._index.query(minx, miny, maxx, maxy)
+            if geom_type is None or self._por_id[fid]["type"] == geom_type
+        ]
+        orden = self._orden
+        encontrados.sort(key=lambda f: orden[f["id"]])
+        return encontrados
+
+    def nearest(self, x: float, y: float, max_distance: float = math.inf, geom_type: str = None):
+        """
+        Feature más cercano a (x, y) según la distancia exacta a su geometría
+        (0 dentro de un polígono).
+
+        Returns:
+            Tupla (feature, distancia), o (None, inf) si no hay ninguno dentro
+            de max_distance.
+        """
+        aceptar = None
+        if geom_type is not None:
+            aceptar = lambda fid: self._por_id[fid]["type"] == geom_type
+        fid, d = self._index.nearest(
+            x, y, lambda k: self._distancia(k, x, y), max_distance, aceptar
+        )
+        return (self._por_id[fid], d) if fid is not None else (None, math.inf)
+
+    def hit_test(self, x: float, y: float, tolerance: float) -> list[dict]:
+        """Features a no más de `tolerance` de (x, y), del más cercano al más lejano."""
+        candidatos = self._index.query(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        encontrados = []
+        for fid in candidatos:
+            d = self._distancia(fid, x, y)
+            if d <= tolerance:
+                encontrados.append((d, fid))
+        encontrados.sort(key=lambda e: e[0])
+        return [self._por_id[fid] for _, fid in encontrados]
@@ -0,0 +1,232 @@
+# core/crs.py
+from functools import lru_cache
+
+import numpy as np
+
+WGS84_EPSG = 4326
+# Valor de zona que pide detectarla a partir de las coordenadas WGS84
+AUTO_ZONE = "auto"
+
+
+def utm_epsg(hemisphere: str, zone) -> int:
+    """
+    Código EPSG de la zona UTM WGS84 (326xx norte, 327xx sur).
+
+    Raises:
+        ValueError: Si la zona no está entre 1 y 60 o el hemisferio no es Norte/Sur.
+    """
+    zone_int = int(zone)
+    if not (1 <= zone_int <= 60):
+        raise ValueError(f"Zona UTM '{zone}' inválida. Debe estar entre 1 y 60.")
+    hemi = hemisphere.lower()
+    if hemi.startswith("n"):
+        return 32600 + zone_int
+    if hemi.startswith("s"):
+        return 32700 + zone_int
+    raise ValueError(f"Hemisferio '{hemisphere}' no reconocido. Debe ser 'Norte' o 'Sur'.")
+
+
+def is_utm_epsg(epsg: int) -> bool:
+    """True si el EPSG es una zona UTM WGS84 (326xx o 327xx)."""
+    return 32601 <= epsg <= 32660 or 32701 <= epsg <= 32760
+
+
+def utm_zone(epsg: int) -> tuple[str, int]:
+    """(hemisferio, zona) de un EPSG UTM WGS84; inverso de utm_epsg."""
+    if 32601 <= epsg <= 32660:
+        return "Norte", epsg - 32600
+    if 32701 <= epsg <= 32760:
+        return "Sur", epsg - 32700
+    raise ValueError(f"EPSG:{epsg} no es una zona UTM WGS84.")
+
+
+def detect_utm_epsg(lons, lats) -> np.ndarray:
+    """
+    EPSG UTM de cada posición (lon, lat) WGS84, calculado de una vez para
+    todo el arreglo. Respeta las excepciones de la grilla UTM: la zona 32V
+    ensanchada sobre Noruega y las zonas 31X-37X de Svalbard.
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    lons = (lons + 180.0) % 360.0 - 180.0
+    zonas = np.clip(np.floor((lons + 180.0) / 6.0).astype(int) + 1, 1, 60)
+    noruega = (lats >= 56.0) & (lats < 64.0) & (lons >= 3.0) & (lons < 12.0)
+    zonas = np.where(noruega, 32, zonas)
+    svalbard = (lats >= 72.0) & (lats < 84.0) & (lons >= 0.0) & (lons < 42.0)
+    zonas = np.where(svalbard, np.select(
+        [lons < 9.0, lons < 21.0, lons < 33.0], [31, 33, 35], 37), zonas)
+    return np.where(lats >= 0.0, 32600, 32700) + zonas
+
+
+@lru_cache(maxsize=None)
+def get_transformer(epsg_from: int, epsg_to: int = WGS84_EPSG):
+    """
+    Transformer (always_xy) reutilizado entre llamadas para cada par de EPSG.
+    pyproj se importa en la primera llamada para no cargarlo al arrancar.
+    """
+    from pyproj import Transformer
+    return Transformer.from_crs(f"EPSG:{epsg_from}", f"EPSG:{epsg_to}", always_xy=True)
+
+
+def to_wgs84(coords: list[tuple[float, float]], epsg_from: int) -> list[tuple[float, float]]:
+    """Reproyecta una lista de coordenadas a (lon, lat) en una sola llamada."""
+    if not coords:
+        return []
+    xs = [c[0] for c in coords]
+    ys = [c[1] for c in coords]
+    lons, lats = get_transformer(epsg_from).transform(xs, ys)
+    return list(zip(lons, lats))
+
+
+def project_parts(parts: list, epsg_from: int = WGS84_EPSG, epsg_to: int = None) -> list[tuple[int, list]]:
+    """
+    Reproyecta varias listas de coordenadas (una por feature) a UTM con un
+    solo transform por zona de destino.
+
+    Args:
+        parts: Listas no vacías de coordenadas en `epsg_from`.
+        epsg_to: EPSG UTM de destino; si es None, la zona de cada lista se
+                 detecta por su centroide en WGS84.
+
+    Returns:
+        [(epsg, coordenadas), ...] en el orden de `parts`.
+    """
+    if not parts:
+        return []
+    largos = np.fromiter((len(p) for p in parts), dtype=np.int64, count=len(parts))
+    planas = np.asarray([c for p in parts for c in p], dtype=float).reshape(-1, 2)
+    xs, ys = planas[:, 0], planas[:, 1]
+
+    if epsg_to is None:
+        if epsg_from == WGS84_EPSG:
+            lons, lats = xs, ys
+        else:
+            lons, lats = (np.asarray(v) for v in get_transformer(epsg_from).transform(xs, ys))
+        inicios = np.concatenate(([0], np.cumsum(largos)[:-1]))
+        # longitudes medias relativas al primer vértice de cada lista, con
+        # las diferencias llevadas a ±180: un feature que cruza el
+        # antimeridiano no cae en la zona opuesta del globo
+        primeras = np.repeat(lons[inicios], largos)
+        deltas = (lons - primeras + 180.0) % 360.0 - 180.0
+        epsgs = detect_utm_epsg(lons[inicios] + np.add.reduceat(deltas, inicios) / largos,
+                                np.add.reduceat(lats, inicios) / largos)
+    else:
+        epsgs = np.full(len(parts), epsg_to)
+
+    por_vertice = np.repeat(epsgs, largos)
+    sx, sy = xs.copy(), ys.copy()
+    for epsg in np.unique(epsgs):
+        if epsg == epsg_from:
+            continue
+        mascara = por_vertice == epsg
+        tx, ty = get_transformer(epsg_from, int(epsg)).transform(xs[mascara], ys[mascara])
+        sx[mascara], sy[mascara] = tx, ty
+
+    salida, inicio = [], 0
+    for epsg, largo in zip(epsgs.tolist(), largos.tolist()):
+        fin = inicio + largo
+        salida.append((epsg, list(zip(sx[inicio:fin].tolist(), sy[inicio:fin].tolist()))))
+        inicio = fin
+    return salida
+
+
+def feature_epsg(feat: dict, default_epsg: int) -> int:
+    """EPSG del feature: el propio si lo trae (proyectos multizona) o el del proyecto."""
+    return feat.get("epsg", default_epsg)
+
+
+def group_by_epsg(features, default_epsg: int) -> dict[int, list[dict]]:
+    """Features agrupados por EPSG, en orden de primera aparición."""
+    grupos = {}
+    for feat in features:
+        grupos.setdefault(feature_epsg(feat, default_epsg), []).append(feat)
+    return grupos
+
+
+def dominant_epsg(features, default_epsg: int = None) -> int:
+    """EPSG con más vértices entre los features (el del proyecto si no hay otro)."""
+    conteo = {}
+    for feat in features:
+        epsg = feature_epsg(feat, default_epsg)
+        conteo[epsg] = conteo.get(epsg, 0) + len(feat.get("coords") or ())
+    return max(conteo, key=conteo.get) if conteo else default_epsg
+
+
+def features_to_wgs84(features: list[dict], default_epsg: int) -> list[list[tuple[float, float]]]:
+    """Coordenadas (lon, lat) de cada feature, con un solo transform por zona."""
+    salida = [[] for _ in features]
+    grupos = {}
+    for i, feat in enumerate(features):
+        if feat.get("coords"):
+            grupos.setdefault(feature_epsg(feat, default_epsg), []).append(i)
+    for epsg, indices in grupos.items():
+        for i, (_, lonlat) in zip(indices, project_parts(
+                [features[i]["coords"] for i in indices], epsg, WGS84_EPSG)):
+            salida[i] = lonlat
+    return salida
+
+
+def reproject_features(features: list[dict], epsg_to: int, default_epsg: int = None) -> list[dict]:
+    """
+    Features con todas las coordenadas en `epsg_to` (para formatos y vistas
+    de una sola zona). Los que ya estaban en esa zona se devuelven tal cual;
+    el resto, como copias sin la clave "epsg".
+    """
+    salida = list(features)
+    grupos = {}
+    for i, feat in enumerate(salida):
+        epsg = feature_epsg(feat, default_epsg)
+        if epsg is None:
+            epsg = epsg_to
+        if feat.get("coords") and (epsg != epsg_to or "epsg" in feat):
+            grupos.setdefault(epsg, []).append(i)
+    for epsg, indices in grupos.items():
+        partes = [salida[i]["coords"] for i in indices]
+        proyectadas = project_parts(partes, epsg, epsg_to) if epsg != epsg_to else [(epsg, c) for c in partes]
+        for i, (_, coords) in zip(indices, proyectadas):
+            feat = {k: v for k, v in salida[i].items() if k != "epsg"}
+            feat["coords"] = coords
+            salida[i] = feat
+    return salida
+
+
+class WGS84Cache:
+    """
+    Reproyecciones a WGS84 por ID de feature.
+
+    Cada entrada guarda la firma (EPSG, tipo y coordenadas) con la que se
+    calculó; se reutiliza mientras el feature y la zona no cambien. La
+    comparten el mapa web y las métricas geodésicas. Un feature con su
+    propio "epsg" se reproyecta desde esa zona y no desde la indicada.
+    """
+
+    def __init__(self):
+        self._entradas = {}
+
+    @staticmethod
+    def _firma(feat: dict, epsg: int):
+        return (feature_epsg(feat, epsg), feat["type"], tuple(tuple(c) for c in feat["coords"]))
+
+    def is_current(self, feat: dict, epsg: int) -> bool:
+        entrada = self._entradas.get(feat["id"])
+        return entrada is not None and entrada[0] == self._firma(feat, epsg)
+
+    def get(self, feat: dict, epsg: int) -> list[tuple[float, float]]:
+        """Coordenadas (lon, lat) del feature, reproyectadas sólo si cambiaron."""
+        firma = self._firma(feat, epsg)
+        entrada = self._entradas.get(feat["id"])
+        if entrada is not None and entrada[0] == firma:
+            return entrada[1]
+        lonlat = to_wgs84(feat["coords"], firma[0])
+        self._entradas[feat["id"]] = (firma, lonlat)
+        return lonlat
+
+    def prune(self, fids_vigentes):
+        """Descarta las entradas de features que ya no existen."""
+        vigentes = set(fids_vigentes)
+        for fid in list(self._entradas):
+            if fid not in vigentes:
+                del self._entradas[fid]
+
+    def clear(self):
+        self._entradas.clear()
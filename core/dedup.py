@@ -0,0 +1,158 @@
+# core/dedup.py
+"""
+Detección de puntos duplicados o casi duplicados al importar.
+
+Primero se colapsan los duplicados exactos ordenando las coordenadas. Luego
+los puntos restantes se reparten en una rejilla hash de celda igual a la
+tolerancia: dos puntos a menos de la tolerancia sólo pueden estar en la
+misma celda o en celdas vecinas, así que los pares candidatos se generan
+con NumPy por celdas vecinas (costo casi lineal mientras la densidad sea
+razonable).
+
+La fusión es voraz en el orden del archivo: el primer punto de cada grupo
+es el representante y los posteriores a menos de la tolerancia de él se
+fusionan en él, de modo que ningún punto se mueve más que la tolerancia.
+"""
+import numpy as np
+
+# Vecinos "hacia adelante" de cada celda; con (0, 0) cubren los 9 vecinos sin repetir pares
+_VECINOS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def _pares_cercanos(xy: np.ndarray, tolerance: float):
+    """Pares (i, j), i != j, de filas de xy a distancia <= tolerance."""
+    celdas = np.floor(xy / tolerance).astype(np.int64)
+    celdas -= celdas.min(axis=0) - 1
+    ancho = int(celdas[:, 1].max()) + 2
+    if (int(celdas[:, 0].max()) + 2) * ancho >= 2 ** 62:
+        raise ValueError("Tolerancia demasiado pequeña para la extensión de los datos.")
+    claves = celdas[:, 0] * ancho + celdas[:, 1]
+
+    orden = np.argsort(claves, kind="stable")
+    claves_ord = claves[orden]
+    unicas, inicios, cuentas = np.unique(claves_ord, return_index=True, return_counts=True)
+    celda_de = np.repeat(np.arange(len(unicas)), cuentas)
+
+    origen, destino = [], []
+    for dx, dy in _VECINOS:
+        vecina = unicas + dx * ancho + dy
+        pos = np.searchsorted(unicas, vecina)
+        pos = np.minimum(pos, len(unicas) - 1)
+        existe = unicas[pos] == vecina
+        # para cada punto (en orden de clave): inicio y tamaño de la celda vecina
+        ini_v = np.where(existe, inicios[pos], 0)[celda_de]
+        cnt_v = np.where(existe, cuentas[pos], 0)[celda_de]
+        total = int(cnt_v.sum())
+        if total == 0:
+            continue
+        src = np.repeat(np.arange(len(claves_ord)), cnt_v)
+        desplaz = np.arange(total) - np.repeat(np.cumsum(cnt_v) - cnt_v, cnt_v)
+        dst = np.repeat(ini_v, cnt_v) + desplaz
+        if (dx, dy) == (0, 0):
+            mitad = src < dst
+            src, dst = src[mitad], dst[mitad]
+        a, b = orden[src], orden[dst]
+        d2 = ((xy[a] - xy[b]) ** 2).sum(axis=1)
+        cerca = d2 <= tolerance * tolerance
+        origen.append(a[cerca])
+        destino.append(b[cerca])
+
+    if not origen:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio
+    return np.concatenate(origen), np.concatenate(destino)
+
+
+def snap_points(xy, tolerance: float) -> np.ndarray:
+    """
+    Representante de cada punto tras fusionar duplicados.
+
+    Args:
+        xy: Arreglo (n, 2) de coordenadas.
+        tolerance: Distancia máxima de fusión, en unidades de xy; 0 sólo
+                   fusiona duplicados exactos.
+
+    Returns:
+        Arreglo rep de n índices: rep[i] == i si el punto se conserva; si
+        no, rep[i] es el punto anterior en el que se fusiona.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    n = len(xy)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # duplicados exactos: el representante es la primera aparición
+    orden_xy = np.lexsort((xy[:, 1], xy[:, 0]))
+    ordenados = xy[orden_xy]
+    nuevo = np.ones(n, dtype=bool)
+    nuevo[1:] = (ordenados[1:] != ordenados[:-1]).any(axis=1)
+    unicos = ordenados[nuevo]
+    primera = np.minimum.reduceat(orden_xy, np.flatnonzero(nuevo))
+    inversa = np.empty(n, dtype=np.int64)
+    inversa[orden_xy] = np.cumsum(nuevo) - 1
+    rep = primera[inversa]
+    if tolerance <= 0 or len(unicos) < 2:
+        return rep
+
+    # casi duplicados entre los puntos únicos, en orden de primera aparición
+    orden = np.argsort(primera, kind="stable")
+    pts = unicos[orden]
+    a, b = _pares_cercanos(pts, tolerance)
+    lider = np.arange(len(pts))
+    if len(a):
+        i = np.minimum(a, b)
+        j = np.maximum(a, b)
+        por_i = np.argsort(i, kind="stable")
+        # sólo los pares cercanos pasan por el bucle; al llegar a los pares
+        # de p ya se sabe si p fue absorbido por un punto anterior
+        asignado = bytearray(len(pts))
+        for p, q in zip(i[por_i].tolist(), j[por_i].tolist()):
+            if not asignado[p] and not asignado[q]:
+                lider[q] = p
+                asignado[q] = 1
+
+    # índice único -> índice original del líder
+    original = primera[orden]
+    rep_unico = np.empty(len(pts), dtype=np.int64)
+    rep_unico[orden] = original[lider]
+    return rep_unico[inversa]
+
+
+class PointDeduplicator:
+    """Fusión de puntos duplicados de una lista de features tipo Punto."""
+
+    @staticmethod
+    def deduplicate(features: list[dict], tolerance: float) -> tuple[list[dict], list[dict]]:
+        """
+        Args:
+            features: Features con al menos una coordenada; se usa la primera.
+            tolerance: Distancia de fusión en metros (0 = sólo exactos).
+
+        Returns:
+            (features conservados en su orden original, fusiones), donde cada
+            fusión es {id, merged: [ids], max_distance} del representante.
+        """
+        if not features:
+            return [], []
+        xy = np.array([f["coords"][0] for f in features], dtype=np.float64)
+        rep = snap_points(xy, tolerance)
+
+        conservados = [f for i, f in enumerate(features) if rep[i] == i]
+        fusiones = {}
+        for i in np.flatnonzero(rep != np.arange(len(features))):
+            r = int(rep[i])
+            entrada = fusiones.setdefault(r, {"id": features[r]["id"], "merged": [], "max_distance": 0.0})
+            entrada["merged"].append(features[i]["id"])
+            d = float(np.hypot(*(xy[i] - xy[r])))
+            entrada["max_distance"] = max(entrada["max_distance"], d)
+        return conservados, [fusiones[r] for r in sorted(fusiones)]
+
+    @staticmethod
+    def summary(merges: list[dict], limit: int = 50) -> str:
+        lineas = [
+            f"{m['id']} <- {', '.join(str(x) for x in m['merged'])} (máx. {m['max_distance']:.3f} m)"
+            for m in merges[:limit]
+        ]
+        if len(merges) > limit:
+            lineas.append(f"... y {len(merges) - limit} grupos más.")
+        return "\n".join(lineas)
@@ -0,0 +1,368 @@
+# core/feature_store.py
+"""
+Proyecto GeoWizard en una base SQLite (.gwdb) para datos que no caben en
+memoria.
+
+Como en el formato .gwz, los vértices se guardan una sola vez (una fila por
+vértice de la tabla, con su etiqueta de ID) y cada feature es un rango
+[inicio, fin) sobre ellos, así los puntos, la línea y el polígono armados
+con las mismas filas no repiten coordenadas. Nada se carga entero: la
+tabla se lee por ventanas de filas, el lienzo pide los features de una caja
+a un índice R*Tree y la exportación los recorre con un cursor.
+
+    metadata        name, value (JSON)      zona, hemisferio, nombre, configuración
+    vertices        pos, label, x, y        pos = fila de la tabla (0, 1, 2, ...)
+    features        key, id, type, start,   key = clave propia del feature; id = su
+                    end                     ID, que puede repetirse como en CSV o KML;
+                                            type = TIPO_* de core.binary_codec
+    features_rtree  R*Tree (minx, maxx, miny, maxy) de cada feature, por key
+    features_span   R*Tree entero (start, end - 1) de los features de más de un
+                    vértice, por key: cuáles usan un vértice dado (los de uno
+                    solo se buscan por el índice de `start`, más barato de
+                    mantener)
+
+Las cajas del R*Tree se guardan en float32 redondeadas hacia afuera, así
+que una consulta por caja puede devolver algún feature vecino de más, nunca
+de menos. Al editar un vértice la caja de sus features sólo crece;
+reindex() las recalcula ajustadas.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from core.binary_codec import TIPO_PUNTO, TIPO_LINEA, TIPO_POLIGONO
+from core.coordinate_manager import GeometryType
+
+EXTENSION = ".gwdb"
+
+TIPOS = {
+    GeometryType.PUNTO: TIPO_PUNTO,
+    GeometryType.POLILINEA: TIPO_LINEA,
+    GeometryType.POLIGONO: TIPO_POLIGONO,
+}
+_NOMBRES = {v: k for k, v in TIPOS.items()}
+
+# Filas por executemany al escribir en bloque
+_LOTE = 10000
+
+
+class FeatureStore:
+    # StoreTableModel escribe las ediciones en la base
+    read_only = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        try:
+            self._crear()
+        except sqlite3.DatabaseError as e:
+            self._db.close()
+            raise ValueError(f"'{path}' no es un proyecto GeoWizard válido ({e}).")
+
+    def _crear(self):
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vertices (pos INTEGER PRIMARY KEY, label TEXT, x REAL, y REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                " key INTEGER PRIMARY KEY, id INTEGER NOT NULL, type INTEGER NOT NULL,"
+                " start INTEGER NOT NULL, end INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS features_inicio ON features (start)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS features_id ON features (id)")
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS features_rtree USING rtree(id, minx, maxx, miny, maxy)"
+            )
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS features_span USING rtree_i32(id, first, last)"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    # ─── Metadatos ───
+
+    @property
+    def metadata(self) -> dict:
+        return {
+            nombre: json.loads(valor)
+            for nombre, valor in self._db.execute("SELECT name, value FROM metadata")
+        }
+
+    def set_metadata(self, metadata: dict):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                ((k, json.dumps(v, ensure_ascii=False)) for k, v in metadata.items()),
+            )
+
+    # ─── Vértices (filas de la tabla) ───
+
+    def vertex_count(self) -> int:
+        fila = self._db.execute("SELECT max(pos) FROM vertices").fetchone()
+        return 0 if fila[0] is None else fila[0] + 1
+
+    def append_vertices(self, rows) -> tuple[int, int]:
+        """
+        Agrega filas (etiqueta, x, y) al final, por lotes y sin armar la
+        lista completa en memoria.
+
+        Returns:
+            (inicio, fin) de las filas agregadas.
+        """
+        inicio = self.vertex_count()
+        with self._db:
+            return inicio, self._insertar_vertices(rows, inicio)
+
+    def _insertar_vertices(self, rows, pos: int) -> int:
+        lote = []
+        for label, x, y in rows:
+            lote.append((pos, label, x, y))
+            pos += 1
+            if len(lote) >= _LOTE:
+                self._db.executemany("INSERT INTO vertices VALUES (?, ?, ?, ?)", lote)
+                lote.clear()
+        self._db.executemany("INSERT INTO vertices VALUES (?, ?, ?, ?)", lote)
+        return pos
+
+    def rows(self, start: int, count: int) -> list[tuple]:
+        """Filas (etiqueta, x, y) de [start, start + count): una ventana de la tabla."""
+        return self._db.execute(
+            "SELECT label, x, y FROM vertices WHERE pos >= ? AND pos < ? ORDER BY pos",
+            (start, start + count),
+        ).fetchall()
+
+    def set_vertex(self, pos: int, label: str = None, x: float = None, y: float = None):
+        """
+        Cambia la etiqueta y/o las coordenadas de una fila y agranda la caja
+        de los features que la usan.
+        """
+        with self._db:
+            if label is not None:
+                self._db.execute("UPDATE vertices SET label = ? WHERE pos = ?", (label, pos))
+            if x is None and y is None:
+                return
+            self._db.execute(
+                "UPDATE vertices SET x = coalesce(?, x), y = coalesce(?, y) WHERE pos = ?", (x, y, pos)
+            )
+            x, y = self._db.execute("SELECT x, y FROM vertices WHERE pos = ?", (pos,)).fetchone()
+            if x is None or y is None:
+                return
+            self._db.execute(
+                "UPDATE features_rtree SET"
+                " minx = min(minx, :x), maxx = max(maxx, :x), miny = min(miny, :y), maxy = max(maxy, :y)"
+                " WHERE id IN (SELECT key FROM features WHERE start = :pos AND end = :pos + 1"
+                "              UNION ALL SELECT id FROM features_span WHERE first <= :pos AND last >= :pos)",
+                {"x": x, "y": y, "pos": pos},
+            )
+
+    # ─── Features ───
+
+    def feature_count(self) -> int:
+        return self._db.execute("SELECT count(*) FROM features").fetchone()[0]
+
+    def add_ranges(self, ranges, ids, types):
+        """
+        Registra features como rangos [inicio, fin) sobre los vértices ya
+        guardados (ver append_vertices) y los indexa.
+        """
+        filas, spans = [], []
+        with self._db:
+            clave = self._proxima_clave()
+            for (inicio, fin), fid, tipo in zip(ranges, ids, types):
+                fid, inicio, fin = int(fid), int(inicio), int(fin)
+                filas.append(self._fila_feature(clave, fid, tipo, inicio, fin))
+                if fin - inicio > 1:
+                    spans.append((clave, inicio, fin - 1))
+                clave += 1
+                if len(filas) >= _LOTE:
+                    self._insertar_features(filas, spans)
+                    filas, spans = [], []
+            self._insertar_features(filas, spans)
+            # cajas de los features nuevos en una sola consulta sobre los vértices
+            self._db.execute(
+                "INSERT INTO features_rtree"
+                " SELECT f.key, min(v.x), max(v.x), min(v.y), max(v.y)"
+                " FROM features f JOIN vertices v ON v.pos >= f.start AND v.pos < f.end"
+                " WHERE NOT EXISTS (SELECT 1 FROM features_rtree r WHERE r.id = f.key)"
+                " GROUP BY f.key"
+            )
+
+    def _proxima_clave(self) -> int:
+        fila = self._db.execute("SELECT max(key) FROM features").fetchone()
+        return 1 if fila[0] is None else fila[0] + 1
+
+    @staticmethod
+    def _fila_feature(clave: int, fid: int, tipo: str, inicio: int, fin: int) -> tuple:
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de geometría no soportado: {tipo}")
+        if fin <= inicio:
+            raise ValueError(f"El feature {fid} no tiene vértices.")
+        return clave, fid, TIPOS[tipo], inicio, fin
+
+    def _insertar_features(self, filas, spans, cajas=()):
+        self._db.executemany("INSERT INTO features (key, id, type, start, end) VALUES (?, ?, ?, ?, ?)", filas)
+        self._db.executemany("INSERT INTO features_span VALUES (?, ?, ?)", spans)
+        self._db.executemany("INSERT INTO features_rtree VALUES (?, ?, ?, ?, ?)", cajas)
+
+    def add_features(self, features) -> int:
+        """
+        Guarda features {id, type, coords} de cualquier iterable (p. ej. un
+        importador), cada uno con sus propios vértices etiquetados con su ID.
+
+        Returns:
+            Número de features guardados.
+        """
+        n = 0
+        pos = self.vertex_count()
+        vertices, filas, spans, cajas = [], [], [], []
+        with self._db:
+            clave = self._proxima_clave()
+            for feat in features:
+                fid, coords = int(feat["id"]), feat["coords"]
+                etiqueta = str(feat["id"])
+                filas.append(self._fila_feature(clave + n, fid, feat["type"], pos, pos + len(coords)))
+                if len(coords) > 1:
+                    spans.append((clave + n, pos, pos + len(coords) - 1))
+                xs = [c[0] for c in coords]
+                ys = [c[1] for c in coords]
+                cajas.append((clave + n, min(xs), max(xs), min(ys), max(ys)))
+                for x, y in coords:
+                    vertices.append((pos, etiqueta, x, y))
+                    pos += 1
+                n += 1
+                if len(vertices) >= _LOTE or len(filas) >= _LOTE:
+                    self._db.executemany("INSERT INTO vertices VALUES (?, ?, ?, ?)", vertices)
+                    self._insertar_features(filas, spans, cajas)
+                    vertices, filas, spans, cajas = [], [], [], []
+            self._db.executemany("INSERT INTO vertices VALUES (?, ?, ?, ?)", vertices)
+            self._insertar_features(filas, spans, cajas)
+        return n
+
+    def reindex(self):
+        """Recalcula ajustadas las cajas de todos los features."""
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO features_rtree"
+                " SELECT f.key, min(v.x), max(v.x), min(v.y), max(v.y)"
+                " FROM features f JOIN vertices v ON v.pos >= f.start AND v.pos < f.end"
+                " GROUP BY f.key"
+            )
+
+    def bounds(self):
+        """(minx, miny, maxx, maxy) de todo el proyecto, o None si está vacío."""
+        caja = self._db.execute(
+            "SELECT min(minx), min(miny), max(maxx), max(maxy) FROM features_rtree"
+        ).fetchone()
+        return None if caja[0] is None else caja
+
+    def _coords(self, inicio: int, fin: int) -> list[tuple[float, float]]:
+        return self._db.execute(
+            "SELECT x, y FROM vertices WHERE pos >= ? AND pos < ? ORDER BY pos", (inicio, fin)
+        ).fetchall()
+
+    def feature(self, fid: int) -> dict:
+        """Primer feature guardado con el ID `fid`."""
+        fila = self._db.execute(
+            "SELECT type, start, end FROM features WHERE id = ? ORDER BY key LIMIT 1", (fid,)
+        ).fetchone()
+        if fila is None:
+            raise KeyError(fid)
+        tipo, inicio, fin = fila
+        return {"id": fid, "type": _NOMBRES[tipo], "coords": self._coords(inicio, fin)}
+
+    def features(self, bbox=None):
+        """
+        Genera los features {id, type, coords} en el orden en que se
+        guardaron, leyéndolos de a uno desde la base.
+
+        Args:
+            bbox: (Opcional) (minx, miny, maxx, maxy); sólo los features cuya
+                  caja la intersecta (consulta al R*Tree).
+        """
+        # cursor propio: el generador puede quedar a medias mientras se usan otras consultas
+        cursor = self._db.cursor()
+        if bbox is None:
+            cursor.execute(
+                "SELECT f.id, f.type, f.start, f.end, v.x, v.y"
+                " FROM features f JOIN vertices v ON v.pos = f.start ORDER BY f.key"
+            )
+        else:
+            minx, miny, maxx, maxy = bbox
+            cursor.execute(
+                "SELECT f.id, f.type, f.start, f.end, v.x, v.y"
+                " FROM features_rtree r JOIN features f ON f.key = r.id JOIN vertices v ON v.pos = f.start"
+                " WHERE r.maxx >= ? AND r.minx <= ? AND r.maxy >= ? AND r.miny <= ?"
+                " ORDER BY f.key",
+                (minx, maxx, miny, maxy),
+            )
+        try:
+            for fid, tipo, inicio, fin, x, y in cursor:
+                # el primer vértice viene en la misma fila: los puntos no hacen otra consulta
+                coords = [(x, y)] if fin - inicio == 1 else self._coords(inicio, fin)
+                yield {"id": fid, "type": _NOMBRES[tipo], "coords": coords}
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def _archivo_nuevo(path: str):
+    """
+    FeatureStore vacío en un archivo temporal que, si todo se escribe bien,
+    reemplaza a `path`; un fallo a mitad no deja el proyecto corrupto.
+    """
+    temporal = path + ".tmp"
+    _borrar_temporal(temporal)
+    try:
+        with FeatureStore(temporal) as store:
+            yield store
+    except BaseException:
+        # el store ya se cerró al salir del with; no quedan restos a medias
+        _borrar_temporal(temporal)
+        raise
+    # al cerrar la última conexión el WAL se vuelca al archivo principal
+    os.replace(temporal, path)
+
+
+def _borrar_temporal(temporal: str):
+    for ruta in (temporal, temporal + "-wal", temporal + "-shm"):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def write_store(path: str, coords, ranges, ids, types, labels=None, metadata: dict = None):
+    """
+    Guarda un proyecto .gwdb; mismos argumentos que
+    core.project_file.write_project.
+    """
+    if labels is None:
+        labels = (str(i + 1) for i in range(len(coords)))
+    with _archivo_nuevo(path) as store:
+        store.append_vertices((label, x, y) for label, (x, y) in zip(labels, coords))
+        store.add_ranges(ranges, ids, types)
+        store.set_metadata(metadata or {})
+
+
+def write_features(path: str, features, metadata: dict = None) -> int:
+    """
+    Guarda en un .gwdb nuevo los features {id, type, coords} de cualquier
+    iterable, sin reunirlos en memoria.
+
+    Returns:
+        Número de features guardados.
+    """
+    with _archivo_nuevo(path) as store:
+        n = store.add_features(features)
+        store.set_metadata(metadata or {})
+    return n
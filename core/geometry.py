@@ -1,6 +1,39 @@
 # core/geometry.py
-from PySide6.QtGui import QPainterPath
-from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPainterPath, QPen
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtWidgets import QGraphicsPathItem
+
+from core.lod import select_level
+
+PUNTO_TIPOS     = ("Punto", "Point")
+POLILINEA_TIPOS = ("Polilínea", "LineString")
+POLIGONO_TIPOS  = ("Polígono", "Polygon")
+
+
+class LODPathItem(QGraphicsPathItem):
+    """
+    QGraphicsPathItem con varios niveles de detalle precalculados.
+    CanvasView le indica el tamaño de píxel actual y el item cambia
+    su path por el nivel adecuado.
+    """
+
+    def __init__(self, levels: list[tuple[float, QPainterPath]], pen: QPen, parent=None):
+        super().__init__(levels[0][1], parent)
+        self.setPen(pen)
+        self._levels = levels
+        self._nivel = 0
+
+    def set_levels(self, levels: list[tuple[float, QPainterPath]], pixel_size: float = None):
+        self._levels = levels
+        self._nivel = -1
+        self.set_pixel_size(pixel_size if pixel_size is not None else 0.0)
+
+    def set_pixel_size(self, pixel_size: float):
+        nivel = select_level(self._levels, pixel_size)
+        if nivel != self._nivel:
+            self._nivel = nivel
+            self.setPath(self._levels[nivel][1])
+
 
 class GeometryBuilder:
     """
@@ -9,35 +42,28 @@ class GeometryBuilder:
     """
 
     @staticmethod
-    def paths_from_features(features: list[dict]):
+    def _path(pts: list[tuple[float, float]]) -> QPainterPath:
+        path = QPainterPath(QPointF(*pts[0]))
+        for x, y in pts[1:]:
+            path.lineTo(x, y)
+        return path
+
+    @staticmethod
+    def _pen(typ: str) -> QPen:
+        if typ in POLILINEA_TIPOS:
+            return QPen(Qt.blue, 2)
+        pen = QPen(Qt.green, 1)
+        pen.setStyle(Qt.SolidLine)
+        return pen
+
+    @staticmethod
+    def lod_paths_from_feature(feat: dict, lod_cache) -> list[tuple[float, QPainterPath]]:
         """
-        Devuelve lista de tuplas (path: QPainterPath, pen: QPen)
-        para cada feature.
+        Devuelve los niveles [(tolerancia, QPainterPath), ...] de un feature
+        lineal, tomando la pirámide de simplificación de lod_cache.
         """
-        result = []
-        from PySide6.QtGui import QPen
-        from PySide6.QtCore import Qt
-
-        for feat in features:
-            pts = feat["coords"]
-            typ = feat["type"]
-
-            # cerrar anillo solo en Polygon
-            if typ == "Polygon":
-                pts = pts + [pts[0]]
-            path = QPainterPath(QPointF(*pts[0]))
-            for x,y in pts[1:]:
-                path.lineTo(x,y)
-
-            # definir estilo
-            if typ == "Point":
-                # en GUI dibujaremos un pequeño círculo, no via path
-                continue
-            elif typ == "LineString":
-                pen = QPen(Qt.blue, 2)
-            else:  # Polygon
-                pen = QPen(Qt.green, 1)
-                pen.setStyle(Qt.SolidLine)
-
-            result.append((path, pen))
-        return result
+        closed = feat["type"] in POLIGONO_TIPOS
+        return [
+            (tol, GeometryBuilder._path(pts))
+            for tol, pts in lod_cache.get(feat, closed=closed)
+        ]
@@ -0,0 +1,56 @@
+# core/icon_cache.py
+"""
+Iconos SVG de la barra de herramientas pintados con el color del tema.
+
+Cada SVG se parsea una sola vez (un QSvgRenderer por archivo) y cada
+combinación de nombre, tamaño, color y devicePixelRatio se rasteriza una
+sola vez; cambiar de tema y volver reutiliza los iconos ya pintados.
+"""
+import os
+
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QColor, QIcon, QPainter, QPixmap
+from PySide6.QtSvg import QSvgRenderer
+
+
+class IconCache:
+    def __init__(self, icons_dir: str):
+        self.icons_dir = icons_dir
+        self._renderers = {}
+        self._iconos = {}
+
+    def renderer(self, nombre: str) -> QSvgRenderer:
+        renderer = self._renderers.get(nombre)
+        if renderer is None:
+            renderer = QSvgRenderer(os.path.join(self.icons_dir, nombre))
+            self._renderers[nombre] = renderer
+        return renderer
+
+    def icon(self, nombre: str, size, color: QColor, dpr: float = 1.0) -> QIcon:
+        """
+        Icono `nombre` de `size` píxeles lógicos con todo lo opaco del SVG
+        pintado de `color` (los SVG usan fill="currentColor", que QtSvg no
+        resuelve).
+        """
+        clave = (nombre, size.width(), size.height(), color.rgba(), dpr)
+        icono = self._iconos.get(clave)
+        if icono is not None:
+            return icono
+
+        pixmap = QPixmap(size * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        self.renderer(nombre).render(painter, QRectF(0, 0, size.width(), size.height()))
+        # conserva la forma del SVG (alfa) y sustituye su color
+        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+        painter.fillRect(pixmap.rect(), color)
+        painter.end()
+
+        icono = QIcon(pixmap)
+        self._iconos[clave] = icono
+        return icono
+
+    def clear(self):
+        self._iconos.clear()
+        self._renderers.clear()
@@ -0,0 +1,158 @@
+# core/journal.py
+"""
+Diario de ediciones (autoguardado) para recuperar la tabla tras un cierre
+inesperado.
+
+Cada edición se añade al final de `journal.log` como una línea JSON y se
+vacía al sistema operativo en el momento, así que el costo de escribir es
+proporcional a la edición y no al tamaño del proyecto. Cuando el diario
+crece más de COMPACT_RECORDS registros se compacta: el estado completo se
+escribe en `snapshot.json` (archivo temporal + rename) y el diario vuelve a
+empezar vacío.
+
+Cada instantánea lleva un número de generación y la primera línea del
+diario indica sobre qué generación se aplica; si el programa se cae entre
+escribir la instantánea y reiniciar el diario, el diario viejo se descarta
+en lugar de aplicarse dos veces. Una última línea cortada por el cierre se
+ignora.
+
+Operaciones registradas:
+    {"op": "set", "r": fila, "c": columna, "t": texto}
+    {"op": "ins", "r": fila, "n": cantidad}
+    {"op": "del", "r": fila, "n": cantidad}
+    {"op": "meta", "meta": {...}}
+"""
+import json
+import os
+
+SNAPSHOT = "snapshot.json"
+JOURNAL = "journal.log"
+
+
+def apply_op(rows: list[list[str]], meta: dict, op: dict, columns: int = 3):
+    """Aplica una operación del diario sobre filas [[id, x, y], ...] en memoria."""
+    tipo = op.get("op")
+    if tipo == "set":
+        r, c = op["r"], op["c"]
+        while len(rows) <= r:
+            rows.append([""] * columns)
+        rows[r][c] = op["t"]
+    elif tipo == "ins":
+        rows[op["r"]:op["r"]] = [[""] * columns for _ in range(op.get("n", 1))]
+    elif tipo == "del":
+        del rows[op["r"]:op["r"] + op.get("n", 1)]
+    elif tipo == "meta":
+        meta.update(op["meta"])
+
+
+class EditJournal:
+    # Registros tras los que se compacta el diario en una instantánea
+    COMPACT_RECORDS = 20000
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._snapshot = os.path.join(directory, SNAPSHOT)
+        self._journal = os.path.join(directory, JOURNAL)
+        self._archivo = None
+        self._activo = False
+        self.generation = 0
+        self.records = 0
+
+    def has_recovery(self) -> bool:
+        """True si quedó una sesión sin cerrar limpiamente."""
+        return os.path.exists(self._snapshot) or os.path.exists(self._journal)
+
+    def recover(self):
+        """
+        Estado de la sesión anterior: instantánea más el diario repetido.
+
+        Returns:
+            (filas [[id, x, y], ...], metadatos, operaciones aplicadas) o None
+            si no hay nada que recuperar.
+        """
+        rows, meta, generacion = [], {}, 0
+        try:
+            with open(self._snapshot, encoding="utf-8") as f:
+                estado = json.load(f)
+            rows, meta, generacion = estado["rows"], estado.get("meta", {}), estado.get("gen", 0)
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError):
+            # instantánea ilegible: sólo puede venir de un fallo ajeno al rename atómico
+            rows, meta = [], {}
+
+        aplicadas = 0
+        try:
+            with open(self._journal, encoding="utf-8") as f:
+                lineas = iter(f)
+                base = json.loads(next(lineas, "{}") or "{}")
+                if base.get("op") == "base" and base.get("gen") == generacion:
+                    for linea in lineas:
+                        try:
+                            op = json.loads(linea)
+                        except ValueError:
+                            break   # última escritura incompleta
+                        apply_op(rows, meta, op)
+                        aplicadas += 1
+        except (FileNotFoundError, ValueError):
+            pass
+
+        if not rows and not meta and not aplicadas:
+            return None
+        self.generation = generacion
+        return rows, meta, aplicadas
+
+    def start(self, rows: list[list[str]], meta: dict):
+        """
+        Empieza un diario nuevo a partir del estado dado. Hasta llamarlo, append
+        y compact no hacen nada (no se pisa la sesión aún no recuperada).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._activo = True
+        self.compact(rows, meta)
+
+    def append(self, op: dict) -> bool:
+        """
+        Registra una operación.
+
+        Returns:
+            True si el diario superó COMPACT_RECORDS y conviene compactarlo.
+        """
+        if self._archivo is None:
+            return False
+        self._archivo.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._archivo.flush()
+        self.records += 1
+        return self.records >= self.COMPACT_RECORDS
+
+    def compact(self, rows: list[list[str]], meta: dict):
+        """Escribe la instantánea del estado actual y reinicia el diario."""
+        if not self._activo:
+            return
+        self.generation += 1
+        temporal = self._snapshot + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"gen": self.generation, "meta": meta, "rows": rows},
+                      f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._snapshot)
+
+        if self._archivo is not None:
+            self._archivo.close()
+        self._archivo = open(self._journal, "w", encoding="utf-8")
+        self._archivo.write(json.dumps({"op": "base", "gen": self.generation}) + "\n")
+        self._archivo.flush()
+        self.records = 0
+
+    def discard(self):
+        """Cierre limpio: borra el diario y la instantánea."""
+        self._activo = False
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        for ruta in (self._journal, self._snapshot):
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
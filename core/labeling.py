@@ -0,0 +1,127 @@
+# core/labeling.py
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QFont, QFontMetricsF, QColor
+
+
+class LabelEngine:
+    """
+    Motor de etiquetas para la capa de puntos del lienzo.
+
+    Sólo coloca etiquetas para los puntos que caen dentro del viewport y
+    descarta las que se solapan usando una rejilla de colisión en
+    coordenadas de pantalla. La colocación se guarda en caché y sólo se
+    recalcula cuando cambia la transformación o el tamaño de la vista, así
+    que el costo depende de lo que está en pantalla, no del total de puntos.
+    """
+
+    def __init__(self):
+        self._capa = None
+        self._offset = 0.0
+        self._font = QFont()
+        self._metrics = QFontMetricsF(self._font)
+        self._color = QColor(Qt.darkBlue)
+        self._clave = None
+        self._colocadas = []
+
+    def set_source(self, point_layer, font: QFont = None, offset: float = 0.0, color=Qt.darkBlue):
+        """
+        Define la capa de puntos (PointLayerItem) a etiquetar.
+
+        Args:
+            point_layer: Capa de puntos o None para no dibujar etiquetas.
+            font: Fuente de las etiquetas (tamaño en puntos de pantalla).
+            offset: Desplazamiento de la etiqueta respecto al punto, en unidades de escena.
+            color: Color del texto.
+        """
+        self._capa = point_layer
+        self._offset = offset
+        if font is not None:
+            self._font = QFont(font)
+            self._metrics = QFontMetricsF(self._font)
+        self._color = QColor(color)
+        self.invalidate()
+
+    def invalidate(self):
+        self._clave = None
+        self._colocadas = []
+
+    def has_labels(self) -> bool:
+        return self._capa is not None and self._capa.count() > 0
+
+    def layout(self, view) -> list[tuple[QPointF, str]]:
+        """
+        Devuelve las etiquetas visibles como [(posición en el viewport, texto), ...].
+        """
+        if not self.has_labels():
+            return []
+
+        t = view.viewportTransform()
+        vp = view.viewport().rect()
+        clave = (t.m11(), t.m12(), t.m21(), t.m22(), t.dx(), t.dy(), vp.width(), vp.height())
+        if clave == self._clave:
+            return self._colocadas
+
+        self._clave = clave
+        self._colocadas = self._colocar(view, t, QRectF(vp))
+        return self._colocadas
+
+    def _colocar(self, view, t, vp: QRectF) -> list[tuple[QPointF, str]]:
+        capa = self._capa
+        visible = view.mapToScene(vp.toRect()).boundingRect()
+        indices = capa.points_in_rect(visible)
+
+        fm = self._metrics
+        alto = fm.height()
+        ascent = fm.ascent()
+        # Los IDs son casi siempre numéricos: el ancho de un dígito es la mejor estimación
+        ancho_car = max(fm.averageCharWidth(), fm.horizontalAdvance("0"))
+        celda = max(alto, 1.0)
+
+        rejilla = {}
+        colocadas = []
+        off = self._offset
+
+        for i in indices:
+            texto = str(capa.point_id(i))
+            if not texto:
+                continue
+            x, y = capa.point_coords(i)
+            p = t.map(QPointF(x + off, y + off))
+            # Ancho estimado: evita maquetar texto para etiquetas descartadas
+            rect = QRectF(p.x(), p.y(), ancho_car * len(texto), alto)
+            if not vp.intersects(rect):
+                continue
+
+            cx0, cx1 = int(rect.left() // celda), int(rect.right() // celda)
+            cy0, cy1 = int(rect.top() // celda), int(rect.bottom() // celda)
+            celdas = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+
+            choca = False
+            for c in celdas:
+                for otro in rejilla.get(c, ()):
+                    if otro.intersects(rect):
+                        choca = True
+                        break
+                if choca:
+                    break
+            if choca:
+                continue
+
+            for c in celdas:
+                rejilla.setdefault(c, []).append(rect)
+            colocadas.append((QPointF(p.x(), p.y() + ascent), texto))
+
+        return colocadas
+
+    def paint(self, painter, view):
+        """Dibuja las etiquetas en coordenadas del viewport."""
+        colocadas = self.layout(view)
+        if not colocadas:
+            return
+        painter.save()
+        painter.resetTransform()
+        painter.setFont(self._font)
+        painter.setPen(self._color)
+        for pos, texto in colocadas:
+            painter.drawText(pos, texto)
+        painter.restore()
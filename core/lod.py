@@ -0,0 +1,157 @@
+# core/lod.py
+"""
+Nivel de detalle (LOD) para polilíneas y polígonos.
+
+Cada feature lineal se simplifica con Douglas-Peucker a varias tolerancias
+crecientes (una "pirámide"). El lienzo elige el nivel cuya tolerancia no
+supera el tamaño de un píxel en coordenadas de escena, de modo que con zoom
+alejado no se dibujan miles de segmentos sub-píxel.
+"""
+
+# Límite de niveles por feature; cada nivel duplica la tolerancia anterior
+MAX_NIVELES = 16
+
+
+def simplify_douglas_peucker(coords: list[tuple[float, float]], tolerance: float) -> list[tuple[float, float]]:
+    """
+    Simplifica una secuencia de coordenadas con Douglas-Peucker (iterativo).
+
+    Args:
+        coords: Lista de tuplas (x, y).
+        tolerance: Distancia máxima permitida entre la línea original y la
+                   simplificada, en las mismas unidades que coords.
+
+    Returns:
+        Nueva lista de coordenadas; siempre conserva el primer y último vértice.
+    """
+    n = len(coords)
+    if n < 3 or tolerance <= 0:
+        return list(coords)
+
+    tol2 = tolerance * tolerance
+    conservar = [False] * n
+    conservar[0] = conservar[-1] = True
+    pila = [(0, n - 1)]
+
+    while pila:
+        ini, fin = pila.pop()
+        if fin - ini < 2:
+            continue
+
+        ax, ay = coords[ini]
+        bx, by = coords[fin]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+
+        max_d2, idx = -1.0, ini
+        for i in range(ini + 1, fin):
+            px, py = coords[i]
+            if seg2 == 0:
+                d2 = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                cruz = dx * (py - ay) - dy * (px - ax)
+                d2 = cruz * cruz / seg2
+            if d2 > max_d2:
+                max_d2, idx = d2, i
+
+        if max_d2 > tol2:
+            conservar[idx] = True
+            pila.append((ini, idx))
+            pila.append((idx, fin))
+
+    return [c for c, k in zip(coords, conservar) if k]
+
+
+def build_pyramid(coords: list[tuple[float, float]], closed: bool = False) -> list[tuple[float, list]]:
+    """
+    Construye la pirámide de simplificación de una geometría.
+
+    Args:
+        coords: Vértices originales.
+        closed: True para anillos de polígono (se cierran antes de simplificar).
+
+    Returns:
+        Lista de tuplas (tolerancia, coords) ordenada de más a menos detalle.
+        El nivel 0 tiene tolerancia 0 y las coordenadas originales.
+    """
+    pts = list(coords)
+    if closed and pts and pts[0] != pts[-1]:
+        pts.append(pts[0])
+
+    niveles = [(0.0, pts)]
+    minimo = 4 if closed else 2
+    if len(pts) <= minimo:
+        return niveles
+
+    xs = [x for x, _ in pts]
+    ys = [y for _, y in pts]
+    extension = max(max(xs) - min(xs), max(ys) - min(ys))
+    if extension <= 0:
+        return niveles
+
+    # Tolerancia inicial: ~1/4096 de la extensión del feature
+    tol = extension / 4096.0
+    for _ in range(MAX_NIVELES):
+        simplificado = simplify_douglas_peucker(pts, tol)
+        if len(simplificado) < minimo:
+            break
+        if len(simplificado) < len(niveles[-1][1]):
+            niveles.append((tol, simplificado))
+        if len(simplificado) == minimo:
+            break
+        tol *= 2.0
+    return niveles
+
+
+def select_level(levels: list[tuple[float, list]], pixel_size: float) -> int:
+    """
+    Índice del nivel más simplificado cuya tolerancia no supera medio píxel.
+
+    Args:
+        levels: Pirámide devuelta por build_pyramid.
+        pixel_size: Tamaño de un píxel de pantalla en unidades de escena.
+    """
+    limite = pixel_size * 0.5
+    elegido = 0
+    for i, (tol, _) in enumerate(levels):
+        if tol <= limite:
+            elegido = i
+        else:
+            break
+    return elegido
+
+
+class LODCache:
+    """
+    Caché de pirámides LOD por ID de feature.
+
+    Guarda junto a cada pirámide el tipo y las coordenadas con las que se
+    calculó; si el feature cambia (edición en la tabla) se recalcula.
+    """
+
+    def __init__(self):
+        self._entradas = {}
+
+    def get(self, feat: dict, closed: bool = False) -> list[tuple[float, list]]:
+        fid = feat.get("id")
+        firma = (feat.get("type"), tuple(tuple(c) for c in feat.get("coords", [])))
+        entrada = self._entradas.get(fid)
+        if entrada is not None and entrada[0] == firma:
+            return entrada[1]
+
+        niveles = build_pyramid(list(firma[1]), closed=closed)
+        self._entradas[fid] = (firma, niveles)
+        return niveles
+
+    def invalidate(self, fid):
+        self._entradas.pop(fid, None)
+
+    def prune(self, fids_vigentes):
+        """Descarta las entradas de features que ya no existen."""
+        vigentes = set(fids_vigentes)
+        for fid in list(self._entradas):
+            if fid not in vigentes:
+                del self._entradas[fid]
+
+    def clear(self):
+        self._entradas.clear()
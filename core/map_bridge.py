@@ -0,0 +1,201 @@
+# core/map_bridge.py
+import json
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from core.coordinate_manager import GeometryType
+from core.crs import utm_epsg, WGS84Cache
+from core.binary_codec import pack_features_b64, pack_clusters_b64, TIPO_PUNTO, TIPO_LINEA, TIPO_POLIGONO
+from core.clustering import PointClusterer
+from core.vector_tiles import VectorTiler
+
+_TIPOS_BINARIOS = {
+    GeometryType.PUNTO: TIPO_PUNTO,
+    GeometryType.POLILINEA: TIPO_LINEA,
+    GeometryType.POLIGONO: TIPO_POLIGONO,
+}
+
+
+class MapBridge(QObject):
+    """
+    Puente QWebChannel entre la aplicación y el mapa Leaflet (map_base.html).
+
+    En vez de reenviar el proyecto completo en cada edición, recuerda qué
+    features ya están en el mapa y emite sólo altas, cambios y bajas por ID.
+    Las reproyecciones a WGS84 se guardan por feature y se reutilizan
+    mientras sus coordenadas no cambien. Las geometrías viajan empaquetadas
+    en binario (core/binary_codec.py, en base64) y la página las decodifica
+    directamente a TypedArrays, sin JSON.
+
+    Los puntos no se envían uno a uno: se agrupan aquí en una rejilla que
+    depende del zoom (PointClusterer) y sólo viajan los grupos de la vista
+    que la página informa con viewChanged tras cada desplazamiento o zoom.
+
+    Si las líneas y polígonos superan `umbral_teselas` vértices dejan de
+    enviarse como features y pasan a servirse como teselas vectoriales
+    (core/vector_tiles.py) que la página pide según lo que muestra.
+    """
+
+    # Features nuevos, empaquetados con pack_features_b64
+    featuresAdded = Signal(str)
+    # Features modificados, empaquetados con pack_features_b64
+    featuresUpdated = Signal(str)
+    # Lista JSON de IDs a quitar del mapa
+    featuresRemoved = Signal(str)
+    # Grupos de puntos visibles, empaquetados con pack_clusters_b64
+    clustersChanged = Signal(str)
+    # Vaciar el mapa
+    featuresCleared = Signal()
+    # Ajustar la vista a los límites JSON [[sur, oeste], [norte, este]]
+    fitRequested = Signal(str)
+    # (revisión, activas): las teselas vectoriales cambiaron o se (des)activaron
+    vectorTilesChanged = Signal(int, bool)
+
+    def __init__(self, parent=None, wgs84_cache: WGS84Cache = None):
+        super().__init__(parent)
+        self.wgs84 = wgs84_cache if wgs84_cache is not None else WGS84Cache()
+        # fid -> (id, tipo binario, coords WGS84) enviado por última vez
+        self._enviados = {}
+        # 4 = Float32 relativo al origen del lote, 8 = Float64
+        self.coord_size = 4
+        self.clusterer = PointClusterer()
+        self._puntos = []
+        # última vista informada por la página: (zoom, sur, oeste, norte, este)
+        self._vista = None
+        self.tiler = VectorTiler()
+        self.umbral_teselas = 200_000
+
+    def wgs84_coords(self, feat: dict, epsg: int) -> list[tuple[float, float]]:
+        """Coordenadas (lon, lat) del feature, reproyectadas sólo si cambiaron."""
+        return self.wgs84.get(feat, epsg)
+
+    def _empaquetar(self, feats: list[tuple]) -> str:
+        return pack_features_b64(feats, self.coord_size)
+
+    def _vacio(self) -> bool:
+        return not self._enviados and not len(self.clusterer) and not len(self.tiler)
+
+    def sync(self, features: list[dict], hemisphere: str, zone):
+        """
+        Compara los features actuales con los ya enviados y emite las diferencias.
+        """
+        epsg = utm_epsg(hemisphere, zone)
+        estaba_vacio = self._vacio()
+        nuevos, cambiados, vigentes, puntos, lineales = [], [], set(), [], []
+
+        for feat in features:
+            if not feat.get("coords"):
+                continue
+            fid = feat["id"]
+            vigentes.add(fid)
+            if feat["type"] == GeometryType.PUNTO:
+                lon, lat = self.wgs84_coords(feat, epsg)[0]
+                puntos.append((fid, lon, lat))
+            else:
+                lineales.append(feat)
+
+        # sólo líneas y polígonos se envían como features: un ID que ahora es
+        # un punto (o ya no existe) se quita del mapa
+        ids_lineales = {f["id"] for f in lineales}
+        en_teselas = sum(len(f["coords"]) for f in lineales) > self.umbral_teselas
+        if en_teselas:
+            registros = [
+                (f["id"], _TIPOS_BINARIOS[f["type"]], self.wgs84_coords(f, epsg)) for f in lineales
+            ]
+            teselas_cambiaron = self.tiler.update(registros)
+            lineales = []
+        else:
+            teselas_cambiaron = bool(len(self.tiler))
+            self.tiler.clear()
+
+        for feat in lineales:
+            fid = feat["id"]
+            if fid in self._enviados and self.wgs84.is_current(feat, epsg):
+                continue
+            registro = (fid, _TIPOS_BINARIOS[feat["type"]], self.wgs84_coords(feat, epsg))
+            (cambiados if fid in self._enviados else nuevos).append(registro)
+            self._enviados[fid] = registro
+
+        # al pasar a teselas se quita del mapa todo lo enviado como features
+        quitados = [fid for fid in self._enviados if en_teselas or fid not in ids_lineales]
+        for fid in quitados:
+            del self._enviados[fid]
+        self.wgs84.prune(vigentes)
+
+        if quitados:
+            self.featuresRemoved.emit(json.dumps(quitados))
+        if cambiados:
+            self.featuresUpdated.emit(self._empaquetar(cambiados))
+        if nuevos:
+            self.featuresAdded.emit(self._empaquetar(nuevos))
+        if teselas_cambiaron:
+            self.vectorTilesChanged.emit(self.tiler.revision, en_teselas)
+
+        if puntos != self._puntos:
+            self._puntos = puntos
+            self.clusterer.set_points(puntos)
+            self._emitir_clusters()
+
+        if estaba_vacio and not self._vacio():
+            self.request_fit()
+
+    def _emitir_clusters(self):
+        if self._vista is None:
+            return
+        self.clustersChanged.emit(pack_clusters_b64(self.clusterer.clusters(*self._vista)))
+
+    def bounds(self):
+        """(sur, oeste, norte, este) de todo lo enviado, o None si el mapa está vacío."""
+        cajas = []
+        for caja in (self.clusterer.bounds(), self.tiler.bounds()):
+            if caja:
+                cajas.append(caja)
+        for _, _, coords in self._enviados.values():
+            lons = [c[0] for c in coords]
+            lats = [c[1] for c in coords]
+            cajas.append((min(lats), min(lons), max(lats), max(lons)))
+        if not cajas:
+            return None
+        return (
+            min(c[0] for c in cajas), min(c[1] for c in cajas),
+            max(c[2] for c in cajas), max(c[3] for c in cajas),
+        )
+
+    def request_fit(self):
+        caja = self.bounds()
+        if caja is not None:
+            s, w, n, e = caja
+            self.fitRequested.emit(json.dumps([[s, w], [n, e]]))
+
+    def clear(self):
+        self._enviados.clear()
+        self.wgs84.clear()
+        self._puntos = []
+        self.clusterer.set_points([])
+        self.featuresCleared.emit()
+        if len(self.tiler):
+            self.tiler.clear()
+            self.vectorTilesChanged.emit(self.tiler.revision, False)
+
+    def vector_tile(self, z: int, x: int, y: int) -> bytes:
+        """Tesela vectorial para el manejador geowizard:// (ver TileSchemeHandler)."""
+        return self.tiler.tile(z, x, y)
+
+    @Slot(int, float, float, float, float)
+    def viewChanged(self, zoom, south, west, north, east):
+        """Llamado desde la página tras cada desplazamiento o zoom del mapa."""
+        self._vista = (zoom, south, west, north, east)
+        self._emitir_clusters()
+
+    @Slot()
+    def ready(self):
+        """
+        Llamado desde la página al conectar el canal: reenvía todo lo que ya
+        se había enviado (la página pudo cargarse después del primer sync).
+        """
+        self.featuresCleared.emit()
+        if self._enviados:
+            self.featuresAdded.emit(self._empaquetar(list(self._enviados.values())))
+        if len(self.tiler):
+            self.vectorTilesChanged.emit(self.tiler.revision, True)
+        self.request_fit()
@@ -0,0 +1,173 @@
+# core/mbtiles.py
+"""
+Caché en disco de teselas del mapa base en formato MBTiles (SQLite).
+
+La tabla `tiles` sigue el esquema MBTiles (filas en orden TMS) para que el
+archivo pueda abrirse con otras herramientas; la columna extra `last_access`
+permite desalojar por antigüedad de uso cuando se supera el tamaño máximo.
+"""
+import math
+import sqlite3
+import time
+
+from core.clustering import MAX_LAT
+
+# Número de accesos que se acumulan antes de escribir last_access
+_LOTE_ACCESOS = 64
+
+
+def tile_range(south: float, west: float, north: float, east: float, zoom: int):
+    """Rango (x0, y0, x1, y1) inclusivo de teselas XYZ que cubren la caja."""
+    n = 2 ** zoom
+
+    def tx(lon):
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def ty(lat):
+        lat = max(-MAX_LAT, min(MAX_LAT, lat))
+        r = math.radians(lat)
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(r)) / math.pi) / 2 * n)))
+
+    return tx(west), ty(north), tx(east), ty(south)
+
+
+def tiles_in_bbox(south, west, north, east, zmin: int, zmax: int):
+    """Genera (z, x, y) de todas las teselas de la caja entre zmin y zmax."""
+    for z in range(zmin, zmax + 1):
+        x0, y0, x1, y1 = tile_range(south, west, north, east, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def count_tiles(south, west, north, east, zmin: int, zmax: int) -> int:
+    total = 0
+    for z in range(zmin, zmax + 1):
+        x0, y0, x1, y1 = tile_range(south, west, north, east, z)
+        total += (x1 - x0 + 1) * (y1 - y0 + 1)
+    return total
+
+
+class MBTilesCache:
+    """
+    Teselas (z, x, y) persistidas en un archivo MBTiles con límite de tamaño.
+
+    Al superar `max_bytes` se borran las teselas menos usadas hasta quedar en
+    el 90 % del límite, para no desalojar en cada inserción.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, name: str = "osm"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            " zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,"
+            " tile_data BLOB, last_access REAL,"
+            " PRIMARY KEY (zoom_level, tile_column, tile_row))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tiles_acceso ON tiles (last_access)")
+        self._db.executemany(
+            "INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+            [("name", name), ("format", "png"), ("type", "baselayer")],
+        )
+        self._db.commit()
+        self._bytes = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles"
+        ).fetchone()[0]
+        self._accesos = {}
+
+    @staticmethod
+    def _fila(z: int, x: int, y: int):
+        # MBTiles guarda las filas en orden TMS (origen abajo)
+        return z, x, (2 ** z) - 1 - y
+
+    def get(self, z: int, x: int, y: int):
+        clave = self._fila(z, x, y)
+        fila = self._db.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            clave,
+        ).fetchone()
+        if fila is None:
+            return None
+        self._accesos[clave] = time.time()
+        if len(self._accesos) >= _LOTE_ACCESOS:
+            self._guardar_accesos()
+        return bytes(fila[0])
+
+    def has(self, z: int, x: int, y: int) -> bool:
+        return self._db.execute(
+            "SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            self._fila(z, x, y),
+        ).fetchone() is not None
+
+    def put(self, z: int, x: int, y: int, data: bytes):
+        clave = self._fila(z, x, y)
+        previo = self._db.execute(
+            "SELECT LENGTH(tile_data) FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            clave,
+        ).fetchone()
+        if previo is not None:
+            self._bytes -= previo[0]
+        self._db.execute(
+            "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?)",
+            (*clave, sqlite3.Binary(data), time.time()),
+        )
+        self._accesos.pop(clave, None)
+        self._bytes += len(data)
+        self._evict()
+        self._db.commit()
+
+    def _guardar_accesos(self):
+        if self._accesos:
+            self._db.executemany(
+                "UPDATE tiles SET last_access=? WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                [(t, *clave) for clave, t in self._accesos.items()],
+            )
+            self._db.commit()
+            self._accesos.clear()
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        self._guardar_accesos()
+        objetivo = self.max_bytes * 0.9
+        while self._bytes > objetivo:
+            filas = self._db.execute(
+                "SELECT zoom_level, tile_column, tile_row, LENGTH(tile_data) FROM tiles"
+                " ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not filas:
+                self._bytes = 0
+                break
+            self._db.executemany(
+                "DELETE FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                [f[:3] for f in filas],
+            )
+            self._bytes -= sum(f[3] for f in filas)
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._evict()
+        self._db.commit()
+
+    def used_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    def clear(self):
+        self._accesos.clear()
+        self._db.execute("DELETE FROM tiles")
+        self._db.commit()
+        self._bytes = 0
+
+    def close(self):
+        self._guardar_accesos()
+        self._db.close()
@@ -0,0 +1,232 @@
+# core/metrics.py
+"""
+Métricas de geometría por feature: longitud, perímetro, área, centroide y
+caja envolvente, en las unidades de las coordenadas (metros en UTM).
+
+Los vértices de todos los features a calcular se concatenan en un solo
+arreglo de NumPy y las sumas por feature se hacen con ufunc.reduceat, sin
+bucles de Python por vértice. Las coordenadas se toman relativas al primer
+vértice de cada feature para no perder precisión con valores UTM grandes.
+
+En modo geodésico, longitudes, perímetros y áreas se miden sobre el
+elipsoide WGS84 con pyproj.Geod a partir de las coordenadas reproyectadas
+(WGS84Cache): todos los segmentos del lote se resuelven con una sola
+llamada vectorizada a Geod.inv. Centroide y caja siguen en UTM. pyproj
+sólo se carga la primera vez que se piden métricas geodésicas.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from core.coordinate_manager import GeometryType
+from core.crs import WGS84Cache
+
+
+@lru_cache(maxsize=None)
+def geod():
+    """Elipsoide WGS84 de pyproj, creado en el primer uso."""
+    from pyproj import Geod
+    return Geod(ellps="WGS84")
+
+
+def _desplazamientos(features: list[dict]):
+    """Cuentas, inicios y finales de cada feature en el arreglo concatenado,
+    e índice del vértice siguiente (cerrando cada feature sobre sí mismo)."""
+    cuentas = np.fromiter((len(f["coords"]) for f in features), dtype=np.int64, count=len(features))
+    inicios = np.zeros(len(features), dtype=np.int64)
+    np.cumsum(cuentas[:-1], out=inicios[1:])
+    finales = inicios + cuentas
+    sig = np.arange(1, int(finales[-1]) + 1)
+    sig[finales - 1] = inicios
+    return cuentas, inicios, finales, sig
+
+
+def _es_poligono(features: list[dict]):
+    return np.fromiter(
+        (f["type"] == GeometryType.POLIGONO for f in features), dtype=bool, count=len(features)
+    )
+
+
+def compute_metrics(features: list[dict]) -> list[dict]:
+    """
+    Calcula las métricas de varios features en un solo lote.
+
+    Args:
+        features: Features {id, type, coords} con al menos un vértice.
+
+    Returns:
+        Lista paralela a features; cada elemento es un dict con
+        "length" (suma de segmentos abiertos), "perimeter" (cerrado para
+        polígonos, igual a length en líneas), "area" (0 salvo polígonos),
+        "centroid" (x, y) y "bbox" (minx, miny, maxx, maxy).
+    """
+    if not features:
+        return []
+
+    cuentas, inicios, finales, sig = _desplazamientos(features)
+    xy = np.array([c for f in features for c in f["coords"]], dtype=np.float64).reshape(-1, 2)
+    origen = np.repeat(xy[inicios], cuentas, axis=0)
+    x = xy[:, 0] - origen[:, 0]
+    y = xy[:, 1] - origen[:, 1]
+
+    dx = x[sig] - x
+    dy = y[sig] - y
+    segmentos = np.hypot(dx, dy)
+    cruz = x * y[sig] - x[sig] * y
+
+    es_poligono = _es_poligono(features)
+    abiertos = segmentos.copy()
+    abiertos[finales - 1] = 0.0
+    longitud = np.add.reduceat(abiertos, inicios)
+    perimetro = np.where(es_poligono, np.add.reduceat(segmentos, inicios), longitud)
+
+    area_firmada = np.where(es_poligono, np.add.reduceat(cruz, inicios) / 2.0, 0.0)
+    cx_pol = np.add.reduceat((x + x[sig]) * cruz, inicios)
+    cy_pol = np.add.reduceat((y + y[sig]) * cruz, inicios)
+
+    # centroide de líneas: punto medio de cada segmento ponderado por su longitud
+    cx_lin = np.add.reduceat((x + dx / 2) * abiertos, inicios)
+    cy_lin = np.add.reduceat((y + dy / 2) * abiertos, inicios)
+    cx_med = np.add.reduceat(x, inicios) / cuentas
+    cy_med = np.add.reduceat(y, inicios) / cuentas
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        usar_area = es_poligono & (np.abs(area_firmada) > 1e-12)
+        usar_linea = ~usar_area & (longitud > 0)
+        cx = np.where(usar_area, cx_pol / (6.0 * area_firmada),
+                      np.where(usar_linea, cx_lin / longitud, cx_med))
+        cy = np.where(usar_area, cy_pol / (6.0 * area_firmada),
+                      np.where(usar_linea, cy_lin / longitud, cy_med))
+
+    x0, y0 = xy[inicios, 0], xy[inicios, 1]
+    minx = np.minimum.reduceat(xy[:, 0], inicios)
+    miny = np.minimum.reduceat(xy[:, 1], inicios)
+    maxx = np.maximum.reduceat(xy[:, 0], inicios)
+    maxy = np.maximum.reduceat(xy[:, 1], inicios)
+
+    return [
+        {
+            "length": float(longitud[i]),
+            "perimeter": float(perimetro[i]),
+            "area": float(abs(area_firmada[i])),
+            "centroid": (float(cx[i] + x0[i]), float(cy[i] + y0[i])),
+            "bbox": (float(minx[i]), float(miny[i]), float(maxx[i]), float(maxy[i])),
+        }
+        for i in range(len(features))
+    ]
+
+
+def compute_geodesic_metrics(features: list[dict], lonlats: list[list[tuple[float, float]]]) -> list[dict]:
+    """
+    Igual que compute_metrics, pero con longitud, perímetro y área
+    geodésicos sobre el elipsoide WGS84.
+
+    Args:
+        features: Features {id, type, coords} en UTM.
+        lonlats: Coordenadas (lon, lat) de cada feature, paralelas a features.
+    """
+    salida = compute_metrics(features)
+    if not salida:
+        return salida
+
+    cuentas, inicios, finales, sig = _desplazamientos(features)
+    lonlat = np.array([c for ll in lonlats for c in ll], dtype=np.float64).reshape(-1, 2)
+    lon, lat = lonlat[:, 0], lonlat[:, 1]
+    _, _, segmentos = geod().inv(lon, lat, lon[sig], lat[sig])
+    segmentos = np.asarray(segmentos, dtype=np.float64)
+
+    es_poligono = _es_poligono(features)
+    abiertos = segmentos.copy()
+    abiertos[finales - 1] = 0.0
+    longitud = np.add.reduceat(abiertos, inicios)
+    perimetro = np.where(es_poligono, np.add.reduceat(segmentos, inicios), longitud)
+
+    for i, m in enumerate(salida):
+        m["length"] = float(longitud[i])
+        m["perimeter"] = float(perimetro[i])
+        if es_poligono[i] and cuentas[i] >= 3:
+            a, b = inicios[i], finales[i]
+            area, _ = geod().polygon_area_perimeter(lon[a:b], lat[a:b])
+            m["area"] = abs(float(area))
+    return salida
+
+
+def metrics_lines(geom_type: str, m: dict) -> list[str]:
+    """Líneas de texto con las métricas relevantes para el tipo de geometría."""
+    if geom_type == GeometryType.POLILINEA:
+        return [f"Longitud: {m['length']:.2f} m"]
+    if geom_type == GeometryType.POLIGONO:
+        return [f"Perímetro: {m['perimeter']:.2f} m", f"Área: {m['area']:.2f} m²"]
+    return []
+
+
+class MetricsEngine:
+    """
+    Caché de métricas por ID de feature.
+
+    Igual que LODCache, guarda la firma (tipo y coordenadas) con la que se
+    calculó cada resultado; sólo los features nuevos o editados se
+    recalculan, todos juntos en un lote. Las métricas geodésicas se guardan
+    aparte, con el EPSG en la firma, y toman las reproyecciones de `wgs84`
+    (compartida con el mapa).
+    """
+
+    def __init__(self, wgs84_cache: WGS84Cache = None):
+        self._entradas = {}
+        self._geodesicas = {}
+        self.wgs84 = wgs84_cache if wgs84_cache is not None else WGS84Cache()
+
+    @staticmethod
+    def _firma(feat: dict):
+        return (feat.get("epsg"), feat.get("type"), tuple(tuple(c) for c in feat.get("coords", [])))
+
+    def compute(self, features: list[dict], epsg: int = None) -> dict:
+        """
+        Métricas {id: dict} de los features con coordenadas.
+
+        Args:
+            epsg: EPSG UTM de las coordenadas; si se indica, las métricas
+                  son geodésicas (los features con su propio "epsg" se
+                  miden en su zona).
+        """
+        entradas = self._entradas if epsg is None else self._geodesicas
+        salida, pendientes, firmas = {}, [], []
+        for feat in features:
+            if not feat.get("coords"):
+                continue
+            firma = (epsg,) + self._firma(feat)
+            entrada = entradas.get(feat["id"])
+            if entrada is not None and entrada[0] == firma:
+                salida[feat["id"]] = entrada[1]
+            else:
+                pendientes.append(feat)
+                firmas.append(firma)
+
+        if epsg is None:
+            calculadas = compute_metrics(pendientes)
+        else:
+            lonlats = [self.wgs84.get(feat, epsg) for feat in pendientes]
+            calculadas = compute_geodesic_metrics(pendientes, lonlats)
+        for feat, firma, m in zip(pendientes, firmas, calculadas):
+            entradas[feat["id"]] = (firma, m)
+            salida[feat["id"]] = m
+        return salida
+
+    def get(self, feat: dict, epsg: int = None) -> dict:
+        return self.compute([feat], epsg).get(feat["id"])
+
+    def invalidate(self, fid):
+        self._entradas.pop(fid, None)
+        self._geodesicas.pop(fid, None)
+
+    def prune(self, fids_vigentes):
+        """Descarta las entradas de features que ya no existen."""
+        vigentes = set(fids_vigentes)
+        for entradas in (self._entradas, self._geodesicas):
+            for fid in list(entradas):
+                if fid not in vigentes:
+                    del entradas[fid]
+
+    def clear(self):
+        self._entradas.clear()
+        self._geodesicas.clear()
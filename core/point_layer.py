@@ -0,0 +1,122 @@
+# core/point_layer.py
+from PySide6.QtCore import Qt, QRectF, QPointF
+from PySide6.QtGui import QPen, QColor, QPolygonF
+from PySide6.QtWidgets import QGraphicsItem
+
+from core.spatial_index import STRTree
+
+
+class PointLayerItem(QGraphicsItem):
+    """
+    Capa de puntos en un único QGraphicsItem.
+
+    Guarda todas las coordenadas en un QPolygonF contiguo y las pinta con
+    una sola llamada a drawPoints, en lugar de crear un QGraphicsEllipseItem
+    por punto. La selección/hit-test se resuelve con su propio R-tree
+    (core/spatial_index.py), sin pasar por el índice BSP de la escena.
+    """
+
+    def __init__(self, size: float = 1.0, color=Qt.red, parent=None):
+        super().__init__(parent)
+        self._size = size
+        self._color = QColor(color)
+        self._ids = []
+        self._xs = []
+        self._ys = []
+        self._poligono = QPolygonF()
+        self._rect = QRectF()
+        self._arbol = STRTree([])
+        # Necesario para que option.exposedRect refleje sólo la zona a repintar
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+    def set_points(self, ids: list, coords: list[tuple[float, float]]):
+        """
+        Reemplaza los puntos de la capa.
+
+        Args:
+            ids: Identificadores de cada punto (mismo orden que coords).
+            coords: Lista de tuplas (x, y) en coordenadas de escena.
+        """
+        if len(ids) != len(coords):
+            raise ValueError("ids y coords deben tener la misma longitud.")
+
+        self.prepareGeometryChange()
+        self._ids = list(ids)
+        self._xs = [float(x) for x, _ in coords]
+        self._ys = [float(y) for _, y in coords]
+        self._poligono = QPolygonF([QPointF(x, y) for x, y in coords])
+        self._arbol = STRTree([(i, (x, y, x, y)) for i, (x, y) in enumerate(zip(self._xs, self._ys))])
+
+        if coords:
+            self._rect = QRectF(
+                min(self._xs), min(self._ys),
+                max(self._xs) - min(self._xs), max(self._ys) - min(self._ys),
+            )
+        else:
+            self._rect = QRectF()
+        self.update()
+
+    def set_size(self, size: float):
+        self.prepareGeometryChange()
+        self._size = size
+        self.update()
+
+    def size(self) -> float:
+        return self._size
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def point_id(self, index: int):
+        return self._ids[index]
+
+    def point_coords(self, index: int) -> tuple[float, float]:
+        return self._xs[index], self._ys[index]
+
+    # ------------------------------------------------------------------
+    # QGraphicsItem
+    # ------------------------------------------------------------------
+
+    def boundingRect(self) -> QRectF:
+        if not self._ids:
+            return QRectF()
+        m = self._size / 2
+        return self._rect.adjusted(-m, -m, m, m)
+
+    def paint(self, painter, option, widget=None):
+        if not self._ids:
+            return
+
+        pen = QPen(self._color, self._size, Qt.SolidLine, Qt.RoundCap)
+        painter.setPen(pen)
+
+        expuesto = option.exposedRect
+        if expuesto.contains(self.boundingRect()):
+            painter.drawPoints(self._poligono)
+            return
+
+        visibles = self.points_in_rect(expuesto, margin=self._size / 2)
+        if visibles:
+            poligono = self._poligono
+            painter.drawPoints(QPolygonF([poligono.at(i) for i in visibles]))
+
+    def contains(self, point) -> bool:
+        return self.point_at(point.x(), point.y()) is not None
+
+    # ------------------------------------------------------------------
+    # Consultas espaciales
+    # ------------------------------------------------------------------
+
+    def points_in_rect(self, rect: QRectF, margin: float = 0.0) -> list[int]:
+        """Índices de los puntos dentro del rectángulo (coordenadas de escena)."""
+        minx, miny = rect.left() - margin, rect.top() - margin
+        maxx, maxy = rect.right() + margin, rect.bottom() + margin
+        return sorted(self._arbol.query(minx, miny, maxx, maxy))
+
+    def point_at(self, x: float, y: float, tolerance: float = None):
+        """
+        Devuelve el índice del punto más cercano a (x, y) dentro de la
+        tolerancia (por defecto, el radio del punto), o None si no hay ninguno.
+        """
+        tol = self._size / 2 if tolerance is None else tolerance
+        return self._arbol.nearest(x, y, max_distance=tol)[0]
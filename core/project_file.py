@@ -0,0 +1,279 @@
+# core/project_file.py
+"""
+Formato nativo de proyecto GeoWizard (.gwz).
+
+Los vértices se guardan una sola vez en un arreglo contiguo y cada feature
+es un rango (inicio, fin) sobre él; así los puntos, la polilínea y el
+polígono que la aplicación arma con las mismas filas de la tabla no
+triplican las coordenadas. Todo es little-endian y cada sección empieza en
+un múltiplo de 8 bytes, de modo que al abrir el archivo con mmap los
+arreglos son vistas de NumPy sobre el mapa, sin copiar ni parsear: sólo se
+leen de disco las páginas que se tocan.
+
+    cabecera (64 bytes)
+        magic       4s   b"GWZ1"
+        version     u16
+        reservado   u16
+        n_vertices  u64
+        n_features  u64
+        n_etiquetas u64  bytes del bloque de etiquetas
+        n_meta      u64  bytes de los metadatos
+        reservado   24x
+    coords      Float64[2 * n_vertices]   x0, y0, x1, y1, ...
+    rangos      Uint64[2 * n_features]    inicio y fin (exclusivo) de cada feature
+    ids         Int64[n_features]
+    tipos       Uint8[n_features]         0 = punto, 1 = línea, 2 = polígono
+    (relleno hasta múltiplo de 8)
+    offs_etiq   Uint64[n_vertices + 1]    etiqueta i = etiquetas[offs[i]:offs[i+1]]
+    etiquetas   UTF-8                     IDs de fila de la tabla ("1", "3.2", ...)
+    (relleno hasta múltiplo de 8)
+    metadatos   JSON UTF-8                zona, hemisferio, nombre, configuración
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from core.binary_codec import TIPO_PUNTO, TIPO_LINEA, TIPO_POLIGONO
+from core.coordinate_manager import GeometryType
+
+MAGIC = b"GWZ1"
+VERSION = 1
+EXTENSION = ".gwz"
+_CABECERA = struct.Struct("<4sHHQQQQ24x")
+
+TIPOS = {
+    GeometryType.PUNTO: TIPO_PUNTO,
+    GeometryType.POLILINEA: TIPO_LINEA,
+    GeometryType.POLIGONO: TIPO_POLIGONO,
+}
+_NOMBRES = {v: k for k, v in TIPOS.items()}
+
+
+def _relleno(n: int) -> int:
+    return -n % 8
+
+
+def _secciones(n_vertices: int, n_features: int, n_etiquetas: int):
+    """Desplazamiento en bytes de cada sección."""
+    pos = {"coords": _CABECERA.size}
+    pos["rangos"] = pos["coords"] + 16 * n_vertices
+    pos["ids"] = pos["rangos"] + 16 * n_features
+    pos["tipos"] = pos["ids"] + 8 * n_features
+    pos["offs_etiq"] = pos["tipos"] + n_features + _relleno(n_features)
+    pos["etiquetas"] = pos["offs_etiq"] + 8 * (n_vertices + 1)
+    pos["meta"] = pos["etiquetas"] + n_etiquetas + _relleno(n_etiquetas)
+    return pos
+
+
+def write_project(path: str, coords, ranges, ids, types, labels=None, metadata: dict = None):
+    """
+    Guarda un proyecto .gwz. La escritura va a un archivo temporal que luego
+    reemplaza al destino, así un fallo a mitad no deja el proyecto corrupto.
+
+    Args:
+        coords: Vértices (n, 2).
+        ranges: (inicio, fin) de los vértices de cada feature.
+        ids: ID entero de cada feature.
+        types: Tipo de cada feature (GeometryType).
+        labels: (Opcional) Etiqueta de texto de cada vértice.
+        metadata: (Opcional) Dict serializable a JSON.
+    """
+    coords = np.ascontiguousarray(coords, dtype="<f8").reshape(-1, 2)
+    rangos = np.ascontiguousarray(ranges, dtype="<u8").reshape(-1, 2)
+    ids = np.ascontiguousarray(ids, dtype="<i8")
+    try:
+        tipos = np.array([TIPOS[t] for t in types], dtype=np.uint8)
+    except KeyError as e:
+        raise ValueError(f"Tipo de geometría no soportado: {e}")
+    n_vertices, n_features = len(coords), len(rangos)
+    if len(ids) != n_features or len(tipos) != n_features:
+        raise ValueError("Rangos, IDs y tipos deben tener un elemento por feature.")
+    if n_features and int(rangos.max()) > n_vertices:
+        raise ValueError("Un rango de feature excede el número de vértices.")
+
+    codificadas = [str(e).encode("utf-8") for e in labels] if labels is not None else []
+    if codificadas and len(codificadas) != n_vertices:
+        raise ValueError("Debe haber una etiqueta por vértice.")
+    offs = np.zeros(n_vertices + 1, dtype="<u8")
+    if codificadas:
+        np.cumsum([len(e) for e in codificadas], out=offs[1:])
+    etiquetas = b"".join(codificadas)
+    meta = json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8")
+
+    temporal = path + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(_CABECERA.pack(MAGIC, VERSION, 0, n_vertices, n_features, len(etiquetas), len(meta)))
+        f.write(coords.data)
+        f.write(rangos.data)
+        f.write(ids.data)
+        f.write(tipos.data)
+        f.write(b"\0" * _relleno(n_features))
+        f.write(offs.data)
+        f.write(etiquetas)
+        f.write(b"\0" * _relleno(len(etiquetas)))
+        f.write(meta)
+    os.replace(temporal, path)
+
+
+class ProjectFile:
+    """
+    Proyecto .gwz abierto con mmap. `coords`, `ranges`, `ids` y `types` son
+    vistas de NumPy sobre el archivo (de sólo lectura); las etiquetas se
+    decodifican al pedirlas. Debe cerrarse (o usarse con `with`) cuando ya
+    no se usen las vistas.
+
+    Ofrece las mismas lecturas por partes que FeatureStore (vertex_count,
+    rows, features(bbox), bounds), así un proyecto grande se muestra en
+    StoreDialog sin cargarlo en la tabla.
+    """
+    read_only = True
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"'{path}' no es un proyecto GeoWizard válido (archivo vacío).")
+        try:
+            self._abrir()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _abrir(self):
+        mm = self._mm
+        if len(mm) < _CABECERA.size:
+            raise ValueError(f"'{self.path}' no es un proyecto GeoWizard válido.")
+        magic, version, _, nv, nf, ne, nm = _CABECERA.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{self.path}' no es un proyecto GeoWizard válido.")
+        if version > VERSION:
+            raise ValueError(f"El proyecto usa la versión {version} del formato; esta aplicación lee hasta la {VERSION}.")
+        pos = _secciones(nv, nf, ne)
+        if len(mm) < pos["meta"] + nm:
+            raise ValueError(f"El proyecto '{self.path}' está truncado.")
+
+        self.coords = np.frombuffer(mm, dtype="<f8", count=2 * nv, offset=pos["coords"]).reshape(nv, 2)
+        self.ranges = np.frombuffer(mm, dtype="<u8", count=2 * nf, offset=pos["rangos"]).reshape(nf, 2)
+        self.ids = np.frombuffer(mm, dtype="<i8", count=nf, offset=pos["ids"])
+        self.types = np.frombuffer(mm, dtype=np.uint8, count=nf, offset=pos["tipos"])
+        self._offs = np.frombuffer(mm, dtype="<u8", count=nv + 1, offset=pos["offs_etiq"])
+        self._etiquetas = pos["etiquetas"]
+        self._cajas = None
+        self.metadata = json.loads(bytes(mm[pos["meta"]:pos["meta"] + nm]).decode("utf-8")) if nm else {}
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def n_vertices(self) -> int:
+        return len(self.coords)
+
+    def vertex_count(self) -> int:
+        return self.n_vertices
+
+    def feature_count(self) -> int:
+        return len(self)
+
+    def label(self, i: int) -> str:
+        a, b = int(self._offs[i]), int(self._offs[i + 1])
+        return self._mm[self._etiquetas + a:self._etiquetas + b].decode("utf-8")
+
+    def labels(self, start: int = 0, stop: int = None) -> list[str]:
+        """Etiquetas de los vértices [start, stop) en una sola lectura."""
+        stop = self.n_vertices if stop is None else min(stop, self.n_vertices)
+        if start >= stop:
+            return []
+        offs = self._offs[start:stop + 1].astype(np.int64)
+        base = self._etiquetas
+        bloque = self._mm[base + int(offs[0]):base + int(offs[-1])]
+        rel = (offs - offs[0]).tolist()
+        return [bloque[a:b].decode("utf-8") for a, b in zip(rel[:-1], rel[1:])]
+
+    def rows(self, start: int, count: int) -> list[tuple]:
+        """Filas (etiqueta, x, y) de los vértices [start, start + count)."""
+        stop = min(start + count, self.n_vertices)
+        if start >= stop:
+            return []
+        if self._offs[-1]:
+            etiquetas = self.labels(start, stop)
+        else:
+            # proyecto guardado sin etiquetas: se numeran como la tabla
+            etiquetas = [str(i + 1) for i in range(start, stop)]
+        xs, ys = self.coords[start:stop].T.tolist()
+        return list(zip(etiquetas, xs, ys))
+
+    def bounds(self):
+        """(minx, miny, maxx, maxy) de todos los vértices, o None si no hay."""
+        if not self.n_vertices:
+            return None
+        minimo, maximo = self.coords.min(axis=0).tolist(), self.coords.max(axis=0).tolist()
+        return minimo[0], minimo[1], maximo[0], maximo[1]
+
+    def feature_bounds(self) -> np.ndarray:
+        """
+        Caja (minx, miny, maxx, maxy) de cada feature, calculada una vez con
+        reduceat sobre los rangos (NaN para un rango vacío).
+        """
+        if self._cajas is None:
+            cajas = np.full((len(self), 4), np.nan)
+            inicios = self.ranges[:, 0].astype(np.int64)
+            fines = self.ranges[:, 1].astype(np.int64)
+            validos = fines > inicios
+            if validos.any():
+                # índices intercalados inicio, fin: los resultados pares son
+                # la reducción de cada rango (los rangos pueden solaparse);
+                # el NaN final permite fin == n_vertices
+                bordes = np.column_stack((inicios[validos], fines[validos])).ravel()
+                for col, eje, reduccion in ((0, 0, np.minimum), (1, 1, np.minimum),
+                                            (2, 0, np.maximum), (3, 1, np.maximum)):
+                    valores = np.append(self.coords[:, eje], np.nan)
+                    cajas[validos, col] = reduccion.reduceat(valores, bordes)[::2]
+            self._cajas = cajas
+        return self._cajas
+
+    def feature(self, i: int) -> dict:
+        a, b = (int(v) for v in self.ranges[i])
+        return {
+            "id": int(self.ids[i]),
+            "type": _NOMBRES[int(self.types[i])],
+            "coords": [tuple(c) for c in self.coords[a:b].tolist()],
+        }
+
+    def features(self, bbox=None):
+        """
+        Genera los features {id, type, coords} en el orden del archivo.
+
+        Args:
+            bbox: (Opcional) (minx, miny, maxx, maxy); sólo los features cuya
+                  caja la intersecta.
+        """
+        if bbox is None:
+            indices = range(len(self))
+        else:
+            minx, miny, maxx, maxy = bbox
+            c = self.feature_bounds()
+            indices = np.flatnonzero(
+                (c[:, 2] >= minx) & (c[:, 0] <= maxx) & (c[:, 3] >= miny) & (c[:, 1] <= maxy)
+            ).tolist()
+        for i in indices:
+            yield self.feature(i)
+
+    def close(self):
+        self.coords = self.ranges = self.ids = self.types = self._offs = self._cajas = None
+        try:
+            self._mm.close()
+        except BufferError:
+            # quedan vistas en uso fuera de esta clase: el mapa se libera
+            # cuando la última de ellas se destruya
+            pass
@@ -0,0 +1,345 @@
+# core/queries.py
+"""
+Consultas espaciales en lote sobre un CoordinateManager.
+
+- Punto en polígono: para cada polígono se preseleccionan los puntos dentro
+  de su caja (búsqueda binaria sobre las X ordenadas) y se prueba el
+  cruce de rayos con NumPy. Las aristas se reparten en franjas
+  horizontales, y cada punto sólo se prueba contra las aristas de su franja.
+- Línea más cercana: los segmentos de todas las polilíneas se indexan en un
+  STRTree (SegmentIndex). Los puntos se resuelven por teselas: cada tesela
+  hace dos consultas por caja al árbol y calcula sus distancias en una
+  matriz de NumPy, sin recorrer las líneas completas.
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from core.coordinate_manager import GeometryType
+
+# Elementos máximos de cada matriz puntos x aristas
+_BLOQUE = 1_000_000
+
+
+def points_in_ring(ring, xy) -> np.ndarray:
+    """
+    Prueba par-impar vectorizada de varios puntos contra un anillo.
+
+    Args:
+        ring: Vértices del anillo (cerrado o no).
+        xy: Arreglo (n, 2) de puntos.
+
+    Returns:
+        Arreglo booleano de n elementos.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    anillo = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+    if len(anillo) > 1 and (anillo[0] == anillo[-1]).all():
+        anillo = anillo[:-1]
+    dentro = np.zeros(len(xy), dtype=bool)
+    if len(anillo) < 3 or len(xy) == 0:
+        return dentro
+
+    # relativo al primer vértice para conservar precisión con valores UTM
+    origen = anillo[0]
+    anillo = anillo - origen
+    px, py = xy[:, 0] - origen[0], xy[:, 1] - origen[1]
+
+    x1, y1 = anillo[:, 0], anillo[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    # las aristas horizontales nunca cruzan el rayo
+    validas = y1 != y2
+    x1, y1, x2, y2 = x1[validas], y1[validas], x2[validas], y2[validas]
+    ymin, ymax = min(y1.min(), y2.min()), max(y1.max(), y2.max())
+
+    franjas = max(1, int(math.sqrt(len(x1))))
+    alto = (ymax - ymin) / franjas or 1.0
+    candidatos = np.flatnonzero((py >= ymin) & (py <= ymax))
+    f_punto = np.clip(((py[candidatos] - ymin) / alto).astype(np.int64), 0, franjas - 1)
+    f0 = np.clip(((np.minimum(y1, y2) - ymin) / alto).astype(np.int64), 0, franjas - 1)
+    f1 = np.clip(((np.maximum(y1, y2) - ymin) / alto).astype(np.int64), 0, franjas - 1)
+    # cada arista aparece en todas las franjas que abarca
+    cuantas = f1 - f0 + 1
+    arista = np.repeat(np.arange(len(x1)), cuantas)
+    franja = np.repeat(f0, cuantas) + (np.arange(cuantas.sum()) - np.repeat(np.cumsum(cuantas) - cuantas, cuantas))
+
+    orden_a = np.argsort(franja, kind="stable")
+    arista, franja = arista[orden_a], franja[orden_a]
+    lim_a = np.searchsorted(franja, np.arange(franjas + 1))
+    orden_p = np.argsort(f_punto, kind="stable")
+    puntos, f_punto = candidatos[orden_p], f_punto[orden_p]
+    lim_p = np.searchsorted(f_punto, np.arange(franjas + 1))
+
+    for f in range(franjas):
+        e = arista[lim_a[f]:lim_a[f + 1]]
+        p = puntos[lim_p[f]:lim_p[f + 1]]
+        if len(e) == 0 or len(p) == 0:
+            continue
+        ex1, ey1, ex2, ey2 = x1[e], y1[e], x2[e], y2[e]
+        paso = max(1, _BLOQUE // len(e))
+        for i in range(0, len(p), paso):
+            q = p[i:i + paso]
+            qx, qy = px[q][:, None], py[q][:, None]
+            cruza = (ey1 > qy) != (ey2 > qy)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                xc = ex1 + (qy - ey1) * (ex2 - ex1) / (ey2 - ey1)
+            cruces = np.count_nonzero(cruza & (qx < xc), axis=1)
+            dentro[q] = (cruces % 2) == 1
+    return dentro
+
+
+def _distancia_segmentos(px, py, ax, ay, bx, by) -> np.ndarray:
+    """Distancias punto-segmento elemento a elemento."""
+    dx, dy = bx - ax, by - ay
+    l2 = dx * dx + dy * dy
+    t = ((px - ax) * dx + (py - ay) * dy) / np.where(l2 > 0, l2, 1.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+class SegmentIndex:
+    """
+    Segmentos empaquetados en cubetas Sort-Tile-Recursive (como STRTree,
+    un solo nivel y en arreglos de NumPy) para búsquedas de vecino más
+    cercano de muchos puntos a la vez.
+
+    Los puntos se agrupan en teselas compactas de unos TAMANO_GRUPO puntos.
+    Para cada tesela, unos pocos segmentos cercanos dan una cota superior de
+    la distancia; luego una sola consulta por caja (la tesela ampliada en la
+    cota) devuelve todos los segmentos que pueden ser el más cercano de
+    alguno de sus puntos, y las distancias se calculan en una matriz.
+    """
+
+    TAMANO_GRUPO = 64
+    # Segmentos por cubeta
+    CUBETA = 32
+    # Segmentos con los que se estima la cota de cada tesela
+    MUESTRA_COTA = 64
+
+    def __init__(self, a, b):
+        """
+        Args:
+            a, b: Arreglos (n, 2) con los extremos de cada segmento.
+        """
+        a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+        b = np.asarray(b, dtype=np.float64).reshape(-1, 2)
+        # relativo al mínimo para conservar precisión con valores UTM
+        self.origen = np.minimum(a.min(axis=0), b.min(axis=0))
+        self.a, self.b = a - self.origen, b - self.origen
+        cajas = np.hstack([np.minimum(self.a, self.b), np.maximum(self.a, self.b)])
+
+        # STR: franjas verticales por X del centro y, dentro de cada una, orden por Y
+        n = len(cajas)
+        centro = (cajas[:, :2] + cajas[:, 2:]) / 2
+        cubetas = -(-n // self.CUBETA)
+        por_franja = self.CUBETA * max(1, int(math.ceil(math.sqrt(cubetas))))
+        rango_x = np.empty(n, dtype=np.int64)
+        rango_x[np.argsort(centro[:, 0], kind="stable")] = np.arange(n)
+        orden = np.lexsort((centro[:, 1], rango_x // por_franja))
+        self._segs = orden
+        self._cajas = cajas[orden]
+        inicios = np.arange(0, n, self.CUBETA)
+        self._inicios = inicios
+        self._cajas_cubeta = np.hstack([
+            np.minimum.reduceat(self._cajas[:, :2], inicios),
+            np.maximum.reduceat(self._cajas[:, 2:], inicios),
+        ])
+        extension = cajas[:, 2:].max(axis=0)
+        self._diagonal = float(np.hypot(*extension))
+        self._paso = max(float(np.median(np.hypot(*(self.b - self.a).T))), 1e-6)
+
+    def _consulta(self, x0, y0, x1, y1, r) -> np.ndarray:
+        """Segmentos cuya caja intersecta la caja dada ampliada en r."""
+        x0, y0, x1, y1 = x0 - r, y0 - r, x1 + r, y1 + r
+        c = self._cajas_cubeta
+        elegidas = np.flatnonzero((c[:, 0] <= x1) & (c[:, 2] >= x0) & (c[:, 1] <= y1) & (c[:, 3] >= y0))
+        if len(elegidas) == 0:
+            return elegidas
+        ini = self._inicios[elegidas]
+        cnt = np.minimum(ini + self.CUBETA, len(self._cajas)) - ini
+        pos = np.repeat(ini, cnt) + np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+        s = self._cajas[pos]
+        pos = pos[(s[:, 0] <= x1) & (s[:, 2] >= x0) & (s[:, 1] <= y1) & (s[:, 3] >= y0)]
+        return self._segs[pos]
+
+    def _distancias(self, p, segs) -> np.ndarray:
+        a, b = self.a[segs], self.b[segs]
+        return _distancia_segmentos(
+            p[:, 0:1], p[:, 1:2], a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+        )
+
+    def _grupos(self, p):
+        """Índices de los puntos repartidos en teselas de ~TAMANO_GRUPO."""
+        n = len(p)
+        minimo = p.min(axis=0)
+        extension = np.maximum(p.max(axis=0) - minimo, 1e-9)
+        lado = max(float(np.sqrt(extension.prod() * self.TAMANO_GRUPO / n)), float(extension.max()) / 4096, 1e-9)
+        celdas = ((p - minimo) // lado).astype(np.int64)
+        claves = celdas[:, 0] * (int(celdas[:, 1].max()) + 1) + celdas[:, 1]
+        orden = np.argsort(claves, kind="stable")
+        limites = np.flatnonzero(np.diff(claves[orden])) + 1
+        for grupo in np.split(orden, limites):
+            for i in range(0, len(grupo), self.TAMANO_GRUPO):
+                yield grupo[i:i + self.TAMANO_GRUPO]
+
+    def nearest(self, xy, max_distance: float = math.inf) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Segmento más cercano a cada punto.
+
+        Returns:
+            (índices, distancias); índice -1 y distancia inf si no hay
+            ninguno a menos de max_distance.
+        """
+        p = np.asarray(xy, dtype=np.float64).reshape(-1, 2) - self.origen
+        indice = np.full(len(p), -1, dtype=np.int64)
+        mejor = np.full(len(p), np.inf)
+        if len(p) == 0:
+            return indice, mejor
+
+        for grupo in self._grupos(p):
+            q = p[grupo]
+            x0, y0 = q.min(axis=0)
+            x1, y1 = q.max(axis=0)
+
+            # cota superior con los primeros segmentos que aparezcan cerca
+            r = self._paso
+            candidatos = self._consulta(x0, y0, x1, y1, r)
+            while len(candidatos) == 0 and r < max_distance:
+                r *= 4
+                candidatos = self._consulta(x0, y0, x1, y1, r)
+                if r > 2 * self._diagonal + abs(x0) + abs(y0):
+                    break
+            if len(candidatos) == 0:
+                continue
+            # cualquier subconjunto da una cota válida
+            muestra = candidatos[::max(1, len(candidatos) // self.MUESTRA_COTA)]
+            cota = min(float(self._distancias(q, muestra).min(axis=1).max()), max_distance)
+
+            candidatos = self._consulta(x0, y0, x1, y1, cota)
+            if len(candidatos) == 0:
+                continue
+            paso = max(1, _BLOQUE // len(candidatos))
+            for i in range(0, len(grupo), paso):
+                d = self._distancias(q[i:i + paso], candidatos)
+                k = d.argmin(axis=1)
+                indice[grupo[i:i + paso]] = candidatos[k]
+                mejor[grupo[i:i + paso]] = d[np.arange(len(k)), k]
+
+        fuera = mejor > max_distance
+        mejor[fuera] = np.inf
+        indice[fuera] = -1
+        return indice, mejor
+
+
+class SpatialQueries:
+    """Consultas punto-en-polígono y línea más cercana para arreglos de puntos."""
+
+    @staticmethod
+    def points_in_polygons(mgr, xy) -> list:
+        """
+        Polígono que contiene a cada punto.
+
+        Returns:
+            Lista paralela a xy con el ID del primer polígono (en orden de
+            alta) que contiene al punto, o None.
+        """
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        salida = [None] * len(xy)
+        poligonos = [f for f in mgr.get_features() if f["type"] == GeometryType.POLIGONO]
+        if not poligonos or len(xy) == 0:
+            return salida
+
+        orden_x = np.argsort(xy[:, 0], kind="stable")
+        xs = xy[orden_x, 0]
+        libre = np.ones(len(xy), dtype=bool)
+        for feat in poligonos:
+            coords = np.asarray(feat["coords"], dtype=np.float64)
+            minx, miny = coords.min(axis=0)
+            maxx, maxy = coords.max(axis=0)
+            desde = np.searchsorted(xs, minx, side="left")
+            hasta = np.searchsorted(xs, maxx, side="right")
+            idx = orden_x[desde:hasta]
+            idx = idx[libre[idx] & (xy[idx, 1] >= miny) & (xy[idx, 1] <= maxy)]
+            if len(idx) == 0:
+                continue
+            for i in idx[points_in_ring(coords, xy[idx])]:
+                salida[i] = feat["id"]
+                libre[i] = False
+        return salida
+
+    @staticmethod
+    def nearest_lines(mgr, xy, max_distance: float = math.inf) -> tuple[list, list]:
+        """
+        Polilínea más cercana a cada punto.
+
+        Returns:
+            (ids, distancias) paralelas a xy; (None, inf) si no hay
+            ninguna a menos de max_distance.
+        """
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        lineas = [f for f in mgr.get_features() if f["type"] == GeometryType.POLILINEA]
+        if not lineas:
+            return [None] * len(xy), [math.inf] * len(xy)
+
+        a, b, duenos = [], [], []
+        for feat in lineas:
+            c = feat["coords"]
+            a.extend(c[:-1])
+            b.extend(c[1:])
+            duenos.extend([feat["id"]] * (len(c) - 1))
+        if not duenos or len(xy) == 0:
+            return [None] * len(xy), [math.inf] * len(xy)
+
+        indices, distancias = SegmentIndex(a, b).nearest(xy, max_distance)
+        ids = [duenos[k] if k >= 0 else None for k in indices.tolist()]
+        return ids, distancias.tolist()
+
+    @staticmethod
+    def point_attributes(mgr, xy=None) -> list[OrderedDict]:
+        """
+        Atributos de consulta de cada punto: 'poligono' (ID del polígono
+        que lo contiene), 'linea' (ID de la polilínea más cercana) y
+        'dist_linea' (distancia a ella en metros). Sin xy, se usan los
+        features tipo Punto del manager.
+        """
+        if xy is None:
+            xy = [f["coords"][0] for f in mgr.get_features() if f["type"] == GeometryType.PUNTO]
+        contenedores = SpatialQueries.points_in_polygons(mgr, xy)
+        lineas, distancias = SpatialQueries.nearest_lines(mgr, xy)
+        return [
+            OrderedDict([
+                ("poligono", "" if p is None else str(p)),
+                ("linea", "" if l is None else str(l)),
+                ("dist_linea", None if l is None else float(d)),
+            ])
+            for p, l, d in zip(contenedores, lineas, distancias)
+        ]
+
+    @staticmethod
+    def feature_attributes(mgr) -> dict:
+        """Atributos {feat_id: OrderedDict} de los features tipo Punto, para los exportadores."""
+        puntos = [f for f in mgr.get_features() if f["type"] == GeometryType.PUNTO]
+        if not puntos:
+            return {}
+        atributos = SpatialQueries.point_attributes(mgr, [f["coords"][0] for f in puntos])
+        return {f["id"]: a for f, a in zip(puntos, atributos)}
+
+
+# Etiquetas de los atributos de consulta en descripciones y tablas
+ATTRIBUTE_LABELS = OrderedDict([
+    ("poligono", "Dentro de polígono"),
+    ("linea", "Línea más cercana"),
+    ("dist_linea", "Distancia a la línea"),
+])
+
+
+def attribute_lines(attrs: dict) -> list[str]:
+    """Líneas 'Etiqueta: valor' de los atributos con valor, para descripciones."""
+    lineas = []
+    for clave, valor in attrs.items():
+        if valor is None or valor == "":
+            continue
+        texto = f"{valor:.2f} m" if isinstance(valor, float) else str(valor)
+        lineas.append(f"{ATTRIBUTE_LABELS.get(clave, clave)}: {texto}")
+    return lineas
@@ -0,0 +1,108 @@
+# core/scene_sync.py
+from PySide6.QtCore import Qt
+
+from core.geometry import GeometryBuilder, LODPathItem, PUNTO_TIPOS, POLIGONO_TIPOS
+from core.point_layer import PointLayerItem
+
+
+class SceneSynchronizer:
+    """
+    Mantiene la QGraphicsScene alineada con la lista de features aplicando
+    diferencias (altas, cambios y bajas) en lugar de vaciar la escena.
+
+    Guarda un registro {id de feature: item}; los features que no cambiaron
+    conservan su item tal cual, de modo que Qt no reconstruye el índice BSP
+    en cada refresco. Todos los puntos comparten una única PointLayerItem.
+    """
+
+    def __init__(self, scene, lod_cache):
+        self.scene = scene
+        self.lod_cache = lod_cache
+        # fid -> (tipo, pirámide de coordenadas, LODPathItem)
+        self._items = {}
+        self._capa = None
+        self._puntos = ([], [])
+
+    @property
+    def point_layer(self):
+        return self._capa
+
+    def lod_items(self) -> list[LODPathItem]:
+        return [item for _, _, item in self._items.values()]
+
+    def sync(self, features: list[dict], point_size: float, show_points: bool = True, pixel_size: float = 0.0) -> bool:
+        """
+        Aplica a la escena las diferencias respecto al último sync.
+
+        Args:
+            features: Features actuales (los de CoordinateManager.get_features()).
+            point_size: Diámetro de los puntos en unidades de escena.
+            show_points: Si es False la capa de puntos queda vacía.
+            pixel_size: Tamaño de píxel actual, para elegir el nivel LOD de los items nuevos.
+
+        Returns:
+            True si la capa de puntos cambió (para invalidar etiquetas).
+        """
+        self._sync_paths(features, pixel_size)
+        return self._sync_puntos(features, point_size, show_points)
+
+    def _sync_paths(self, features: list[dict], pixel_size: float):
+        vigentes = set()
+        for feat in features:
+            typ = feat["type"]
+            if typ in PUNTO_TIPOS or not feat["coords"]:
+                continue
+            fid = feat["id"]
+            vigentes.add(fid)
+
+            piramide = self.lod_cache.get(feat, closed=typ in POLIGONO_TIPOS)
+            previo = self._items.get(fid)
+            if previo is not None and previo[0] == typ and previo[1] is piramide:
+                continue  # sin cambios: el item se queda como está
+
+            levels = GeometryBuilder.lod_paths_from_feature(feat, self.lod_cache)
+            if previo is not None:
+                item = previo[2]
+                item.setPen(GeometryBuilder._pen(typ))
+                item.set_levels(levels, pixel_size)
+            else:
+                item = LODPathItem(levels, GeometryBuilder._pen(typ))
+                item.set_pixel_size(pixel_size)
+                self.scene.addItem(item)
+            self._items[fid] = (typ, piramide, item)
+
+        for fid in [f for f in self._items if f not in vigentes]:
+            self.scene.removeItem(self._items.pop(fid)[2])
+        self.lod_cache.prune(vigentes)
+
+    def _sync_puntos(self, features: list[dict], point_size: float, show_points: bool) -> bool:
+        ids, coords = [], []
+        if show_points:
+            for feat in features:
+                if feat["type"] in PUNTO_TIPOS and feat["coords"]:
+                    ids.append(feat.get("id", ""))
+                    coords.append(tuple(feat["coords"][0]))
+
+        if self._capa is None:
+            self._capa = PointLayerItem(point_size, Qt.red)
+            self._capa.setZValue(1)
+            self.scene.addItem(self._capa)
+        elif self._capa.size() != point_size:
+            self._capa.set_size(point_size)
+
+        if (ids, coords) == self._puntos:
+            return False
+        self._puntos = (ids, coords)
+        self._capa.set_points(ids, coords)
+        return True
+
+    def clear(self):
+        """Quita de la escena todos los items registrados."""
+        for _, _, item in self._items.values():
+            self.scene.removeItem(item)
+        self._items.clear()
+        if self._capa is not None:
+            self.scene.removeItem(self._capa)
+            self._capa = None
+        self._puntos = ([], [])
+        self.lod_cache.clear()
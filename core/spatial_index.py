@@ -0,0 +1,393 @@
+# core/spatial_index.py
+"""
+Índices espaciales sobre cajas envolventes (minx, miny, maxx, maxy).
+
+- STRTree: R-tree empaquetado con Sort-Tile-Recursive; se construye de una
+  vez con todas las entradas (carga masiva) y no admite cambios.
+- GridIndex: rejilla regular que admite altas y bajas una a una; el vecino
+  más cercano se busca por anillos de celdas alrededor del punto.
+- SpatialIndex: combina ambos. Las ediciones van a la rejilla y marcan como
+  obsoletas sus entradas del árbol; cuando la rejilla crece demasiado, el
+  árbol se reconstruye en la siguiente consulta.
+
+También incluye las distancias exactas punto-geometría que usan las
+consultas de CoordinateManager.
+"""
+import heapq
+import math
+
+INF = float("inf")
+
+
+def feature_bbox(coords: list[tuple[float, float]]) -> tuple[float, float, float, float]:
+    xs = [c[0] for c in coords]
+    ys = [c[1] for c in coords]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def bbox_distance(x: float, y: float, bbox) -> float:
+    """Distancia del punto a la caja (0 si está dentro)."""
+    dx = max(bbox[0] - x, 0.0, x - bbox[2])
+    dy = max(bbox[1] - y, 0.0, y - bbox[3])
+    return math.hypot(dx, dy)
+
+
+def segment_distance(px, py, ax, ay, bx, by) -> float:
+    dx, dy = bx - ax, by - ay
+    seg2 = dx * dx + dy * dy
+    if seg2 == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def point_in_ring(x: float, y: float, ring: list[tuple[float, float]]) -> bool:
+    """Prueba par-impar de punto en anillo (cerrado o no)."""
+    dentro = False
+    n = len(ring)
+    j = n - 1
+    for i in range(n):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            dentro = not dentro
+        j = i
+    return dentro
+
+
+def geometry_distance(coords: list[tuple[float, float]], x: float, y: float, closed: bool = False) -> float:
+    """
+    Distancia exacta de (x, y) a un punto, polilínea o anillo (closed=True).
+    Para anillos es 0 si el punto está dentro.
+    """
+    if len(coords) == 1:
+        return math.hypot(x - coords[0][0], y - coords[0][1])
+    if closed and point_in_ring(x, y, coords):
+        return 0.0
+    pares = zip(coords, coords[1:] + coords[:1]) if closed else zip(coords, coords[1:])
+    return min(segment_distance(x, y, a[0], a[1], b[0], b[1]) for a, b in pares)
+
+
+def _intersecta(a, minx, miny, maxx, maxy) -> bool:
+    return a[0] <= maxx and a[2] >= minx and a[1] <= maxy and a[3] >= miny
+
+
+def _union(cajas):
+    return (
+        min(c[0] for c in cajas), min(c[1] for c in cajas),
+        max(c[2] for c in cajas), max(c[3] for c in cajas),
+    )
+
+
+class STRTree:
+    """
+    R-tree de sólo lectura construido con Sort-Tile-Recursive.
+
+    Cada nodo es una tupla (caja, hijos, es_hoja); en las hojas los hijos
+    son las entradas (clave, caja).
+    """
+
+    def __init__(self, entries: list[tuple[object, tuple]], node_capacity: int = 16):
+        self.node_capacity = node_capacity
+        self._n = len(entries)
+        self._raiz = None
+        if not entries:
+            return
+
+        nodos = [(_union([e[1] for e in grupo]), grupo, True)
+                 for grupo in self._empaquetar(list(entries))]
+        while len(nodos) > 1:
+            nodos = [(_union([n[0] for n in grupo]), grupo, False)
+                     for grupo in self._empaquetar(nodos, caja=lambda n: n[0])]
+        self._raiz = nodos[0]
+
+    def _empaquetar(self, items, caja=lambda e: e[1]):
+        """Agrupa los items en bloques de node_capacity vecinos en el plano."""
+        m = self.node_capacity
+        paginas = math.ceil(len(items) / m)
+        franjas = math.ceil(math.sqrt(paginas))
+        por_franja = franjas * m
+        items.sort(key=lambda it: caja(it)[0] + caja(it)[2])
+        grupos = []
+        for i in range(0, len(items), por_franja):
+            franja = sorted(items[i:i + por_franja], key=lambda it: caja(it)[1] + caja(it)[3])
+            grupos.extend(franja[j:j + m] for j in range(0, len(franja), m))
+        return grupos
+
+    def __len__(self):
+        return self._n
+
+    def query(self, minx: float, miny: float, maxx: float, maxy: float) -> list:
+        """Claves cuyas cajas intersectan el rectángulo."""
+        if self._raiz is None:
+            return []
+        salida = []
+        pila = [self._raiz]
+        while pila:
+            caja, hijos, es_hoja = pila.pop()
+            if not _intersecta(caja, minx, miny, maxx, maxy):
+                continue
+            if es_hoja:
+                salida.extend(k for k, c in hijos if _intersecta(c, minx, miny, maxx, maxy))
+            else:
+                pila.extend(hijos)
+        return salida
+
+    def nearest(self, x: float, y: float, distance=None, max_distance: float = INF, accept=None):
+        """
+        Entrada más cercana a (x, y), recorriendo primero los nodos más
+        próximos (best-first).
+
+        Args:
+            distance: Función clave -> distancia exacta; por defecto la
+                      distancia a la caja. Nunca debe ser menor que ella.
+            max_distance: No buscar más allá de esta distancia.
+            accept: Función clave -> bool para descartar entradas.
+
+        Returns:
+            (clave, distancia), o (None, inf) si no hay ninguna.
+        """
+        if self._raiz is None:
+            return None, INF
+        orden = 0
+        heap = [(bbox_distance(x, y, self._raiz[0]), orden, 0, self._raiz)]
+        while heap:
+            d, _, tipo, obj = heapq.heappop(heap)
+            if d > max_distance:
+                break
+            if tipo == 2:
+                return obj, d
+            if tipo == 1:
+                # entrada con cota por caja: calcular la distancia exacta
+                if distance is not None:
+                    orden += 1
+                    heapq.heappush(heap, (distance(obj), orden, 2, obj))
+                    continue
+                return obj, d
+            caja, hijos, es_hoja = obj
+            for h in hijos:
+                orden += 1
+                if es_hoja:
+                    if accept is None or accept(h[0]):
+                        heapq.heappush(heap, (bbox_distance(x, y, h[1]), orden, 1, h[0]))
+                else:
+                    heapq.heappush(heap, (bbox_distance(x, y, h[0]), orden, 0, h))
+        return None, INF
+
+
+class GridIndex:
+    """
+    Rejilla regular para altas y bajas incrementales. Las cajas que
+    abarcan demasiadas celdas se guardan aparte y se prueban siempre.
+    """
+
+    MAX_CELDAS = 64
+
+    def __init__(self, cell_size: float = 100.0):
+        self.cell_size = cell_size
+        self._celdas = {}
+        self._grandes = set()
+        self._cajas = {}
+
+    def __len__(self):
+        return len(self._cajas)
+
+    def __contains__(self, key):
+        return key in self._cajas
+
+    def _rango(self, minx, miny, maxx, maxy):
+        cs = self.cell_size
+        return math.floor(minx / cs), math.floor(miny / cs), math.floor(maxx / cs), math.floor(maxy / cs)
+
+    def insert(self, key, bbox):
+        if key in self._cajas:
+            self.remove(key)
+        self._cajas[key] = bbox
+        ix0, iy0, ix1, iy1 = self._rango(*bbox)
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > self.MAX_CELDAS:
+            self._grandes.add(key)
+            return
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                self._celdas.setdefault((ix, iy), set()).add(key)
+
+    def remove(self, key):
+        bbox = self._cajas.pop(key, None)
+        if bbox is None:
+            return
+        if key in self._grandes:
+            self._grandes.discard(key)
+            return
+        ix0, iy0, ix1, iy1 = self._rango(*bbox)
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                celda = self._celdas.get((ix, iy))
+                if celda is not None:
+                    celda.discard(key)
+                    if not celda:
+                        del self._celdas[(ix, iy)]
+
+    def query(self, minx: float, miny: float, maxx: float, maxy: float) -> set:
+        ix0, iy0, ix1, iy1 = self._rango(minx, miny, maxx, maxy)
+        candidatos = set(self._grandes)
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > len(self._celdas):
+            for (ix, iy), claves in self._celdas.items():
+                if ix0 <= ix <= ix1 and iy0 <= iy <= iy1:
+                    candidatos |= claves
+        else:
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    claves = self._celdas.get((ix, iy))
+                    if claves:
+                        candidatos |= claves
+        return {k for k in candidatos if _intersecta(self._cajas[k], minx, miny, maxx, maxy)}
+
+    def items(self):
+        return self._cajas.items()
+
+    def nearest(self, x: float, y: float, distance=None, max_distance: float = INF, accept=None):
+        """
+        Entrada más cercana a (x, y), como STRTree.nearest. Recorre las
+        celdas en anillos alrededor de la del punto y se detiene cuando el
+        anillo siguiente ya está más lejos que la mejor encontrada.
+        """
+        mejor, mejor_d = None, INF
+        vistas = set()
+
+        def probar(claves):
+            nonlocal mejor, mejor_d
+            for k in claves:
+                if k in vistas:
+                    continue
+                vistas.add(k)
+                if accept is not None and not accept(k):
+                    continue
+                caja = self._cajas[k]
+                if bbox_distance(x, y, caja) > min(mejor_d, max_distance):
+                    continue
+                d = distance(k) if distance is not None else bbox_distance(x, y, caja)
+                if d < mejor_d and d <= max_distance:
+                    mejor, mejor_d = k, d
+
+        probar(self._grandes)
+        if not self._celdas:
+            return mejor, mejor_d
+        cs = self.cell_size
+        cx, cy = math.floor(x / cs), math.floor(y / cs)
+        r = 0
+        while True:
+            # distancia mínima del punto a las celdas del anillo r
+            if r > 0:
+                cota = min(x - (cx - r + 1) * cs, (cx + r) * cs - x, y - (cy - r + 1) * cs, (cy + r) * cs - y)
+                if cota > min(mejor_d, max_distance):
+                    break
+            if (2 * r + 1) ** 2 > len(self._celdas):
+                # el anillo ya abarca más celdas que las ocupadas: recorrer las que faltan
+                for (ix, iy), claves in self._celdas.items():
+                    if max(abs(ix - cx), abs(iy - cy)) >= r:
+                        probar(claves)
+                break
+            if r == 0:
+                anillo = [(cx, cy)]
+            else:
+                anillo = [(ix, cy - r) for ix in range(cx - r, cx + r + 1)]
+                anillo += [(ix, cy + r) for ix in range(cx - r, cx + r + 1)]
+                anillo += [(cx - r, iy) for iy in range(cy - r + 1, cy + r)]
+                anillo += [(cx + r, iy) for iy in range(cy - r + 1, cy + r)]
+            for celda in anillo:
+                claves = self._celdas.get(celda)
+                if claves:
+                    probar(claves)
+            r += 1
+        return mejor, mejor_d
+
+    def clear(self):
+        self._celdas.clear()
+        self._grandes.clear()
+        self._cajas.clear()
+
+
+class SpatialIndex:
+    """
+    Índice de claves con caja envolvente que combina un STRTree (carga
+    masiva) con una GridIndex (ediciones).
+    """
+
+    # Ediciones pendientes a partir de las cuales se reconstruye el árbol
+    MIN_RECONSTRUIR = 256
+
+    def __init__(self):
+        self._cajas = {}
+        self._arbol = STRTree([])
+        self._rejilla = GridIndex()
+        # claves del árbol que se borraron o movieron desde la construcción
+        self._obsoletas = set()
+
+    def __len__(self):
+        return len(self._cajas)
+
+    def bbox(self, key):
+        return self._cajas.get(key)
+
+    def bulk_load(self, entries: list[tuple[object, tuple]]):
+        self._cajas = dict(entries)
+        self._reconstruir()
+
+    def insert(self, key, bbox):
+        if key in self._cajas:
+            self.remove(key)
+        self._cajas[key] = bbox
+        self._rejilla.insert(key, bbox)
+
+    def remove(self, key):
+        if self._cajas.pop(key, None) is None:
+            return
+        if key in self._rejilla:
+            self._rejilla.remove(key)
+        # puede seguir en el árbol aunque también haya pasado por la rejilla
+        self._obsoletas.add(key)
+
+    def clear(self):
+        self._cajas.clear()
+        self._arbol = STRTree([])
+        self._rejilla.clear()
+        self._obsoletas.clear()
+
+    def _reconstruir(self):
+        entradas = list(self._cajas.items())
+        self._arbol = STRTree(entradas)
+        self._obsoletas.clear()
+        celda = 100.0
+        if entradas:
+            minx, miny, maxx, maxy = _union([c for _, c in entradas])
+            area = max((maxx - minx) * (maxy - miny), 1e-12)
+            celda = max(math.sqrt(4 * area / len(entradas)), 1e-6)
+        self._rejilla = GridIndex(celda)
+
+    def _mantener(self):
+        pendientes = len(self._rejilla) + len(self._obsoletas)
+        if pendientes > max(self.MIN_RECONSTRUIR, len(self._arbol) // 4):
+            self._reconstruir()
+
+    def query(self, minx: float, miny: float, maxx: float, maxy: float) -> list:
+        """Claves cuyas cajas intersectan el rectángulo."""
+        self._mantener()
+        obsoletas = self._obsoletas
+        salida = [k for k in self._arbol.query(minx, miny, maxx, maxy) if k not in obsoletas]
+        salida.extend(self._rejilla.query(minx, miny, maxx, maxy))
+        return salida
+
+    def nearest(self, x: float, y: float, distance=None, max_distance: float = INF, accept=None):
+        """Igual que STRTree.nearest, considerando también las ediciones."""
+        self._mantener()
+        obsoletas = self._obsoletas
+
+        def aceptar(k):
+            return k not in obsoletas and (accept is None or accept(k))
+
+        mejor, mejor_d = self._arbol.nearest(x, y, distance, max_distance, aceptar)
+        # en la rejilla sólo interesa lo que mejore al árbol
+        k, d = self._rejilla.nearest(x, y, distance, min(mejor_d, max_distance), accept)
+        if k is not None and d < mejor_d:
+            return k, d
+        return mejor, mejor_d
@@ -0,0 +1,96 @@
+# core/store_model.py
+"""
+Modelo de tabla sobre un FeatureStore (.gwdb) o un ProjectFile (.gwz) que
+lee las filas por ventanas.
+
+La vista sólo pide los datos de las filas visibles; el modelo los trae de
+la base de a PAGE_ROWS filas y conserva las MAX_PAGES páginas usadas más
+recientemente, así la memoria no depende del tamaño del proyecto. Las
+ediciones de X/Y se escriben directamente en la base; un .gwz (mapeado en
+sólo lectura) no se edita.
+"""
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+def _texto(v) -> str:
+    if v is None:
+        return ""
+    return f"{v:.15g}" if isinstance(v, float) else str(v)
+
+
+class StoreTableModel(QAbstractTableModel):
+    PAGE_ROWS = 512
+    MAX_PAGES = 64
+    HEADERS = ["ID", "X (Este)", "Y (Norte)"]
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._paginas = OrderedDict()
+        self._filas = store.vertex_count()
+
+    def _pagina(self, n: int) -> list[list]:
+        pagina = self._paginas.get(n)
+        if pagina is None:
+            pagina = [list(f) for f in self.store.rows(n * self.PAGE_ROWS, self.PAGE_ROWS)]
+            self._paginas[n] = pagina
+            if len(self._paginas) > self.MAX_PAGES:
+                self._paginas.popitem(last=False)
+        else:
+            self._paginas.move_to_end(n)
+        return pagina
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._filas
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        pagina, i = divmod(index.row(), self.PAGE_ROWS)
+        fila = self._pagina(pagina)
+        return _texto(fila[i][index.column()]) if i < len(fila) else None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        # como en la tabla principal, el ID no se edita
+        if index.column() == 0 or self.store.read_only:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() == 0 or self.store.read_only:
+            return False
+        try:
+            v = float(str(value).strip().replace(",", "."))
+        except ValueError:
+            return False
+        r, c = index.row(), index.column()
+        if c == 1:
+            self.store.set_vertex(r, x=v)
+        else:
+            self.store.set_vertex(r, y=v)
+        pagina, i = divmod(r, self.PAGE_ROWS)
+        if pagina in self._paginas:
+            self._paginas[pagina][i][c] = v
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def refresh(self):
+        """Vuelve a leer la base (tras cambios hechos fuera del modelo)."""
+        self.beginResetModel()
+        self._paginas.clear()
+        self._filas = self.store.vertex_count()
+        self.endResetModel()
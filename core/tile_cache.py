@@ -0,0 +1,57 @@
+# core/tile_cache.py
+from collections import OrderedDict
+
+
+class TileCache:
+    """
+    Caché LRU de teselas raster con límite de memoria.
+
+    Las claves son (nivel, tx, ty): el nivel identifica la escala del lienzo
+    y (tx, ty) la posición de la tesela en la rejilla de ese nivel. Al superar
+    el presupuesto de bytes se descartan primero las teselas menos usadas.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._teselas = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def _tam(pixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth() // 8, 1)
+
+    def get(self, key):
+        pixmap = self._teselas.get(key)
+        if pixmap is not None:
+            self._teselas.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        previo = self._teselas.pop(key, None)
+        if previo is not None:
+            self._bytes -= self._tam(previo)
+        self._teselas[key] = pixmap
+        self._bytes += self._tam(pixmap)
+        self._evict()
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._teselas:
+            _, pixmap = self._teselas.popitem(last=False)
+            self._bytes -= self._tam(pixmap)
+
+    def levels(self) -> set:
+        return {key[0] for key in self._teselas}
+
+    def used_bytes(self) -> int:
+        return self._bytes
+
+    def clear(self):
+        self._teselas.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._teselas)
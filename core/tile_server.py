@@ -0,0 +1,216 @@
+# core/tile_server.py
+"""
+Servidor local del mapa base a través del esquema geowizard://.
+
+    geowizard://app/<ruta>              archivos de la aplicación (map_base.html,
+                                        web/leaflet/...), sin depender de un CDN
+    geowizard://tiles/{z}/{x}/{y}.png   teselas OSM desde la caché MBTiles; las
+                                        que faltan se descargan una sola vez
+    geowizard://app/vector/{z}/{x}/{y}  teselas vectoriales del proyecto
+                                        (mismo origen que la página)
+
+El esquema debe registrarse con core.web_scheme.register_scheme() antes de
+crear la QApplication; el manejador se instala luego en el perfil de la
+página.
+"""
+import os
+
+from PySide6.QtCore import QObject, QBuffer, QIODevice, QUrl, Signal
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+from PySide6.QtWebEngineCore import QWebEngineUrlRequestJob, QWebEngineUrlSchemeHandler
+from shiboken6 import isValid
+
+from core.mbtiles import count_tiles, tiles_in_bbox
+OSM_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+# La política de uso de OSM exige identificar la aplicación
+USER_AGENT = b"GeoWizard/1.0 (+https://github.com/OsCCastro/GeoWizard)"
+# Tope de teselas por descarga previa (la descarga masiva no está permitida por OSM)
+MAX_SEED_TILES = 20000
+
+_MIME = {
+    ".html": b"text/html",
+    ".js": b"application/javascript",
+    ".css": b"text/css",
+    ".png": b"image/png",
+    ".svg": b"image/svg+xml",
+}
+
+
+class TileSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Atiende las peticiones geowizard:// de la vista web.
+
+    Las peticiones de una tesela que ya se está descargando esperan a la
+    misma descarga en lugar de repetirla.
+    """
+
+    # (z, x, y, correcta) tras cada descarga
+    tileFetched = Signal(int, int, int, bool)
+
+    def __init__(self, cache, root: str, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.root = os.path.abspath(root)
+        self.upstream = OSM_URL
+        # sin conexión: sólo se sirven las teselas ya guardadas
+        self.offline = False
+        # función (z, x, y) -> bytes para las teselas vectoriales
+        self.vector_source = None
+        self._red = QNetworkAccessManager(self)
+        self._descargas = {}
+        self._esperando = {}
+
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        partes = [p for p in url.path().split("/") if p]
+        if url.host() == "app" and partes[:1] == ["vector"]:
+            self._servir_vector(job, partes[1:])
+        elif url.host() == "app":
+            self._servir_archivo(job, partes)
+        elif url.host() == "tiles":
+            self._servir_tesela(job, partes)
+        else:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+
+    @staticmethod
+    def _responder(job, mime: bytes, data: bytes):
+        buf = QBuffer(job)
+        buf.setData(data)
+        buf.open(QIODevice.ReadOnly)
+        job.reply(mime, buf)
+
+    def _servir_archivo(self, job, partes):
+        ruta = os.path.abspath(os.path.join(self.root, *partes))
+        if not ruta.startswith(self.root + os.sep) or not os.path.isfile(ruta):
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        mime = _MIME.get(os.path.splitext(ruta)[1].lower(), b"application/octet-stream")
+        with open(ruta, "rb") as f:
+            self._responder(job, mime, f.read())
+
+    @staticmethod
+    def _zxy(job, partes):
+        try:
+            return int(partes[0]), int(partes[1]), int(partes[2].split(".")[0])
+        except (IndexError, ValueError):
+            job.fail(QWebEngineUrlRequestJob.Error.UrlInvalid)
+            return None
+
+    def _servir_vector(self, job, partes):
+        zxy = self._zxy(job, partes)
+        if zxy is None:
+            return
+        if self.vector_source is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        self._responder(job, b"application/octet-stream", self.vector_source(*zxy))
+
+    def _servir_tesela(self, job, partes):
+        zxy = self._zxy(job, partes)
+        if zxy is None:
+            return
+        z, x, y = zxy
+
+        data = self.cache.get(z, x, y)
+        if data is not None:
+            self._responder(job, b"image/png", data)
+            return
+        if self.offline:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        self._esperando.setdefault((z, x, y), []).append(job)
+        self.fetch(z, x, y)
+
+    def fetch(self, z: int, x: int, y: int) -> QNetworkReply:
+        """Descarga la tesela y la guarda en caché; reutiliza la descarga en curso."""
+        clave = (z, x, y)
+        reply = self._descargas.get(clave)
+        if reply is not None:
+            return reply
+        req = QNetworkRequest(QUrl(self.upstream.format(z=z, x=x, y=y)))
+        req.setRawHeader(b"User-Agent", USER_AGENT)
+        reply = self._red.get(req)
+        self._descargas[clave] = reply
+        reply.finished.connect(lambda: self._descargada(reply, clave))
+        return reply
+
+    def _descargada(self, reply, clave):
+        self._descargas.pop(clave, None)
+        ok = reply.error() == QNetworkReply.NetworkError.NoError
+        data = bytes(reply.readAll()) if ok else b""
+        ok = ok and bool(data)
+        reply.deleteLater()
+        if ok:
+            self.cache.put(*clave, data)
+
+        for job in self._esperando.pop(clave, []):
+            # la página pudo cancelar la petición mientras se descargaba
+            if not isValid(job):
+                continue
+            if ok:
+                self._responder(job, b"image/png", data)
+            else:
+                job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+        self.tileFetched.emit(*clave, ok)
+
+
+class TileSeeder(QObject):
+    """
+    Descarga previa de las teselas de una caja entre dos niveles de zoom,
+    con un número limitado de descargas simultáneas. Las teselas que ya
+    están en caché se cuentan como hechas sin descargarlas.
+    """
+
+    progress = Signal(int, int)
+    # número de teselas que fallaron
+    finished = Signal(int)
+
+    def __init__(self, handler: TileSchemeHandler, south: float, west: float,
+                 north: float, east: float, zmin: int, zmax: int,
+                 concurrency: int = 4, parent=None):
+        """
+        Raises:
+            ValueError: Si la caja requiere más de MAX_SEED_TILES teselas.
+        """
+        super().__init__(parent)
+        self.total = count_tiles(south, west, north, east, zmin, zmax)
+        if self.total > MAX_SEED_TILES:
+            raise ValueError(
+                f"La zona requiere {self.total} teselas; el máximo es {MAX_SEED_TILES}. "
+                "Reduzca el zoom máximo o el área."
+            )
+        self._handler = handler
+        self._pendientes = tiles_in_bbox(south, west, north, east, zmin, zmax)
+        self.concurrency = concurrency
+        self.hechas = 0
+        self.errores = 0
+        self._activas = 0
+        self._cancelado = False
+
+    def start(self):
+        self._lanzar()
+
+    def cancel(self):
+        self._cancelado = True
+
+    def _lanzar(self):
+        while not self._cancelado and self._activas < self.concurrency:
+            clave = next(self._pendientes, None)
+            if clave is None:
+                break
+            if self._handler.cache.has(*clave):
+                self.hechas += 1
+                continue
+            self._activas += 1
+            reply = self._handler.fetch(*clave)
+            reply.finished.connect(lambda r=reply: self._terminada(r))
+        self.progress.emit(self.hechas, self.total)
+        if self._activas == 0:
+            self.finished.emit(self.errores)
+
+    def _terminada(self, reply):
+        self._activas -= 1
+        self.hechas += 1
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            self.errores += 1
+        self._lanzar()
@@ -0,0 +1,306 @@
+# core/topology.py
+"""
+Validación topológica de polígonos antes de exportar.
+
+Por cada anillo se detectan:
+- segmentos de longitud cero (vértices consecutivos repetidos),
+- vértices duplicados no consecutivos (el anillo se toca a sí mismo),
+- autointersecciones entre segmentos.
+
+Las autointersecciones se buscan con un barrido (Shamos-Hoey): los
+segmentos se ordenan por sus extremos y sólo se prueban contra sus vecinos
+en el estado del barrido, ordenado por la altura a la que los corta la
+línea de barrido. El estado es un treap (árbol balanceado por prioridades
+al azar) con los vecinos enlazados, así que insertar y retirar cuesta
+O(log n) esperado y el barrido completo O(n log n) en lugar de probar
+todos los pares. La primera intersección (la más a la izquierda) se detecta
+siempre; tras ella el barrido continúa y reporta las demás que encuentra.
+"""
+import random
+
+from core.coordinate_manager import GeometryType
+
+
+class IssueType:
+    AUTOINTERSECCION = "Autointersección"
+    VERTICE_DUPLICADO = "Vértice duplicado"
+    SEGMENTO_NULO = "Segmento de longitud cero"
+
+
+def _orient(ax, ay, bx, by, cx, cy) -> int:
+    v = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (v > 0) - (v < 0)
+
+
+def _en_caja(ax, ay, bx, by, cx, cy) -> bool:
+    return min(ax, bx) <= cx <= max(ax, bx) and min(ay, by) <= cy <= max(ay, by)
+
+
+def segment_intersection(a, b, c, d):
+    """
+    Punto de intersección de los segmentos ab y cd, o None si no se cortan.
+    Si se solapan (colineales) devuelve un extremo del tramo común.
+    """
+    o1 = _orient(*a, *b, *c)
+    o2 = _orient(*a, *b, *d)
+    o3 = _orient(*c, *d, *a)
+    o4 = _orient(*c, *d, *b)
+    if o1 != o2 and o3 != o4 and 0 not in (o1, o2, o3, o4):
+        rx, ry = b[0] - a[0], b[1] - a[1]
+        sx, sy = d[0] - c[0], d[1] - c[1]
+        t = ((c[0] - a[0]) * sy - (c[1] - a[1]) * sx) / (rx * sy - ry * sx)
+        return a[0] + t * rx, a[1] + t * ry
+    for p, q, r, o in ((a, b, c, o1), (a, b, d, o2), (c, d, a, o3), (c, d, b, o4)):
+        if o == 0 and _en_caja(*p, *q, *r):
+            return r
+    return None
+
+
+class _SweepStatus:
+    """
+    Segmentos activos del barrido en un treap indexado por número de
+    segmento. Cada nodo guarda además su anterior y su siguiente en orden,
+    de modo que los vecinos se obtienen sin recorrer el árbol.
+    """
+
+    def __init__(self, n: int, seed: int = 0):
+        azar = random.Random(seed)
+        self.prioridad = [azar.random() for _ in range(n)]
+        self.izq = [-1] * n
+        self.der = [-1] * n
+        self.padre = [-1] * n
+        self.ant = [-1] * n
+        self.sig = [-1] * n
+        self.raiz = -1
+
+    def _rotar(self, u: int):
+        """Sube u un nivel sobre su padre (el orden en el árbol no cambia)."""
+        p = self.padre[u]
+        g = self.padre[p]
+        if self.izq[p] == u:
+            hijo = self.der[u]
+            self.izq[p] = hijo
+            self.der[u] = p
+        else:
+            hijo = self.izq[u]
+            self.der[p] = hijo
+            self.izq[u] = p
+        if hijo != -1:
+            self.padre[hijo] = p
+        self.padre[p] = u
+        self.padre[u] = g
+        if g == -1:
+            self.raiz = u
+        elif self.izq[g] == p:
+            self.izq[g] = u
+        else:
+            self.der[g] = u
+
+    def insert(self, k: int, va_despues) -> None:
+        """Inserta k; va_despues(u) indica si k queda después del segmento u."""
+        self.izq[k] = self.der[k] = -1
+        antes, despues, u, p, a_la_der = -1, -1, self.raiz, -1, False
+        while u != -1:
+            p = u
+            a_la_der = va_despues(u)
+            if a_la_der:
+                antes, u = u, self.der[u]
+            else:
+                despues, u = u, self.izq[u]
+        self.padre[k] = p
+        if p == -1:
+            self.raiz = k
+        elif a_la_der:
+            self.der[p] = k
+        else:
+            self.izq[p] = k
+        self.ant[k], self.sig[k] = antes, despues
+        if antes != -1:
+            self.sig[antes] = k
+        if despues != -1:
+            self.ant[despues] = k
+        while self.padre[k] != -1 and self.prioridad[k] < self.prioridad[self.padre[k]]:
+            self._rotar(k)
+
+    def remove(self, k: int) -> None:
+        antes, despues = self.ant[k], self.sig[k]
+        if antes != -1:
+            self.sig[antes] = despues
+        if despues != -1:
+            self.ant[despues] = antes
+        # bajar k hasta una hoja subiendo el hijo de menor prioridad
+        while self.izq[k] != -1 or self.der[k] != -1:
+            i, d = self.izq[k], self.der[k]
+            if d == -1 or (i != -1 and self.prioridad[i] < self.prioridad[d]):
+                self._rotar(i)
+            else:
+                self._rotar(d)
+        p = self.padre[k]
+        if p == -1:
+            self.raiz = -1
+        elif self.izq[p] == k:
+            self.izq[p] = -1
+        else:
+            self.der[p] = -1
+
+
+def _anillo(coords):
+    """Vértices del anillo sin el de cierre repetido."""
+    pts = [(float(x), float(y)) for x, y in coords]
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    return pts
+
+
+def ring_self_intersections(coords) -> list[tuple[int, int, tuple[float, float]]]:
+    """
+    Autointersecciones de un anillo por barrido.
+
+    El segmento i va del vértice i al i+1 (el último cierra con el 0).
+    Dos segmentos que comparten un extremo sólo se reportan si se solapan
+    más allá de él; los contactos en un vértice repetido los reporta la
+    búsqueda de vértices duplicados.
+
+    Returns:
+        Lista de (i, j, (x, y)) con i < j.
+    """
+    pts = _anillo(coords)
+    n = len(pts)
+    if n < 3:
+        return []
+    # coordenadas relativas al primer vértice para conservar precisión en UTM
+    x0, y0 = pts[0]
+    pts = [(x - x0, y - y0) for x, y in pts]
+
+    izq, der, segs = {}, {}, []
+    for i in range(n):
+        a, b = pts[i], pts[(i + 1) % n]
+        if a == b:
+            continue
+        izq[i], der[i] = (a, b) if a < b else (b, a)
+        segs.append(i)
+
+    def y_en(k, x):
+        (ax, ay), (bx, by) = izq[k], der[k]
+        if bx == ax:
+            return ay
+        return ay + (by - ay) * (x - ax) / (bx - ax)
+
+    def pendiente(k):
+        (ax, ay), (bx, by) = izq[k], der[k]
+        return float("inf") if bx == ax else (by - ay) / (bx - ax)
+
+    hallados = {}
+
+    def probar(k1, k2):
+        par = (min(k1, k2), max(k1, k2))
+        if par in hallados:
+            return
+        a, b = pts[k1], pts[(k1 + 1) % n]
+        c, d = pts[k2], pts[(k2 + 1) % n]
+        comun = {a, b} & {c, d}
+        if comun:
+            s = comun.pop()
+            u = b if a == s else a
+            v = d if c == s else c
+            # comparten extremo: sólo cuenta si vuelven sobre sí mismos
+            if _orient(*s, *u, *v) != 0 or (u[0] - s[0]) * (v[0] - s[0]) + (u[1] - s[1]) * (v[1] - s[1]) <= 0:
+                return
+            p = u if _en_caja(*s, *v, *u) else v
+        else:
+            p = segment_intersection(a, b, c, d)
+            if p is None:
+                return
+        hallados[par] = (p[0] + x0, p[1] + y0)
+
+    # eventos: (x, 0 inserción / 1 retiro, y, segmento)
+    eventos = [(izq[k][0], 0, izq[k][1], k) for k in segs]
+    eventos += [(der[k][0], 1, der[k][1], k) for k in segs]
+    eventos.sort()
+
+    activos = _SweepStatus(n)
+    for x, tipo, y, k in eventos:
+        if tipo == 0:
+            m = pendiente(k)
+
+            def va_despues(u):
+                yu = y_en(u, x)
+                return yu < y or (yu == y and pendiente(u) < m)
+
+            activos.insert(k, va_despues)
+            if activos.ant[k] != -1:
+                probar(activos.ant[k], k)
+            if activos.sig[k] != -1:
+                probar(k, activos.sig[k])
+        else:
+            antes, despues = activos.ant[k], activos.sig[k]
+            activos.remove(k)
+            if antes != -1 and despues != -1:
+                probar(antes, despues)
+
+    return [(i, j, p) for (i, j), p in sorted(hallados.items())]
+
+
+def validate_ring(fid, coords, tolerance: float = 0.0) -> list[dict]:
+    """
+    Problemas topológicos de un anillo.
+
+    Args:
+        tolerance: Longitud por debajo de la cual un segmento se considera nulo.
+
+    Returns:
+        Lista de dicts {id, type, vertices, point, message}; los vértices
+        son índices 0-based en coords.
+    """
+    pts = _anillo(coords)
+    n = len(pts)
+    problemas = []
+
+    def agregar(tipo, vertices, punto, detalle):
+        numeros = ", ".join(str(v + 1) for v in vertices)
+        problemas.append({
+            "id": fid,
+            "type": tipo,
+            "vertices": tuple(vertices),
+            "point": punto,
+            "message": f"Feature {fid}: {tipo.lower()} en vértices {numeros}{detalle}",
+        })
+
+    for i in range(n):
+        a, b = pts[i], pts[(i + 1) % n]
+        if n > 1 and (a == b or (tolerance > 0 and (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 <= tolerance ** 2)):
+            agregar(IssueType.SEGMENTO_NULO, (i, (i + 1) % n), a, "")
+
+    primero = {}
+    for i, p in enumerate(pts):
+        j = primero.setdefault(p, i)
+        if j != i and i - j > 1 and not (j == 0 and i == n - 1):
+            agregar(IssueType.VERTICE_DUPLICADO, (j, i), p, "")
+
+    for i, j, p in ring_self_intersections(pts):
+        agregar(
+            IssueType.AUTOINTERSECCION, (i, (i + 1) % n, j, (j + 1) % n), p,
+            f" ({p[0]:.3f}, {p[1]:.3f})",
+        )
+    return problemas
+
+
+class TopologyValidator:
+    """Validación en lote de los polígonos de un proyecto."""
+
+    @staticmethod
+    def validate(features: list[dict], tolerance: float = 0.0) -> list[dict]:
+        """Problemas de todos los polígonos (ver validate_ring)."""
+        problemas = []
+        for feat in features:
+            if feat.get("type") == GeometryType.POLIGONO:
+                problemas.extend(validate_ring(feat["id"], feat["coords"], tolerance))
+        return problemas
+
+    @staticmethod
+    def summary(issues: list[dict], limit: int = 20) -> str:
+        """Texto con los primeros `limit` problemas, para mostrar al usuario."""
+        lineas = [p["message"] for p in issues[:limit]]
+        if len(issues) > limit:
+            lineas.append(f"... y {len(issues) - limit} más.")
+        return "\n".join(lineas)
@@ -0,0 +1,286 @@
+# core/undo.py
+"""
+Historial de deshacer/rehacer de la tabla de coordenadas basado en deltas.
+
+Cada comando guarda sólo lo que cambió (celdas con su texto anterior y
+nuevo, filas insertadas y filas eliminadas con su contenido), nunca una
+copia de la tabla. Para conocer el texto anterior de una celda se mantiene
+una única copia sombra de las columnas ID/X/Y que se actualiza con cada
+cambio, de modo que su costo no crece con la longitud del historial.
+
+Los cambios se acumulan en el comando abierto hasta commit(); dentro de
+group() no se cierra, así que una operación masiva (pegar, importar,
+eliminar) queda en un solo paso. El historial tiene un presupuesto de
+memoria estimada: al excederlo se descartan los pasos más antiguos, y un
+paso que por sí solo no cabe deja de acumularse en cuanto lo supera (el
+historial anterior ya no es aplicable y se vacía al cerrarlo). Las cargas
+que reemplazan la tabla entera van dentro de suspended(): no se registran
+y al terminar la tabla queda como nuevo punto de partida.
+
+Operaciones de un comando:
+    ("set", fila, columna, anterior, nuevo)
+    ("ins", fila, cantidad)
+    ("del", fila, [[id, x, y], ...])
+"""
+import sys
+from contextlib import contextmanager
+
+COLUMNS = 3
+# Costo fijo estimado por operación (tupla, enteros, referencias)
+_COSTO_OP = 120
+
+
+def _costo_texto(texto: str) -> int:
+    return sys.getsizeof(texto) if texto else 0
+
+
+class UndoCommand:
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.ops = []
+        self.size = 0
+
+    def add(self, op: tuple):
+        self.ops.append(op)
+        if op[0] == "set":
+            self.size += _COSTO_OP + _costo_texto(op[3]) + _costo_texto(op[4])
+        elif op[0] == "del":
+            self.size += _COSTO_OP + sum(
+                _COSTO_OP + sum(_costo_texto(t) for t in fila) for fila in op[2]
+            )
+        else:
+            self.size += _COSTO_OP
+
+
+class TableHistory:
+    """
+    Pila de comandos sobre una tabla accesible por `table_adapter`, un objeto
+    con row_count(), text(r, c), set_text(r, c, texto), insert_rows(r, n) y
+    remove_rows(r, n). `on_change` se llama cada vez que cambia lo que se
+    puede deshacer o rehacer.
+    """
+
+    def __init__(self, table_adapter, budget_bytes: int = 64 * 1024 * 1024, on_change=None):
+        self.table = table_adapter
+        self.budget_bytes = budget_bytes
+        self.on_change = on_change
+        self._undo = []
+        self._redo = []
+        self._abierto = None
+        self._excedido = False
+        self._grupos = 0
+        self._aplicando = False
+        self._suspendido = 0
+        self._bytes = 0
+        self.resync()
+
+    def _notificar(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    # ─── Registro ───
+
+    def resync(self):
+        """Toma la tabla actual como punto de partida (sin historial previo)."""
+        self._sombra = [
+            [self.table.text(r, c) for c in range(COLUMNS)] for r in range(self.table.row_count())
+        ]
+
+    @property
+    def pending(self) -> bool:
+        """True si hay cambios registrados aún sin cerrar en un paso."""
+        return self._abierto is not None or self._excedido
+
+    def _op(self, op: tuple):
+        if self._excedido:
+            return
+        if self._abierto is None:
+            self._abierto = UndoCommand()
+        self._abierto.add(op)
+        if self._abierto.size > self.budget_bytes:
+            # no cabe en el presupuesto: no se sigue acumulando
+            self._abierto = None
+            self._excedido = True
+
+    def cells_changed(self, top: int, left: int, bottom: int, right: int):
+        if self._suspendido:
+            return
+        for r in range(top, bottom + 1):
+            if r >= len(self._sombra):
+                break
+            fila = self._sombra[r]
+            for c in range(left, min(right, COLUMNS - 1) + 1):
+                nuevo = self.table.text(r, c)
+                if nuevo != fila[c]:
+                    if not self._aplicando:
+                        self._op(("set", r, c, fila[c], nuevo))
+                    fila[c] = nuevo
+
+    def rows_inserted(self, first: int, last: int):
+        if self._suspendido:
+            return
+        n = last - first + 1
+        self._sombra[first:first] = [[""] * COLUMNS for _ in range(n)]
+        if not self._aplicando:
+            self._op(("ins", first, n))
+
+    def rows_removed(self, first: int, last: int):
+        if self._suspendido:
+            return
+        filas = self._sombra[first:last + 1]
+        del self._sombra[first:last + 1]
+        if not self._aplicando:
+            self._op(("del", first, filas))
+
+    def reset(self):
+        """La tabla cambió por completo (p. ej. clearContents): registra las
+        diferencias con la sombra como cambios de celda."""
+        if self._suspendido:
+            return
+        n = self.table.row_count()
+        if n > len(self._sombra):
+            self.rows_inserted(len(self._sombra), n - 1)
+        elif n < len(self._sombra):
+            self.rows_removed(n, len(self._sombra) - 1)
+        if n:
+            self.cells_changed(0, 0, n - 1, COLUMNS - 1)
+
+    @contextmanager
+    def suspended(self):
+        """
+        No registra los cambios hechos dentro del bloque (cargas masivas); al
+        salir se vacía el historial y se toma la tabla como punto de partida.
+        """
+        self._suspendido += 1
+        try:
+            yield
+        finally:
+            self._suspendido -= 1
+            if not self._suspendido:
+                self.clear()
+
+    @contextmanager
+    def group(self, text: str = ""):
+        """Todos los cambios dentro del bloque forman un solo paso."""
+        self._grupos += 1
+        try:
+            yield
+        finally:
+            self._grupos -= 1
+            if self._abierto is not None and text and not self._abierto.text:
+                self._abierto.text = text
+            if not self._grupos:
+                self.commit()
+
+    def commit(self):
+        """Cierra el comando abierto y lo apila (salvo dentro de un grupo)."""
+        if self._grupos:
+            return
+        if self._excedido:
+            # la tabla cambió sin un paso que lo deshaga: lo anterior no se
+            # puede aplicar sobre ella
+            self._excedido = False
+            self._undo.clear()
+            self._redo.clear()
+            self._bytes = 0
+            self._notificar()
+            return
+        if self._abierto is None:
+            return
+        comando, self._abierto = self._abierto, None
+        self._undo.append(comando)
+        self._bytes += comando.size
+        for anterior in self._redo:
+            self._bytes -= anterior.size
+        self._redo.clear()
+        self._recortar()
+        self._notificar()
+
+    def _recortar(self):
+        """Descarta los pasos más antiguos mientras se exceda el presupuesto."""
+        while self._undo and self._bytes > self.budget_bytes:
+            self._bytes -= self._undo.pop(0).size
+        while self._redo and self._bytes > self.budget_bytes:
+            self._bytes -= self._redo.pop(0).size
+
+    def set_budget(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._recortar()
+        self._notificar()
+
+    def clear(self):
+        """Vacía el historial y toma la tabla actual como nuevo punto de partida."""
+        self._undo.clear()
+        self._redo.clear()
+        self._abierto = None
+        self._excedido = False
+        self._bytes = 0
+        self.resync()
+        self._notificar()
+
+    # ─── Deshacer / rehacer ───
+
+    def can_undo(self) -> bool:
+        return bool(self._undo) or self._abierto is not None
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo_text(self) -> str:
+        return self._undo[-1].text if self._undo else ""
+
+    def redo_text(self) -> str:
+        return self._redo[-1].text if self._redo else ""
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return len(self._undo)
+
+    def _aplicar(self, comando: UndoCommand, deshacer: bool):
+        t = self.table
+        self._aplicando = True
+        try:
+            for op in (reversed(comando.ops) if deshacer else comando.ops):
+                tipo = op[0]
+                if tipo == "set":
+                    _, r, c, anterior, nuevo = op
+                    t.set_text(r, c, anterior if deshacer else nuevo)
+                elif (tipo == "ins") == deshacer:
+                    # deshacer una inserción o rehacer una eliminación
+                    r = op[1]
+                    n = op[2] if tipo == "ins" else len(op[2])
+                    t.remove_rows(r, n)
+                else:
+                    # deshacer una eliminación o rehacer una inserción
+                    r = op[1]
+                    filas = op[2] if tipo == "del" else [[""] * COLUMNS] * op[2]
+                    t.insert_rows(r, len(filas))
+                    for i, fila in enumerate(filas):
+                        for c, texto in enumerate(fila):
+                            if texto:
+                                t.set_text(r + i, c, texto)
+        finally:
+            self._aplicando = False
+
+    def undo(self) -> bool:
+        self.commit()
+        if not self._undo:
+            return False
+        comando = self._undo.pop()
+        self._aplicar(comando, deshacer=True)
+        self._redo.append(comando)
+        self._notificar()
+        return True
+
+    def redo(self) -> bool:
+        self.commit()
+        if not self._redo:
+            return False
+        comando = self._redo.pop()
+        self._aplicar(comando, deshacer=False)
+        self._undo.append(comando)
+        self._notificar()
+        return True
@@ -0,0 +1,253 @@
+# core/vector_tiles.py
+"""
+Teselas vectoriales generadas en Python para proyectos muy grandes.
+
+Las líneas y polígonos reproyectados a WGS84 se pasan a Web Mercator
+normalizado una vez por edición. Cada tesela (z, x, y) que pide el mapa se
+arma al vuelo: se simplifica cada geometría a medio píxel del zoom pedido
+(resultado reutilizado entre teselas del mismo zoom), se recorta a la tesela
+con un pequeño margen y se empaqueta con pack_features en píxeles de
+tesela. Las cajas Mercator de los features van en un SpatialIndex, así
+cada tesela sólo prueba los que la tocan. Las teselas ya armadas quedan en
+una caché LRU; al editar sólo se descartan las que tocan la caja vieja o
+nueva de los features cambiados, buscadas por su rango de x/y en cada zoom.
+"""
+import math
+from collections import OrderedDict
+
+from core.binary_codec import pack_features, TIPO_POLIGONO
+from core.clustering import TILE_SIZE, mercator_unit
+from core.lod import simplify_douglas_peucker
+from core.spatial_index import SpatialIndex
+
+# Margen de recorte alrededor de cada tesela, en píxeles, para que los
+# trazos no se corten visiblemente en los bordes
+MARGEN_PX = 8
+
+
+def _clip_segmento(ax, ay, bx, by, x0, y0, x1, y1):
+    """Recorta un segmento a la caja (Liang-Barsky). None si queda fuera."""
+    dx, dy = bx - ax, by - ay
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, ax - x0), (dx, x1 - ax), (-dy, ay - y0), (dy, y1 - ay)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        r = q / p
+        if p < 0:
+            if r > t1:
+                return None
+            t0 = max(t0, r)
+        else:
+            if r < t0:
+                return None
+            t1 = min(t1, r)
+    a = (ax + t0 * dx, ay + t0 * dy) if t0 > 0 else (ax, ay)
+    b = (ax + t1 * dx, ay + t1 * dy) if t1 < 1 else (bx, by)
+    return a, b
+
+
+def clip_polyline(coords, x0, y0, x1, y1) -> list[list[tuple[float, float]]]:
+    """Recorta una polilínea a la caja; puede devolver varios tramos."""
+    partes, actual = [], []
+    for (ax, ay), (bx, by) in zip(coords, coords[1:]):
+        seg = _clip_segmento(ax, ay, bx, by, x0, y0, x1, y1)
+        if seg is None:
+            if len(actual) > 1:
+                partes.append(actual)
+            actual = []
+            continue
+        a, b = seg
+        if not actual or actual[-1] != a:
+            if len(actual) > 1:
+                partes.append(actual)
+            actual = [a]
+        actual.append(b)
+        # el segmento sale de la caja: el tramo termina aquí
+        if b != (bx, by):
+            partes.append(actual)
+            actual = []
+    if len(actual) > 1:
+        partes.append(actual)
+    return partes
+
+
+def clip_polygon(coords, x0, y0, x1, y1) -> list[tuple[float, float]]:
+    """Recorta un anillo a la caja (Sutherland-Hodgman)."""
+    pts = list(coords)
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    for eje, limite, es_maximo in ((0, x0, False), (0, x1, True), (1, y0, False), (1, y1, True)):
+        if not pts:
+            break
+        entrada, pts = pts, []
+        prev = entrada[-1]
+        prev_dentro = prev[eje] <= limite if es_maximo else prev[eje] >= limite
+        for cur in entrada:
+            cur_dentro = cur[eje] <= limite if es_maximo else cur[eje] >= limite
+            if cur_dentro != prev_dentro:
+                t = (limite - prev[eje]) / (cur[eje] - prev[eje])
+                pts.append((prev[0] + t * (cur[0] - prev[0]), prev[1] + t * (cur[1] - prev[1])))
+            if cur_dentro:
+                pts.append(cur)
+            prev, prev_dentro = cur, cur_dentro
+    return pts
+
+
+class VectorTiler:
+    """
+    Fuente de teselas vectoriales para líneas y polígonos.
+
+    `update` recibe los registros vigentes (id, tipo binario, coords lon/lat);
+    un feature se considera sin cambios mientras se reciba la misma lista de
+    coordenadas (MapBridge las reutiliza mientras no cambien).
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # fid -> (lonlat, tipo, coords mercator, caja mercator, caja lon/lat)
+        self._feats = {}
+        # fid -> caja mercator, para elegir los features de cada tesela
+        self._indice = SpatialIndex()
+        # fid -> {zoom: coords simplificadas}
+        self._simplificadas = {}
+        self._teselas = OrderedDict()
+        self._bytes = 0
+        self.revision = 0
+
+    def __len__(self):
+        return len(self._feats)
+
+    def update(self, registros: list[tuple[int, int, list[tuple[float, float]]]]) -> bool:
+        """
+        Sincroniza los features y descarta las teselas afectadas.
+
+        Returns:
+            True si algo cambió (y `revision` aumentó).
+        """
+        cajas, vigentes = [], set()
+        for fid, tipo, lonlat in registros:
+            vigentes.add(fid)
+            previo = self._feats.get(fid)
+            if previo is not None and previo[0] is lonlat and previo[1] == tipo:
+                continue
+            merc = [mercator_unit(lon, lat) for lon, lat in lonlat]
+            xs = [p[0] for p in merc]
+            ys = [p[1] for p in merc]
+            caja = (min(xs), min(ys), max(xs), max(ys))
+            lons = [c[0] for c in lonlat]
+            lats = [c[1] for c in lonlat]
+            geo = (min(lats), min(lons), max(lats), max(lons))
+            if previo is not None:
+                cajas.append(previo[3])
+            cajas.append(caja)
+            self._feats[fid] = (lonlat, tipo, merc, caja, geo)
+            self._indice.insert(fid, caja)
+            self._simplificadas.pop(fid, None)
+
+        for fid in [f for f in self._feats if f not in vigentes]:
+            cajas.append(self._feats.pop(fid)[3])
+            self._indice.remove(fid)
+            self._simplificadas.pop(fid, None)
+
+        if not cajas:
+            return False
+        self._invalidar(cajas)
+        self.revision += 1
+        return True
+
+    @staticmethod
+    def _caja_tesela(z: int, x: int, y: int):
+        n = 2 ** z
+        m = MARGEN_PX / (TILE_SIZE * n)
+        return x / n - m, y / n - m, (x + 1) / n + m, (y + 1) / n + m
+
+    def _invalidar(self, cajas):
+        if not self._teselas:
+            return
+        descartar = set()
+        for z in {clave[0] for clave in self._teselas}:
+            n = 2 ** z
+            m = MARGEN_PX / (TILE_SIZE * n)
+            en_zoom = None
+            for bx0, by0, bx1, by1 in cajas:
+                # teselas cuya caja (con margen) toca la caja cambiada
+                x0 = max(math.floor((bx0 - m) * n), 0)
+                x1 = min(math.floor((bx1 + m) * n), n - 1)
+                y0 = max(math.floor((by0 - m) * n), 0)
+                y1 = min(math.floor((by1 + m) * n), n - 1)
+                if x1 < x0 or y1 < y0:
+                    continue
+                if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(self._teselas):
+                    descartar.update(
+                        (z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)
+                        if (z, x, y) in self._teselas
+                    )
+                    continue
+                # caja más grande que la caché: probar las teselas guardadas de este zoom
+                if en_zoom is None:
+                    en_zoom = [clave for clave in self._teselas if clave[0] == z]
+                descartar.update(
+                    clave for clave in en_zoom if x0 <= clave[1] <= x1 and y0 <= clave[2] <= y1
+                )
+        for clave in descartar:
+            self._bytes -= len(self._teselas.pop(clave))
+
+    def _simplificada(self, fid: int, merc, z: int):
+        por_zoom = self._simplificadas.setdefault(fid, {})
+        coords = por_zoom.get(z)
+        if coords is None:
+            coords = simplify_douglas_peucker(merc, 0.5 / (TILE_SIZE * 2 ** z))
+            por_zoom[z] = coords
+        return coords
+
+    def tile(self, z: int, x: int, y: int) -> bytes:
+        """Tesela (z, x, y) empaquetada con pack_features, en píxeles de tesela."""
+        clave = (z, x, y)
+        data = self._teselas.get(clave)
+        if data is not None:
+            self._teselas.move_to_end(clave)
+            return data
+
+        escala = TILE_SIZE * 2 ** z
+        ox, oy = x * TILE_SIZE, y * TILE_SIZE
+        cx0, cy0, cx1, cy1 = self._caja_tesela(z, x, y)
+        salida = []
+        for fid in sorted(self._indice.query(cx0, cy0, cx1, cy1)):
+            _, tipo, merc, _, _ = self._feats[fid]
+            coords = self._simplificada(fid, merc, z)
+            if tipo == TIPO_POLIGONO:
+                anillo = clip_polygon(coords, cx0, cy0, cx1, cy1)
+                partes = [anillo] if len(anillo) >= 3 else []
+            else:
+                partes = clip_polyline(coords, cx0, cy0, cx1, cy1)
+            for parte in partes:
+                salida.append((fid, tipo, [(px * escala - ox, py * escala - oy) for px, py in parte]))
+
+        data = pack_features(salida, 4)
+        self._teselas[clave] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes and len(self._teselas) > 1:
+            _, viejo = self._teselas.popitem(last=False)
+            self._bytes -= len(viejo)
+        return data
+
+    def bounds(self):
+        """(sur, oeste, norte, este) de todos los features, o None si no hay."""
+        if not self._feats:
+            return None
+        cajas = [f[4] for f in self._feats.values()]
+        return (
+            min(c[0] for c in cajas), min(c[1] for c in cajas),
+            max(c[2] for c in cajas), max(c[3] for c in cajas),
+        )
+
+    def clear(self):
+        if self._feats:
+            self.revision += 1
+        self._feats.clear()
+        self._indice.clear()
+        self._simplificadas.clear()
+        self._teselas.clear()
+        self._bytes = 0
@@ -0,0 +1,23 @@
+# core/web_scheme.py
+"""
+Registro del esquema geowizard:// del mapa base.
+
+Va aparte de core.tile_server porque se llama al arrancar, antes de crear
+la QApplication: sólo carga QWebEngineUrlScheme, no el servidor de teselas
+(QtNetwork, caché MBTiles), que se importa al activar el mapa base.
+"""
+from PySide6.QtWebEngineCore import QWebEngineUrlScheme
+
+SCHEME = b"geowizard"
+
+
+def register_scheme():
+    """Registra geowizard:// en QtWebEngine. Llamar antes de crear QApplication."""
+    esquema = QWebEngineUrlScheme(SCHEME)
+    esquema.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    esquema.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.LocalAccessAllowed
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(esquema)
@@ -0,0 +1,28 @@
+# exporters/csv_exporter.py
+import csv
+
+
+class CSVExporter:
+    # Misma cabecera que la exportación CSV de la tabla en la GUI
+    HEADER = ["id", "x (este)", "y (norte)"]
+
+    @staticmethod
+    def export(features: list[dict], filename: str, delimiter: str = ","):
+        """
+        Exporta features a CSV con columnas id, x (este), y (norte), en el
+        formato que la GUI importa. Los puntos ocupan una fila; polilíneas y
+        polígonos, una fila por vértice con el ID del feature.
+        """
+        if not features:
+            raise ValueError("No hay geometrías para exportar.")
+
+        try:
+            with open(filename, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f, delimiter=delimiter)
+                writer.writerow(CSVExporter.HEADER)
+                for feat in features:
+                    writer.writerows(
+                        (feat["id"], f"{x:.2f}", f"{y:.2f}") for x, y in feat.get("coords", [])
+                    )
+        except OSError as e:
+            raise RuntimeError(f"Error al escribir el archivo CSV '{filename}': {e}")
@@ -1,7 +1,10 @@
 # exporters/kml_exporter.py
 from xml.etree.ElementTree import Element, SubElement, tostring
 from xml.dom import minidom
-from pyproj import Transformer
+
+from core.crs import features_to_wgs84, utm_zone
+from core.metrics import metrics_lines
+from core.queries import attribute_lines
 
 class KMLExporter:
     @staticmethod
@@ -10,7 +13,9 @@ class KMLExporter:
         filename: str,
         hemisphere: str,
         zone: str,
-        html_dict: dict[int, str] = None
+        html_dict: dict[int, str] = None,
+        metrics: dict = None,
+        attributes: dict = None
     ):
         """
         Exporta features a un archivo KML, inyectando en la descripción
@@ -22,14 +27,20 @@ class KMLExporter:
                 "id": valor,            # identificador único del feature
                 "type": tipo_geom,      # "Punto"|"Polilínea"|"Polígono"
                 "coords": [(x1,y1),...] # lista de tuplas UTM
+                "epsg": codigo          # (opcional) zona UTM propia del feature
             }.
             filename: Nombre de archivo KML de salida (debe terminar en .kml).
             hemisphere: "Norte" o "Sur" (string).
-            zone: Número de zona UTM (string o int).
+            zone: Número de zona UTM (string o int) de los features sin "epsg".
             html_dict: (Opcional) Diccionario mapping {feat_id: html_str}.
                        html_str es el bloque de HTML (tabla, párrafos, etc.)
                        que quieres insertar dentro de <description><![CDATA[…]]></description>
                        de ese feature. Si es None o no existe la clave, se usará la descripción UTM.
+            metrics: (Opcional) Métricas {feat_id: dict} de MetricsEngine; se
+                     añaden a la descripción UTM por defecto.
+            attributes: (Opcional) Atributos {feat_id: dict} (p. ej. de
+                        SpatialQueries.feature_attributes); también se añaden
+                        a la descripción UTM por defecto.
 
         Raises:
             ValueError: Si features está vacío, si filename no acaba en ".kml",
@@ -45,6 +56,10 @@ class KMLExporter:
         # Inicializar html_dict si no se pasa
         if html_dict is None:
             html_dict = {}
+        if metrics is None:
+            metrics = {}
+        if attributes is None:
+            attributes = {}
 
         # Validar zona y hemisferio
         try:
@@ -57,15 +72,15 @@ class KMLExporter:
             raise ValueError(f"Error en parámetros de zona/hemisferio: {e}")
 
         try:
-            # 1) Definir transformación UTM -> WGS84
+            # 1) UTM -> WGS84: un solo transform (cacheado) por zona de los features
             epsg_from = 32600 + zone_int if hemisphere.lower() == "norte" else 32700 + zone_int
-            transformer = Transformer.from_crs(f"EPSG:{epsg_from}", "EPSG:4326", always_xy=True)
+            lonlats = features_to_wgs84(features, epsg_from)
 
             # 2) Raíz KML
             kml_root = Element("kml", xmlns="http://www.opengis.net/kml/2.2")
             doc = SubElement(kml_root, "Document")
 
-            for feat in features:
+            for feat, lonlat in zip(features, lonlats):
                 feat_id   = feat.get("id", None)
                 geom_type = feat.get("type", None)
                 coords    = feat.get("coords", None)
@@ -89,11 +104,16 @@ class KMLExporter:
                 else:
                     # Si no hay HTML, generamos descripción UTM simple con coords[0]
                     x0, y0 = coords[0]
+                    hemi_feat, zona_feat = utm_zone(feat["epsg"]) if "epsg" in feat else (hemisphere, zone)
                     desc_text = (
-                        f"Zona: {zone} ({hemisphere})\n"
+                        f"Zona: {zona_feat} ({hemi_feat})\n"
                         f"Este: {x0:.2f} m\n"
                         f"Norte: {y0:.2f} m"
                     )
+                    if feat_id in metrics:
+                        desc_text += "".join("\n" + l for l in metrics_lines(geom_type, metrics[feat_id]))
+                    if feat_id in attributes:
+                        desc_text += "".join("\n" + l for l in attribute_lines(attributes[feat_id]))
                     desc = SubElement(pm, "description")
                     desc.text = f"<![CDATA[{desc_text}]]>"
 
@@ -101,7 +121,7 @@ class KMLExporter:
                 if geom_type == "Punto" or geom_type == "Point":
                     # Sólo un punto
                     geom = SubElement(pm, "Point")
-                    lon, lat = transformer.transform(coords[0][0], coords[0][1])
+                    lon, lat = lonlat[0]
                     SubElement(geom, "coordinates").text = f"{lon:.6f},{lat:.6f},0"
 
                 elif geom_type == "Polilínea" or geom_type == "LineString":
@@ -109,10 +129,7 @@ class KMLExporter:
                     if len(coords) < 2:
                         continue
                     geom = SubElement(pm, "LineString")
-                    coords_text_list = []
-                    for x, y in coords:
-                        lon, lat = transformer.transform(x, y)
-                        coords_text_list.append(f"{lon:.6f},{lat:.6f},0")
+                    coords_text_list = [f"{lon:.6f},{lat:.6f},0" for lon, lat in lonlat]
                     SubElement(geom, "coordinates").text = " ".join(coords_text_list)
 
                 elif geom_type == "Polígono" or geom_type == "Polygon":
@@ -122,12 +139,9 @@ class KMLExporter:
                     poly = SubElement(pm, "Polygon")
                     obb  = SubElement(poly, "outerBoundaryIs")
                     lr   = SubElement(obb, "LinearRing")
-                    coords_text_list = []
                     # Cerrar el anillo agregando la primera coord al final
-                    ring = coords + [coords[0]]
-                    for x, y in ring:
-                        lon, lat = transformer.transform(x, y)
-                        coords_text_list.append(f"{lon:.6f},{lat:.6f},0")
+                    ring = lonlat + [lonlat[0]]
+                    coords_text_list = [f"{lon:.6f},{lat:.6f},0" for lon, lat in ring]
                     SubElement(lr, "coordinates").text = " ".join(coords_text_list)
 
                 else:
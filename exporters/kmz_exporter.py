@@ -1,13 +1,17 @@
 import zipfile
 from xml.etree.ElementTree import Element, SubElement, tostring
 from xml.dom import minidom
-from pyproj import Transformer
+
+from core.crs import features_to_wgs84, utm_zone
+from core.metrics import metrics_lines
+from core.queries import attribute_lines
 
 # from core.coordinate_manager import GeometryType # Si se usan constantes para geom_type
 
 class KMZExporter:
     @staticmethod
-    def _generate_kml_string(features: list[dict], hemisphere: str, zone: str) -> str:
+    def _generate_kml_string(features: list[dict], hemisphere: str, zone: str, metrics: dict = None,
+                             attributes: dict = None) -> str:
         # Esta lógica es una copia adaptada de KMLExporter.export,
         # pero devuelve el string KML en lugar de escribir a archivo.
         # Se podría refactorizar KMLExporter para exponer esta lógica.
@@ -19,13 +23,19 @@ class KMZExporter:
             raise ValueError(f"La zona UTM '{zone}' debe ser un número entero.")
 
         epsg_from = 32600 + z if hemisphere.lower()=="norte" else 32700 + z
-        # always_xy=True asegura (lon, lat) para EPSG:4326
-        transformer = Transformer.from_crs(f"EPSG:{epsg_from}", "EPSG:4326", always_xy=True)
+        # (lon, lat) de cada feature; un transform por zona (los features con
+        # "epsg" propio usan el de su zona)
+        lonlats = features_to_wgs84(features, epsg_from)
+
+        if metrics is None:
+            metrics = {}
+        if attributes is None:
+            attributes = {}
 
         kml = Element("kml", xmlns="http://www.opengis.net/kml/2.2")
         doc = SubElement(kml, "Document")
 
-        for feat in features:
+        for feat, lonlat in zip(features, lonlats):
             if not feat.get("coords"): # Verificar si hay coordenadas
                 # Omitir este feature o manejar error como se prefiera
                 print(f"Advertencia: Feature ID {feat.get('id')} no tiene coordenadas. Se omitirá.")
@@ -37,11 +47,16 @@ class KMZExporter:
             # Descripción UTM
             # Asegurarse de que coords no esté vacío antes de acceder a coords[0]
             x0, y0 = feat["coords"][0]
+            hemi_feat, zona_feat = utm_zone(feat["epsg"]) if "epsg" in feat else (hemisphere, zone)
             desc_text = (
-                f"Zona: {zone} ({hemisphere})\n"
+                f"Zona: {zona_feat} ({hemi_feat})\n"
                 f"Este: {x0:.2f} m\n"
                 f"Norte: {y0:.2f} m"
             )
+            if feat.get("id") in metrics:
+                desc_text += "".join("\n" + l for l in metrics_lines(feat.get("type"), metrics[feat["id"]]))
+            if feat.get("id") in attributes:
+                desc_text += "".join("\n" + l for l in attribute_lines(attributes[feat["id"]]))
             desc = SubElement(pm, "description")
             desc.text = f"<![CDATA[{desc_text}]]>"
 
@@ -53,27 +68,21 @@ class KMZExporter:
                 if not feat["coords"]: continue # Saltear si no hay coords
                 geom = SubElement(pm, "Point")
                 # Point tiene una sola coordenada
-                lon, lat = transformer.transform(feat["coords"][0][0], feat["coords"][0][1])
+                lon, lat = lonlat[0]
                 SubElement(geom, "coordinates").text = f"{lon:.6f},{lat:.6f},0"
             elif geom_type == "Polilínea" or geom_type == "LineString":
                 if len(feat["coords"]) < 2: continue # Saltear si no hay suficientes coords
                 geom = SubElement(pm, "LineString")
-                coords_text_list = []
-                for x,y in feat["coords"]:
-                    lon, lat = transformer.transform(x, y)
-                    coords_text_list.append(f"{lon:.6f},{lat:.6f},0")
+                coords_text_list = [f"{lon:.6f},{lat:.6f},0" for lon, lat in lonlat]
                 SubElement(geom, "coordinates").text = " ".join(coords_text_list)
             elif geom_type == "Polígono" or geom_type == "Polygon":
                 if len(feat["coords"]) < 3: continue # Saltear si no hay suficientes coords
                 poly = SubElement(pm, "Polygon")
                 obb  = SubElement(poly, "outerBoundaryIs")
                 lr   = SubElement(obb, "LinearRing")
-                coords_text_list = []
                 # El cierre del anillo es manejado aquí
-                ring = feat["coords"] + [feat["coords"][0]]
-                for x,y in ring:
-                    lon, lat = transformer.transform(x, y)
-                    coords_text_list.append(f"{lon:.6f},{lat:.6f},0")
+                ring = lonlat + [lonlat[0]]
+                coords_text_list = [f"{lon:.6f},{lat:.6f},0" for lon, lat in ring]
                 SubElement(lr, "coordinates").text = " ".join(coords_text_list)
             else:
                 print(f"Advertencia: Tipo de geometría '{geom_type}' para feature ID {feat.get('id')} no soportado por KMZExporter. Se omitirá.")
@@ -85,7 +94,8 @@ class KMZExporter:
         return parsed_xml.toprettyxml(indent="  ") # Devuelve string (UTF-8 por defecto en Python 3)
 
     @staticmethod
-    def export(features: list[dict], filename: str, hemisphere: str, zone: str):
+    def export(features: list[dict], filename: str, hemisphere: str, zone: str, metrics: dict = None,
+               attributes: dict = None):
         if not features:
             raise ValueError("No hay geometrías para exportar.")
 
@@ -94,7 +104,7 @@ class KMZExporter:
 
         try:
             # Generar el contenido KML como string
-            kml_content_str = KMZExporter._generate_kml_string(features, hemisphere, zone)
+            kml_content_str = KMZExporter._generate_kml_string(features, hemisphere, zone, metrics, attributes)
 
             # El KML string debe ser encodeado a bytes para escribir en el archivo zip
             kml_content_bytes = kml_content_str.encode('utf-8')
@@ -0,0 +1,119 @@
+# exporters/report_exporter.py
+"""
+Reporte de coordenadas (tabla ID / Este / Norte más un resumen de métricas)
+en HTML o CSV.
+
+El documento se genera por bloques de CHUNK_ROWS filas y cada bloque se
+escribe en el destino (archivo, StringIO, ...) en cuanto está listo, de
+modo que el costo es lineal y nunca se arma el reporte completo con
+concatenaciones sucesivas.
+"""
+import csv
+import io
+from html import escape
+from itertools import islice
+from typing import Iterable, Iterator
+
+
+class ReportExporter:
+    # Filas por bloque escrito
+    CHUNK_ROWS = 2000
+
+    @staticmethod
+    def _bloques(rows: Iterable, limit: int = None) -> Iterator[list]:
+        filas = iter(rows) if limit is None else islice(rows, limit)
+        while True:
+            bloque = list(islice(filas, ReportExporter.CHUNK_ROWS))
+            if not bloque:
+                return
+            yield bloque
+
+    @staticmethod
+    def iter_html(rows: Iterable, summary: list[tuple[str, str]], limit: int = None) -> Iterator[str]:
+        """
+        Genera el reporte HTML por bloques de texto.
+
+        Args:
+            rows: Filas (id, x, y); puede ser un generador.
+            summary: Pares (etiqueta, valor) que se añaden al final de la tabla.
+            limit: (Opcional) Número máximo de filas de coordenadas.
+        """
+        yield ("<table border='1' cellpadding='4' cellspacing='0'>"
+               "<tr><th>ID</th><th>Este (X)</th><th>Norte (Y)</th></tr>")
+        for bloque in ReportExporter._bloques(rows, limit):
+            yield "".join(
+                f"<tr><td>{escape(str(fid))}</td><td>{x:.2f}</td><td>{y:.2f}</td></tr>"
+                for fid, x, y in bloque
+            )
+        yield "".join(
+            f"<tr><td colspan='3'><b>{escape(etiqueta)}:</b> {escape(valor)}</td></tr>"
+            for etiqueta, valor in summary
+        )
+        yield "</table>"
+
+    @staticmethod
+    def iter_csv(rows: Iterable, summary: list[tuple[str, str]], limit: int = None) -> Iterator[str]:
+        """Igual que iter_html, en CSV; el resumen va tras una línea en blanco."""
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+
+        def vaciar():
+            texto = buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            return texto
+
+        writer.writerow(["ID", "Este (X)", "Norte (Y)"])
+        yield vaciar()
+        for bloque in ReportExporter._bloques(rows, limit):
+            writer.writerows((fid, f"{x:.2f}", f"{y:.2f}") for fid, x, y in bloque)
+            yield vaciar()
+        if summary:
+            writer.writerow([])
+            writer.writerows(summary)
+            yield vaciar()
+
+    @staticmethod
+    def write(stream, rows: Iterable, summary: list[tuple[str, str]], fmt: str = "html",
+              limit: int = None) -> None:
+        """
+        Escribe el reporte en un objeto con write() (archivo de texto, StringIO).
+
+        Raises:
+            ValueError: Si fmt no es "html" ni "csv".
+        """
+        if fmt == "html":
+            bloques = ReportExporter.iter_html(rows, summary, limit)
+        elif fmt == "csv":
+            bloques = ReportExporter.iter_csv(rows, summary, limit)
+        else:
+            raise ValueError(f"Formato de reporte '{fmt}' no soportado. Use 'html' o 'csv'.")
+        for bloque in bloques:
+            stream.write(bloque)
+
+    @staticmethod
+    def to_string(rows: Iterable, summary: list[tuple[str, str]], fmt: str = "html",
+                  limit: int = None) -> str:
+        buf = io.StringIO()
+        ReportExporter.write(buf, rows, summary, fmt, limit)
+        return buf.getvalue()
+
+    @staticmethod
+    def export(rows: Iterable, summary: list[tuple[str, str]], filename: str) -> None:
+        """
+        Guarda el reporte; el formato se toma de la extensión (.html/.htm o .csv).
+
+        Raises:
+            ValueError: Si la extensión no es reconocida.
+        """
+        ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+        if ext in ("html", "htm"):
+            fmt = "html"
+        elif ext == "csv":
+            fmt = "csv"
+        else:
+            raise ValueError("El archivo del reporte debe terminar en .html o .csv")
+        # utf-8-sig para que hojas de cálculo reconozcan la codificación del CSV
+        encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+        with open(filename, "w", encoding=encoding, newline="") as f:
+            ReportExporter.write(f, rows, summary, fmt)
@@ -3,12 +3,31 @@ from fiona.crs import from_epsg
 from collections import OrderedDict, defaultdict
 import os
 
+from core.crs import feature_epsg, utm_zone
+
 # (Si se usaran constantes como GeometryType.PUNTO, se importarían aquí)
 # from core.coordinate_manager import GeometryType
 
 class ShapefileExporter:
     @staticmethod
-    def export(features: list[dict], filename: str, hemisphere: str, zone: str):
+    def export(features: list[dict], filename: str, hemisphere: str, zone: str, metrics: dict = None,
+               attributes: dict = None):
+        """
+        Exporta un Shapefile por tipo de geometría. Si se pasan métricas
+        {feat_id: dict} de MetricsEngine, las líneas llevan el campo
+        'longitud' y los polígonos 'perimetro' y 'area'. Los atributos
+        {feat_id: dict} (p. ej. de SpatialQueries.feature_attributes) se
+        añaden como campos de la capa de sus features.
+
+        Si los features traen su propio "epsg" y caen en más de una zona, se
+        escribe un juego de archivos por zona, cada uno con su CRS
+        (p. ej. proyecto_points_18S.shp y proyecto_points_19S.shp).
+
+        Returns:
+            Rutas de los .shp escritos.
+        """
+        if attributes is None:
+            attributes = {}
         if not features:
             raise ValueError("No hay geometrías para exportar.")
 
@@ -28,13 +47,8 @@ class ShapefileExporter:
         else:
             raise ValueError(f"Hemisferio '{hemisphere}' no reconocido. Use 'Norte' o 'Sur'.")
 
-        try:
-            crs = from_epsg(epsg_code)
-        except Exception as e: # from_epsg puede fallar por varias razones si el código es inválido
-            raise ValueError(f"No se pudo generar el CRS para EPSG:{epsg_code}. Error: {e}")
-
 
-        # Agrupar features por tipo de geometría fiona
+        # Agrupar features por zona (EPSG) y tipo de geometría fiona
         grouped_features = defaultdict(list)
         # Mapeo de tipos de geometría de la aplicación a tipos de fiona
         # Y también para asegurar que solo procesamos tipos que conocemos
@@ -53,7 +67,7 @@ class ShapefileExporter:
             fiona_geom_type = geometry_type_map.get(app_geom_type)
 
             if fiona_geom_type:
-                grouped_features[fiona_geom_type].append(feat)
+                grouped_features[(feature_epsg(feat, epsg_code), fiona_geom_type)].append(feat)
             else:
                 print(f"Advertencia: Tipo de geometría '{app_geom_type}' para feature ID {feat.get('id', 'N/A')} no es soportado por ShapefileExporter y será omitido.")
 
@@ -62,9 +76,15 @@ class ShapefileExporter:
             raise ValueError("No hay geometrías con tipos soportados para exportar a Shapefile.")
 
         base_filename, _ = os.path.splitext(filename)
-        exported_files_count = 0
+        exported_files = []
+        varias_zonas = len({epsg for epsg, _ in grouped_features}) > 1
+
+        for (epsg_grupo, fiona_geom_type), feats_in_group in grouped_features.items():
+            try:
+                crs = from_epsg(epsg_grupo)
+            except Exception as e: # from_epsg puede fallar por varias razones si el código es inválido
+                raise ValueError(f"No se pudo generar el CRS para EPSG:{epsg_grupo}. Error: {e}")
 
-        for fiona_geom_type, feats_in_group in grouped_features.items():
             # Construir nombre de archivo específico para este tipo de geometría
             # ej. si filename es "proyecto.shp", output_filename será "proyecto_point.shp"
             # Si el filename original no tiene extensión .shp, se añade.
@@ -80,11 +100,39 @@ class ShapefileExporter:
                 suffix = suffix[:-1] + 'ies'
             else:
                 suffix = suffix + 's'
+            if varias_zonas:
+                hemi_grupo, zona_grupo = utm_zone(epsg_grupo)
+                suffix += f"_{zona_grupo}{hemi_grupo[0]}"
             output_filename = f"{base_filename}_{suffix}.shp"
 
+            campos_metricas = []
+            if metrics is not None:
+                if fiona_geom_type == 'LineString':
+                    campos_metricas = [('longitud', 'length')]
+                elif fiona_geom_type == 'Polygon':
+                    campos_metricas = [('perimetro', 'perimeter'), ('area', 'area')]
+
+            # Campos de atributos presentes en este grupo; el tipo se deduce de los valores
+            campos_atributos = OrderedDict()
+            for feat_data in feats_in_group:
+                for campo, valor in attributes.get(feat_data.get('id'), {}).items():
+                    if valor is None or valor == "":
+                        campos_atributos.setdefault(campo, None)
+                    elif isinstance(valor, float):
+                        campos_atributos[campo] = 'float:19.3'
+                    elif isinstance(valor, int):
+                        campos_atributos[campo] = 'int'
+                    else:
+                        campos_atributos[campo] = 'str:64'
+            campos_atributos = OrderedDict((c, t or 'str:64') for c, t in campos_atributos.items())
+
             schema = {
                 'geometry': fiona_geom_type,
-                'properties': OrderedDict([('id', 'int')]) # Propiedad 'id' de tipo entero
+                'properties': OrderedDict(
+                    [('id', 'int')] # Propiedad 'id' de tipo entero
+                    + [(campo, 'float:19.3') for campo, _ in campos_metricas]
+                    + list(campos_atributos.items())
+                )
             }
 
             try:
@@ -131,14 +179,21 @@ class ShapefileExporter:
                                 continue
 
                         if fiona_geometry_dict:
+                            propiedades = OrderedDict([('id', int(feat_data.get('id', 0)))]) # Asegurar que ID es int
+                            m = metrics.get(feat_data.get('id')) if metrics is not None else None
+                            for campo, clave in campos_metricas:
+                                propiedades[campo] = m[clave] if m else None
+                            a = attributes.get(feat_data.get('id'), {})
+                            for campo in campos_atributos:
+                                propiedades[campo] = a.get(campo)
                             collection.write({
                                 'geometry': fiona_geometry_dict,
-                                'properties': OrderedDict([('id', int(feat_data.get('id', 0)))]) # Asegurar que ID es int
+                                'properties': propiedades
                             })
                         # else: el feature fue omitido por formato inválido
 
                 print(f"Archivo {output_filename} exportado exitosamente.")
-                exported_files_count += 1
+                exported_files.append(output_filename)
 
             except Exception as e:
                 # Si un tipo de geometría falla, se informa y se intenta continuar con los otros.
@@ -146,11 +201,10 @@ class ShapefileExporter:
                 print(f"Error al exportar el archivo Shapefile '{output_filename}': {e}")
                 # Considerar acumular errores en una lista y mostrarlos al final o relanzar una excepción agrupada.
 
-        if exported_files_count == 0:
+        if not exported_files:
             raise RuntimeError("No se pudo exportar ningún archivo Shapefile. Verifique los tipos de geometría y los datos.")
 
-        # La GUI puede necesitar ser informada de los múltiples archivos creados.
-        # Por ahora, el mensaje de éxito en gui.py es genérico.
+        return exported_files
 
 # Ejemplo de uso (opcional, para testing directo)
 if __name__ == '__main__':
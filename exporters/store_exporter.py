@@ -0,0 +1,23 @@
+# exporters/store_exporter.py
+import sqlite3
+
+from core.feature_store import EXTENSION, write_features
+
+
+class StoreExporter:
+    @staticmethod
+    def export(features, filename: str, hemisphere: str, zone: str, metrics: dict = None):
+        """
+        Exporta features (lista o cualquier iterable, que se recorre una sola
+        vez) a un proyecto .gwdb que la GUI abre por partes. Las métricas no
+        se guardan: se recalculan al exportar desde el proyecto.
+
+        Returns:
+            Número de features exportados.
+        """
+        if not filename.lower().endswith(EXTENSION):
+            raise ValueError(f"El nombre de archivo debe terminar en '{EXTENSION}'.")
+        try:
+            return write_features(filename, features, {"hemisphere": hemisphere, "zone": int(zone)})
+        except (OSError, sqlite3.Error) as e:
+            raise RuntimeError(f"Error al escribir el proyecto '{filename}': {e}")
@@ -1,6 +1,9 @@
 import os
 import csv
-import json
+import math
+import sqlite3
+import time
+from contextlib import contextmanager
 
 from PySide6.QtCore import (
     Qt,
@@ -9,19 +12,22 @@ from PySide6.QtCore import (
     QItemSelectionModel,
     QEvent,
     QUrl,
+    QRectF,
+    QTimer,
+    QStandardPaths,
+    QLockFile,
 )
 from PySide6.QtGui import (
     QAction,
     QRegularExpressionValidator,
     QBrush,
-    QPen,
     QPixmap,
     QPainter,
     QColor,
-    QIcon,
     QPalette,
+    QFont,
+    QKeySequence,
 )
-from PySide6.QtSvg import QSvgRenderer
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -38,7 +44,6 @@ from PySide6.QtWidgets import (
     QCheckBox,
     QGraphicsView,
     QGraphicsScene,
-    QGraphicsTextItem,
     QHeaderView,
     QMenu,
     QStyledItemDelegate,
@@ -47,19 +52,32 @@ from PySide6.QtWidgets import (
     QDialog,
     QTextEdit,
     QStackedLayout,
+    QInputDialog,
+    QProgressDialog,
 )
-from PySide6.QtWebEngineWidgets import QWebEngineView
+# QtWebEngineWidgets, pyproj y fiona se importan en el primer uso (mapa base,
+# exportación, importación KML): cargarlos al inicio retrasa el arranque.
 
 from config_dialog import ConfigDialog
 from help_dialog import HelpDialog
+from store_dialog import StoreDialog
 from core.coordinate_manager import CoordinateManager, GeometryType
-from exporters.kml_exporter import KMLExporter
-from exporters.kmz_exporter import KMZExporter  # Asumiendo que existe
-from exporters.shapefile_exporter import ShapefileExporter  # Asumiendo que existe
+from exporters.report_exporter import ReportExporter
 from importers.csv_importer import CSVImporter
-from importers.kml_importer import KMLImporter  # Importar KMLImporter
-from core.geometry import GeometryBuilder
-from pyproj import Transformer
+from core.scene_sync import SceneSynchronizer
+from core.lod import LODCache
+from core.metrics import MetricsEngine
+from core.topology import TopologyValidator
+from core.dedup import PointDeduplicator
+from core.queries import SpatialQueries
+from core.crs import AUTO_ZONE, dominant_epsg, reproject_features, utm_epsg, utm_zone, WGS84Cache
+from core.labeling import LabelEngine
+from core.tile_cache import TileCache
+from core.icon_cache import IconCache
+from core.project_file import ProjectFile, write_project, EXTENSION as PROJECT_EXTENSION
+from core.feature_store import FeatureStore, write_store, EXTENSION as STORE_EXTENSION
+from core.journal import EditJournal
+from core.undo import TableHistory
 
 class UTMDelegate(QStyledItemDelegate):
     def createEditor(self, parent, option, index):
@@ -113,6 +131,30 @@ class UTMDelegate(QStyledItemDelegate):
             model.setData(index, QBrush(color), Qt.ForegroundRole)
 
 class CoordTable(QTableWidget):
+    # Acceso por texto usado por el historial de deshacer (core/undo.py)
+    def row_count(self):
+        return self.rowCount()
+
+    def text(self, r, c):
+        item = self.item(r, c)
+        return item.text() if item else ""
+
+    def set_text(self, r, c, texto):
+        item = self.item(r, c)
+        if item is not None:
+            item.setText(texto)
+        elif texto:
+            item = QTableWidgetItem(texto)
+            if c == 0:
+                item.setFlags(Qt.ItemIsEnabled)
+            self.setItem(r, c, item)
+
+    def insert_rows(self, r, n):
+        self.model().insertRows(r, n)
+
+    def remove_rows(self, r, n):
+        self.model().removeRows(r, n)
+
     def keyPressEvent(self, event):
         # Tab: al salir de Y, saltar a X de la siguiente fila
         if event.key() == Qt.Key_Tab and self.currentColumn() == 2:
@@ -129,21 +171,199 @@ class CoordTable(QTableWidget):
         super().keyPressEvent(event)
 
 class CanvasView(QGraphicsView):
+    # lado de las teselas del modo de renderizado en caché (píxeles)
+    TILE_PX = 256
+    # tiempo máximo por ciclo de refinamiento progresivo (segundos)
+    REFINE_BUDGET = 0.012
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._zoom_factor = 1.15
+        # items con niveles de detalle (LODPathItem) presentes en la escena
+        self.lod_items = []
+        # etiquetas de puntos, colocadas sólo para el viewport visible
+        self.label_engine = LabelEngine()
+
+        # modo opcional de renderizado en caché: la escena se pinta en
+        # teselas QPixmap por nivel de zoom que se reutilizan al desplazar
+        self._tiles_activo = False
+        self._tiles = TileCache()
+        self._nivel_actual = None
+        self._pendientes = {}
+        self._timer_refinar = QTimer(self)
+        self._timer_refinar.setSingleShot(True)
+        self._timer_refinar.setInterval(0)
+        self._timer_refinar.timeout.connect(self._refinar_teselas)
+
+    def pixel_size(self):
+        """Tamaño de un píxel de pantalla en unidades de escena."""
+        escala = abs(self.transform().m11()) or 1.0
+        return 1.0 / escala
+
+    def actualizar_lod(self):
+        px = self.pixel_size()
+        for item in self.lod_items:
+            item.set_pixel_size(px)
+
+    def zoom(self, factor):
+        self.scale(factor, factor)
+        self.actualizar_lod()
+
+    def fitInView(self, *args, **kwargs):
+        super().fitInView(*args, **kwargs)
+        self.actualizar_lod()
 
     def wheelEvent(self, event):
         if event.angleDelta().y() > 0:
-            self.scale(self._zoom_factor, self._zoom_factor)
+            self.zoom(self._zoom_factor)
         else:
-            self.scale(1 / self._zoom_factor, 1 / self._zoom_factor)
+            self.zoom(1 / self._zoom_factor)
         event.accept()
 
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        # la colocación de etiquetas depende del área visible: repintar completo
+        if self.label_engine.has_labels():
+            self.viewport().update()
+
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        self.label_engine.paint(painter, self)
+
+    # ------------------------------------------------------------------
+    # Renderizado en caché por teselas
+    # ------------------------------------------------------------------
+
+    def set_cached_rendering(self, activo, max_mb=None):
+        self._tiles_activo = activo
+        if max_mb is not None:
+            self._tiles.set_max_bytes(int(max_mb * 1024 * 1024))
+        self.invalidar_teselas()
+
+    def invalidar_teselas(self):
+        """Descarta todas las teselas (la escena cambió)."""
+        self._tiles.clear()
+        self._pendientes.clear()
+        self._nivel_actual = None
+        self.viewport().update()
+
+    @staticmethod
+    def _clave_nivel(escala):
+        # redondeo para que volver a un zoom previo reutilice sus teselas
+        return float(f"{escala:.9g}")
+
+    def _render_tesela(self, nivel, tx, ty):
+        t = self.TILE_PX
+        pixmap = QPixmap(t, t)
+        pixmap.fill(Qt.white)
+        painter = QPainter(pixmap)
+        painter.setRenderHints(self.renderHints())
+        origen = QRectF(tx * t / nivel, ty * t / nivel, t / nivel, t / nivel)
+        self.scene().render(painter, QRectF(0, 0, t, t), origen, Qt.IgnoreAspectRatio)
+        painter.end()
+        self._tiles.put((nivel, tx, ty), pixmap)
+        return pixmap
+
+    def _dibujar_respaldo(self, painter, destino, escala, dx, dy):
+        """
+        Mientras una tesela del nivel actual no está lista, dibuja escaladas
+        las del nivel anterior que cubren la misma zona. Devuelve True si
+        encontró alguna.
+        """
+        previo = self._nivel_actual
+        if previo is None or not (0.25 <= previo / escala <= 4.0):
+            return False
+
+        t = self.TILE_PX
+        # zona de la escena cubierta por la tesela destino
+        x0 = (destino.left() - dx) / escala
+        y0 = (destino.top() - dy) / escala
+        x1 = (destino.right() - dx) / escala
+        y1 = (destino.bottom() - dy) / escala
+        lado = t * escala / previo
+
+        encontrada = False
+        painter.save()
+        painter.setClipRect(destino)
+        for tx in range(math.floor(x0 * previo / t), math.floor(x1 * previo / t) + 1):
+            for ty in range(math.floor(y0 * previo / t), math.floor(y1 * previo / t) + 1):
+                pixmap = self._tiles.get((previo, tx, ty))
+                if pixmap is None:
+                    continue
+                painter.drawPixmap(
+                    QRectF(tx * lado + dx, ty * lado + dy, lado, lado),
+                    pixmap,
+                    QRectF(pixmap.rect()),
+                )
+                encontrada = True
+        painter.restore()
+        return encontrada
+
+    def _refinar_teselas(self):
+        inicio = time.perf_counter()
+        while self._pendientes and time.perf_counter() - inicio < self.REFINE_BUDGET:
+            clave = next(iter(self._pendientes))
+            del self._pendientes[clave]
+            if clave[0] == self._nivel_pintado and self._tiles.get(clave) is None:
+                self._render_tesela(*clave)
+        self.viewport().update()
+        if self._pendientes:
+            self._timer_refinar.start()
+        else:
+            self._nivel_actual = self._nivel_pintado
+
+    def paintEvent(self, event):
+        tr = self.viewportTransform()
+        if (not self._tiles_activo or self.scene() is None
+                or tr.m12() or tr.m21() or tr.m11() <= 0
+                or abs(tr.m11() - tr.m22()) > 1e-12 * tr.m11()):
+            super().paintEvent(event)
+            return
+
+        escala = tr.m11()
+        nivel = self._clave_nivel(escala)
+        dx, dy = tr.dx(), tr.dy()
+        t = self.TILE_PX
+        area = QRectF(event.rect())
+
+        self._nivel_pintado = nivel
+        if self._nivel_actual != nivel:
+            # sólo se refinan teselas del nivel que se está mostrando
+            self._pendientes = {k: None for k in self._pendientes if k[0] == nivel}
+
+        painter = QPainter(self.viewport())
+        painter.fillRect(area, Qt.white)
+        for tx in range(math.floor((area.left() - dx) / t), math.floor((area.right() - dx) / t) + 1):
+            for ty in range(math.floor((area.top() - dy) / t), math.floor((area.bottom() - dy) / t) + 1):
+                destino = QRectF(tx * t + dx, ty * t + dy, t, t)
+                pixmap = self._tiles.get((nivel, tx, ty))
+                if pixmap is None:
+                    if self._nivel_actual != nivel and self._dibujar_respaldo(painter, destino, escala, dx, dy):
+                        self._pendientes[(nivel, tx, ty)] = None
+                        continue
+                    pixmap = self._render_tesela(nivel, tx, ty)
+                painter.drawPixmap(destino.topLeft(), pixmap)
+
+        if self._pendientes:
+            self._timer_refinar.start()
+        else:
+            self._nivel_actual = nivel
+
+        painter.setTransform(tr)
+        self.drawForeground(painter, self.mapToScene(event.rect()).boundingRect())
+        painter.end()
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SIG: Gestión de Coordenadas")
+        self._lod_cache = LODCache()
+        # Reproyecciones a WGS84 compartidas por el mapa y las métricas geodésicas
+        self._wgs84 = WGS84Cache()
+        self._metrics = MetricsEngine(self._wgs84)
+        self._icon_cache = IconCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons"))
+        # QAction -> nombre del SVG, para repintar los iconos al cambiar de tema
+        self._iconos_acciones = {}
         self._build_ui()
         self._create_toolbar()
         self._modo_oscuro = False
@@ -151,22 +371,64 @@ class MainWindow(QMainWindow):
         self.draw_scale = 0.35
         self.point_size = 6
         self.font_size = 8
+        self.cache_tiles = False
+        self.cache_tiles_mb = 64
+        self.map_cache_mb = 256
+        self.map_offline = False
+        self.geodesic = False
+        self.import_dedup = False
+        self.import_tolerance = 0.01
+
+        # Autoguardado: diario de ediciones de la tabla (ver core/journal.py),
+        # en un directorio bloqueado por esta instancia
+        directorio, self._journal_lock = self._lock_journal_dir()
+        self._journal = EditJournal(directorio)
+        self._journal_pausado = 0
+        modelo = self.table.model()
+        modelo.dataChanged.connect(self._journal_data_changed)
+        modelo.rowsInserted.connect(lambda _, first, last: self._journal_append(
+            {"op": "ins", "r": first, "n": last - first + 1}))
+        modelo.rowsRemoved.connect(lambda _, first, last: self._journal_append(
+            {"op": "del", "r": first, "n": last - first + 1}))
+        modelo.modelReset.connect(self._journal_compact)
+        for senal in (self.cb_zona.currentTextChanged, self.cb_hemisferio.currentTextChanged,
+                      self.le_nombre.textChanged, self.chk_punto.toggled,
+                      self.chk_polilinea.toggled, self.chk_poligono.toggled):
+            senal.connect(lambda *_: self._journal_append({"op": "meta", "meta": self._project_meta()}))
+        # tras mostrar la ventana: ofrecer recuperar la sesión anterior e iniciar el diario
+        QTimer.singleShot(0, self._start_journal)
+
+        # Deshacer/rehacer: cada paso guarda sólo el cambio (ver core/undo.py)
+        self.undo_budget_mb = 64
+        self._history = TableHistory(self.table, self.undo_budget_mb * 1024 * 1024,
+                                     on_change=self._update_undo_actions)
+        self._history_commit_pendiente = False
+        modelo.dataChanged.connect(lambda tl, br, roles=(): self._history_event(
+            self._history.cells_changed, tl.row(), tl.column(), br.row(), br.column()))
+        modelo.rowsInserted.connect(lambda _, first, last: self._history_event(
+            self._history.rows_inserted, first, last))
+        modelo.rowsRemoved.connect(lambda _, first, last: self._history_event(
+            self._history.rows_removed, first, last))
+        modelo.modelReset.connect(lambda: self._history_event(self._history.reset))
+        # al destruirse, la tabla vacía su modelo (modelReset) cuando ya no
+        # existe: el diario y el historial dejan de seguirlo antes, aunque la
+        # ventana se destruya sin pasar por closeEvent
+        self.table.destroyed.connect(lambda: modelo.modelReset.disconnect())
+        self._update_undo_actions()
     
     def _icono(self, nombre, size=QSize(24, 24)):
-        ruta = f"icons/{nombre}"
-        renderer = QSvgRenderer(ruta)
-        pixmap = QPixmap(size)
-        pixmap.fill(Qt.transparent)
-
         color = QApplication.palette().color(QPalette.Text)
+        return self._icon_cache.icon(nombre, size, color, self.devicePixelRatioF())
 
-        painter = QPainter(pixmap)
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(color)
-        renderer.render(painter)
-        painter.end()
+    def _accion(self, nombre_icono, text):
+        """QAction con icono SVG; el icono se pinta con el tema en _refrescar_iconos."""
+        a = QAction(text, self)
+        self._iconos_acciones[a] = nombre_icono
+        return a
 
-        return QIcon(pixmap)
+    def _refrescar_iconos(self):
+        for accion, nombre in self._iconos_acciones.items():
+            accion.setIcon(self._icono(nombre))
 
     def _build_ui(self):
         central = QWidget()
@@ -255,6 +517,7 @@ class MainWindow(QMainWindow):
         self.canvas = CanvasView()
         self.scene  = QGraphicsScene(self.canvas)
         self.canvas.setScene(self.scene)
+        self._scene_sync = SceneSynchronizer(self.scene, self._lod_cache)
         self.canvas.setMinimumSize(400,300)
         self.canvas.setStyleSheet("background-color:white; border:1px solid #ccc; padding:8px;")
         # Permitir desplazamiento con el cursor en lugar de barras de scroll
@@ -262,14 +525,16 @@ class MainWindow(QMainWindow):
         self.canvas.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.canvas.setDragMode(QGraphicsView.ScrollHandDrag)
 
-        # Vista web con Leaflet
-        self.web_view = QWebEngineView()
-        html_path = os.path.join(os.path.dirname(__file__), "map_base.html")
-        self.web_view.setUrl(QUrl.fromLocalFile(os.path.abspath(html_path)))
+        # Vista web con Leaflet, servida junto con las teselas por geowizard://.
+        # La vista, la caché de teselas y el puente se crean al usar el mapa
+        # base por primera vez (_ensure_web_view / _ensure_tile_server)
+        self.map_tiles = None
+        self.tile_handler = None
+        self.map_bridge = None
+        self.web_view = None
 
         self.stack = QStackedLayout()
         self.stack.addWidget(self.canvas)
-        self.stack.addWidget(self.web_view)
         self.stack.setCurrentWidget(self.canvas)
         view_container = QWidget()
         view_container.setLayout(self.stack)
@@ -287,43 +552,39 @@ class MainWindow(QMainWindow):
         for nombre_icono, text, slot in [
             ("file-fill.svg",       "Nuevo",    self._on_new),
             ("folder-open-fill.svg","Abrir",    self._on_open),
-            ("save-3-fill.svg",     "Guardar",  self._on_guardar),
+            ("save-3-fill.svg",     "Guardar",  self._on_save_project),
             ("import-fill.svg",     "Importar", self._on_import),
             ("export-fill.svg",     "Exportar", self._on_export)
         ]:
-            a = QAction(self._icono(nombre_icono), text, self)
+            a = self._accion(nombre_icono, text)
             a.triggered.connect(slot)
             tb.addAction(a)
 
             if nombre_icono == "save-3-fill.svg":
-                csv_action = QAction(
-                    self._icono("file-excel-2-fill.svg"),
-                    "Exportar CSV",
-                    self
-                )
-                csv_action.svg_filename = "file-excel-2-fill.svg"
+                csv_action = self._accion("file-excel-2-fill.svg", "Exportar CSV")
                 csv_action.setToolTip("Exportar tabla a CSV")
                 csv_action.triggered.connect(self._export_csv)
                 tb.addAction(csv_action)
 
         tb.addSeparator()
 
-        for nombre_icono, text, slot in [
-            ("arrow-left-box-fill.svg",  "Deshacer", self._on_undo),
-            ("arrow-right-box-fill.svg", "Rehacer",  self._on_redo),
-        ]:
-            a = QAction(self._icono(nombre_icono), text, self)
-            a.triggered.connect(slot)
-            tb.addAction(a)
+        self.action_deshacer = self._accion("arrow-left-box-fill.svg", "Deshacer")
+        self.action_deshacer.setShortcut(QKeySequence.Undo)
+        self.action_deshacer.triggered.connect(self._on_undo)
+        tb.addAction(self.action_deshacer)
+        self.action_rehacer = self._accion("arrow-right-box-fill.svg", "Rehacer")
+        self.action_rehacer.setShortcut(QKeySequence.Redo)
+        self.action_rehacer.triggered.connect(self._on_redo)
+        tb.addAction(self.action_rehacer)
 
         tb.addSeparator()
 
         # mostrar/ocultar lienzo
-        tog = QAction(self._icono("edit-box-fill.svg"), "Mostrar/Ocultar lienzo", self)
+        tog = self._accion("edit-box-fill.svg", "Mostrar/Ocultar lienzo")
         tog.setCheckable(True); tog.setChecked(True)
         tog.toggled.connect(self.canvas.setVisible)
         tb.addAction(tog)
-        btn_html = QAction(self._icono("code-box-fill.svg"), "HTML", self)
+        btn_html = self._accion("code-box-fill.svg", "HTML")
         btn_html.setToolTip("Generar resumen HTML con coordenadas, perímetro y área")
         btn_html.triggered.connect(self._on_export_html)
         tb.addAction(btn_html)
@@ -341,10 +602,24 @@ class MainWindow(QMainWindow):
         zoom_out_action.triggered.connect(self._on_zoom_out)
         tb.addAction(zoom_out_action)
 
+        seed_action = QAction("Descargar mapa", self)
+        seed_action.setToolTip("Guardar las teselas del mapa base de la zona para usarlas sin conexión")
+        seed_action.triggered.connect(self._on_seed_tiles)
+        tb.addAction(seed_action)
+
+        self.action_consultas = QAction("Consultas", self)
+        self.action_consultas.setCheckable(True)
+        self.action_consultas.setToolTip(
+            "Mostrar en la tabla el polígono que contiene cada punto y la línea más cercana, "
+            "e incluirlos al exportar"
+        )
+        self.action_consultas.toggled.connect(self._on_toggle_queries)
+        tb.addAction(self.action_consultas)
+
         tb.addSeparator()
 
         # modo oscuro
-        self.action_modo = QAction(self._icono("sun-fill.svg"), "Modo claro", self)
+        self.action_modo = self._accion("sun-fill.svg", "Modo claro")
         self.action_modo.setCheckable(True)
         self.action_modo.setChecked(False)
         self.action_modo.toggled.connect(self._toggle_modo)
@@ -357,7 +632,7 @@ class MainWindow(QMainWindow):
             ("settings-2-fill.svg", "Configuraciones", self._on_settings),
             ("question-fill.svg",   "Ayuda",           self._on_help),
         ]:
-            a = QAction(self._icono(nombre_icono), text, self)
+            a = self._accion(nombre_icono, text)
             a.triggered.connect(slot)
             tb.addAction(a)
 
@@ -425,7 +700,7 @@ class MainWindow(QMainWindow):
             QApplication.setPalette(pal)
             QApplication.instance().setStyleSheet("")   # ← AHORA CORRECTO
 
-            self.action_modo.setIcon(self._icono("moon-fill.svg"))
+            self._iconos_acciones[self.action_modo] = "moon-fill.svg"
             self.action_modo.setText("Modo oscuro")
         else:
             # ─── MODO CLARO ───
@@ -438,9 +713,12 @@ class MainWindow(QMainWindow):
             QApplication.setPalette(pal)
             QApplication.instance().setStyleSheet("")   # ← TAMBIÉN IGUAL
 
-            self.action_modo.setIcon(self._icono("sun-fill.svg"))
+            self._iconos_acciones[self.action_modo] = "sun-fill.svg"
             self.action_modo.setText("Modo claro")
 
+        # los iconos siguen el color de texto del tema (en caché por color)
+        self._refrescar_iconos()
+
     def _on_cell_changed(self, item):
         r, c = item.row(), item.column()
         # auto-agregar fila nueva
@@ -461,6 +739,155 @@ class MainWindow(QMainWindow):
             print(f"Error al construir features para preview: {e}")
 
 
+    # ─── Autoguardado ───
+
+    def _table_rows(self) -> list[list[str]]:
+        """Texto de las columnas ID, X e Y de todas las filas de la tabla."""
+        filas = []
+        for r in range(self.table.rowCount()):
+            fila = []
+            for c in range(3):
+                item = self.table.item(r, c)
+                fila.append(item.text() if item else "")
+            filas.append(fila)
+        return filas
+
+    def _fill_table(self, rows):
+        """Reemplaza la tabla por las filas [id, x, y] dadas, sin disparar la vista previa."""
+        self.table.blockSignals(True)
+        self.table.setUpdatesEnabled(False)
+        try:
+            self.table.clearContents()
+            self.table.setRowCount(max(len(rows), 1))
+            for r, (fid, x, y) in enumerate(rows):
+                if fid:
+                    id_item = QTableWidgetItem(fid)
+                    id_item.setFlags(Qt.ItemIsEnabled)
+                    self.table.setItem(r, 0, id_item)
+                if x:
+                    self.table.setItem(r, 1, QTableWidgetItem(x))
+                if y:
+                    self.table.setItem(r, 2, QTableWidgetItem(y))
+        finally:
+            self.table.setUpdatesEnabled(True)
+            self.table.blockSignals(False)
+
+    def _project_meta(self) -> dict:
+        return {
+            "name": self.le_nombre.text(),
+            "hemisphere": self.cb_hemisferio.currentText(),
+            "zone": self.cb_zona.currentText(),
+            "geometries": {
+                GeometryType.PUNTO: self.chk_punto.isChecked(),
+                GeometryType.POLILINEA: self.chk_polilinea.isChecked(),
+                GeometryType.POLIGONO: self.chk_poligono.isChecked(),
+            },
+        }
+
+    def _apply_meta(self, meta: dict):
+        self.cb_hemisferio.setCurrentText(meta.get("hemisphere", self.cb_hemisferio.currentText()))
+        self.cb_zona.setCurrentText(str(meta.get("zone", self.cb_zona.currentText())))
+        self.le_nombre.setText(meta.get("name", ""))
+        geometrias = meta.get("geometries", {})
+        for chk, tipo in ((self.chk_punto, GeometryType.PUNTO),
+                          (self.chk_polilinea, GeometryType.POLILINEA),
+                          (self.chk_poligono, GeometryType.POLIGONO)):
+            chk.setChecked(bool(geometrias.get(tipo, False)))
+
+    # Instancias abiertas a la vez con autoguardado propio
+    AUTOSAVE_SLOTS = 16
+
+    def _lock_journal_dir(self):
+        """
+        Directorio de autoguardado de esta instancia y su QLockFile (None si
+        no hay ninguno libre). Cada instancia toma el primero sin bloquear
+        ("autosave", "autosave-1", ...): el diario de otra instancia en
+        marcha no se ofrece para recuperar ni se pisa. El bloqueo de una
+        instancia que se cerró mal queda obsoleto (su proceso ya no existe)
+        y se toma junto con su diario.
+        """
+        base = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        try:
+            os.makedirs(base, exist_ok=True)
+        except OSError:
+            return os.path.join(base, "autosave"), None
+        for i in range(self.AUTOSAVE_SLOTS):
+            nombre = "autosave" if i == 0 else f"autosave-{i}"
+            lock = QLockFile(os.path.join(base, nombre + ".lock"))
+            # el bloqueo dura toda la sesión: sólo es obsoleto si el proceso murió
+            lock.setStaleLockTime(0)
+            if lock.tryLock(0):
+                return os.path.join(base, nombre), lock
+        return os.path.join(base, "autosave"), None
+
+    def _start_journal(self):
+        if self._journal_lock is None:
+            print("Autoguardado desactivado: no hay un directorio de autoguardado libre.")
+            return
+        if self._journal.has_recovery():
+            estado = None
+            try:
+                estado = self._journal.recover()
+            except OSError as e:
+                print(f"No se pudo leer el autoguardado: {e}")
+            if estado is not None:
+                filas, meta, _ = estado
+                resp = QMessageBox.question(
+                    self, "Recuperar sesión",
+                    "La sesión anterior no se cerró correctamente.\n"
+                    f"¿Recuperar las {len(filas)} filas de la tabla autoguardadas?",
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes,
+                )
+                if resp == QMessageBox.Yes:
+                    with self._journal_paused(compact=False), self._history.suspended():
+                        self._fill_table(filas)
+                        self._apply_meta(meta)
+                    self._on_simular()
+        try:
+            self._journal.start(self._table_rows(), self._project_meta())
+        except OSError as e:
+            print(f"Autoguardado desactivado: {e}")
+
+    @contextmanager
+    def _journal_paused(self, compact: bool = True):
+        """
+        No registra las ediciones hechas dentro del bloque (cargas masivas);
+        al salir, el estado resultante se guarda como instantánea.
+        """
+        self._journal_pausado += 1
+        try:
+            yield
+        finally:
+            self._journal_pausado -= 1
+            if compact and not self._journal_pausado:
+                self._journal_compact()
+
+    def _journal_append(self, op: dict):
+        if self._journal_pausado:
+            return
+        try:
+            if self._journal.append(op):
+                self._journal_compact()
+        except OSError as e:
+            print(f"Error en el autoguardado: {e}")
+
+    def _journal_data_changed(self, top_left, bottom_right, roles=()):
+        if self._journal_pausado:
+            return
+        # las columnas de consultas se recalculan, no se registran
+        for r in range(top_left.row(), bottom_right.row() + 1):
+            for c in range(top_left.column(), min(bottom_right.column(), 2) + 1):
+                item = self.table.item(r, c)
+                self._journal_append({"op": "set", "r": r, "c": c, "t": item.text() if item else ""})
+
+    def _journal_compact(self):
+        if self._journal_pausado:
+            return
+        try:
+            self._journal.compact(self._table_rows(), self._project_meta())
+        except OSError as e:
+            print(f"Error en el autoguardado: {e}")
+
     def _on_cell_clicked(self, row, col):
         if col == 0:
             sel = self.table.selectionModel()
@@ -507,7 +934,8 @@ class MainWindow(QMainWindow):
     def _delete_row(self):
         r = self.table.currentRow()
         if r >= 0:
-            self.table.removeRow(r)
+            with self._history.group("Eliminar fila"):
+                self.table.removeRow(r)
         try:
             mgr = self._build_manager_from_table()
             self._redraw_scene(mgr)
@@ -523,37 +951,38 @@ class MainWindow(QMainWindow):
             if self.table.item(r,0) and not (self.table.item(r,0).flags() & Qt.ItemIsEditable):
                 pass
 
-        for ln_idx, ln in enumerate(lines):
-            if not ln.strip():
-                continue
+        with self._history.group("Pegar"):
+            for ln_idx, ln in enumerate(lines):
+                if not ln.strip():
+                    continue
 
-            current_id_item = self.table.item(r, 0)
-            is_id_cell_uneditable = current_id_item and not (current_id_item.flags() & Qt.ItemIsEditable)
+                current_id_item = self.table.item(r, 0)
+                is_id_cell_uneditable = current_id_item and not (current_id_item.flags() & Qt.ItemIsEditable)
 
-            if r >= self.table.rowCount():
-                self.table.insertRow(r)
-                id_it = QTableWidgetItem(str(r+1))
-                id_it.setFlags(Qt.ItemIsEnabled)
-                self.table.setItem(r,0,id_it)
-            elif is_id_cell_uneditable and (self.table.item(r,1) and self.table.item(r,1).text() or \
-                                          self.table.item(r,2) and self.table.item(r,2).text()):
-                pass
+                if r >= self.table.rowCount():
+                    self.table.insertRow(r)
+                    id_it = QTableWidgetItem(str(r+1))
+                    id_it.setFlags(Qt.ItemIsEnabled)
+                    self.table.setItem(r,0,id_it)
+                elif is_id_cell_uneditable and (self.table.item(r,1) and self.table.item(r,1).text() or \
+                                              self.table.item(r,2) and self.table.item(r,2).text()):
+                    pass
 
-            pts = [p.strip() for p in ln.split(",")]
-            if len(pts) < 2:
-                pts = [p.strip() for p in ln.split("\t")]
+                pts = [p.strip() for p in ln.split(",")]
+                if len(pts) < 2:
+                    pts = [p.strip() for p in ln.split("\t")]
 
-            if len(pts) >= 2:
-                try:
-                    float(pts[0].replace(',','.'))
-                    float(pts[1].replace(',','.'))
-                except ValueError:
-                    QMessageBox.warning(self, "Error de Pegado", f"Línea '{ln}' no contiene coordenadas X,Y numéricas válidas.")
-                    continue
+                if len(pts) >= 2:
+                    try:
+                        float(pts[0].replace(',','.'))
+                        float(pts[1].replace(',','.'))
+                    except ValueError:
+                        QMessageBox.warning(self, "Error de Pegado", f"Línea '{ln}' no contiene coordenadas X,Y numéricas válidas.")
+                        continue
 
-                self.table.setItem(r,1, QTableWidgetItem(pts[0].replace(',','.')))
-                self.table.setItem(r,2, QTableWidgetItem(pts[1].replace(',','.')))
-                r += 1
+                    self.table.setItem(r,1, QTableWidgetItem(pts[0].replace(',','.')))
+                    self.table.setItem(r,2, QTableWidgetItem(pts[1].replace(',','.')))
+                    r += 1
 
         try:
             mgr = self._build_manager_from_table()
@@ -561,12 +990,63 @@ class MainWindow(QMainWindow):
         except (ValueError, TypeError) as e:
              print(f"Error al construir features para preview tras pegar: {e}")
 
+    def _ensure_tile_server(self):
+        """
+        Abre la caché MBTiles y crea el manejador de geowizard:// y el puente
+        con la página; lo usan la vista web y la descarga de teselas.
+        """
+        if self.tile_handler is not None:
+            return self.tile_handler
+        from core.map_bridge import MapBridge
+        from core.mbtiles import MBTilesCache
+        from core.tile_server import TileSchemeHandler
+
+        cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.map_tiles = MBTilesCache(os.path.join(cache_dir, "teselas.mbtiles"))
+        self.map_tiles.set_max_bytes(self.map_cache_mb * 1024 * 1024)
+        self.tile_handler = TileSchemeHandler(
+            self.map_tiles, os.path.dirname(os.path.abspath(__file__)), self
+        )
+        self.tile_handler.offline = self.map_offline
+        self.map_bridge = MapBridge(self, self._wgs84)
+        self.tile_handler.vector_source = self.map_bridge.vector_tile
+        return self.tile_handler
+
+    def _ensure_web_view(self):
+        """
+        Crea la vista web del mapa base y carga map_base.html. Lo que se
+        sincronizó antes de que la página conecte el canal se reenvía en
+        MapBridge.ready().
+        """
+        if self.web_view is not None:
+            return self.web_view
+        from PySide6.QtWebEngineWidgets import QWebEngineView
+        from PySide6.QtWebChannel import QWebChannel
+        from core.web_scheme import SCHEME
+
+        self._ensure_tile_server()
+        self.web_view = QWebEngineView()
+        self.web_view.page().profile().installUrlSchemeHandler(SCHEME, self.tile_handler)
+        self._web_channel = QWebChannel(self.web_view.page())
+        self._web_channel.registerObject("bridge", self.map_bridge)
+        self.web_view.page().setWebChannel(self._web_channel)
+        self.web_view.setUrl(QUrl("geowizard://app/map_base.html"))
+        self.stack.addWidget(self.web_view)
+        return self.web_view
+
     def _toggle_mapbase(self, checked):
         if checked:
-            self.stack.setCurrentWidget(self.web_view)
+            try:
+                self.stack.setCurrentWidget(self._ensure_web_view())
+            except ImportError as e:
+                QMessageBox.critical(self, "Mapa base", f"No se pudo cargar QtWebEngine: {e}")
+                self.chk_mapbase.setChecked(False)
+                return
             try:
                 mgr = self._build_manager_from_table()
                 self._update_web_features(mgr)
+                self.map_bridge.request_fit()
             except Exception as e:
                 QMessageBox.warning(self, "Mapa base", f"No se pudo cargar el mapa: {e}")
         else:
@@ -622,65 +1102,96 @@ class MainWindow(QMainWindow):
         return mgr
 
     def _redraw_scene(self, mgr):
-        self.scene.clear()
         if not mgr:
+            self._metrics.clear()
+            self._scene_sync.clear()
+            self.canvas.lod_items = []
+            self.canvas.label_engine.set_source(None)
+            self.canvas.invalidar_teselas()
             return
 
-        features_for_paths = mgr.get_features()
-        for path, pen in GeometryBuilder.paths_from_features(features_for_paths):
-            self.scene.addPath(path, pen)
-
-        if self.chk_punto.isChecked():
-            for feat in mgr.get_features():
-                if feat["type"] == GeometryType.PUNTO and feat["coords"]:
-                    x, y = feat["coords"][0]
-                    size = self.point_size * self.draw_scale
-                    ellipse = self.scene.addEllipse(
-                        x - size / 2,
-                        y - size / 2,
-                        size,
-                        size,
-                        QPen(Qt.red),
-                        QBrush(Qt.red),
-                    )
-                    ellipse.setZValue(1)
+        self._sync_canvas(mgr.get_features(), self.chk_punto.isChecked())
+        # las métricas en caché sólo de los features vigentes
+        self._metrics.prune(f["id"] for f in mgr.get_features())
 
-                    label = QGraphicsTextItem(str(feat.get("id", "")))
-                    f = label.font()
-                    f.setPointSizeF(self.font_size * self.draw_scale)
-                    label.setFont(f)
-                    label.setDefaultTextColor(Qt.darkBlue)
-                    label.setPos(x + size / 2 + 1, y + size / 2 + 1)
-                    label.setZValue(1)
-                    self.scene.addItem(label)
+        if self.action_consultas.isChecked():
+            self._refresh_query_columns(mgr)
 
         if self.chk_mapbase.isChecked():
             self._update_web_features(mgr)
 
+    def _sync_canvas(self, features, show_points: bool):
+        size = self.point_size * self.draw_scale
+        self._scene_sync.sync(
+            features,
+            size,
+            show_points=show_points,
+            pixel_size=self.canvas.pixel_size(),
+        )
+        self.canvas.lod_items = self._scene_sync.lod_items()
+        self.canvas.invalidar_teselas()
+
+        capa = self._scene_sync.point_layer
+        if capa.count() == 0:
+            self.canvas.label_engine.set_source(None)
+        else:
+            font = QFont()
+            font.setPointSizeF(self.font_size)
+            self.canvas.label_engine.set_source(capa, font, size / 2 + 1)
+
+    # Columnas de la tabla con los resultados de SpatialQueries
+    QUERY_COLUMNS = ["Polígono", "Línea cercana"]
+
+    def _on_toggle_queries(self, activo: bool):
+        self.table.blockSignals(True)
+        if activo:
+            self.table.setColumnCount(3 + len(self.QUERY_COLUMNS))
+            self.table.setHorizontalHeaderLabels(["ID", "X (Este)", "Y (Norte)"] + self.QUERY_COLUMNS)
+            hdr = self.table.horizontalHeader()
+            for c in range(3, self.table.columnCount()):
+                hdr.setSectionResizeMode(c, QHeaderView.ResizeToContents)
+        else:
+            self.table.setColumnCount(3)
+        self.table.blockSignals(False)
+        if activo:
+            try:
+                self._refresh_query_columns(self._build_manager_from_table())
+            except (ValueError, TypeError) as e:
+                print(f"Error en consultas espaciales: {e}")
+
+    def _refresh_query_columns(self, mgr):
+        """Rellena las columnas de consulta para cada fila con coordenadas válidas."""
+        filas, xy = [], []
+        for r in range(self.table.rowCount()):
+            xi = self.table.item(r, 1); yi = self.table.item(r, 2)
+            try:
+                xy.append((float(xi.text()), float(yi.text())))
+                filas.append(r)
+            except (AttributeError, ValueError):
+                continue
+        atributos = SpatialQueries.point_attributes(mgr, xy) if (mgr and xy) else []
+
+        self.table.blockSignals(True)
+        for r in range(self.table.rowCount()):
+            for c in range(3, self.table.columnCount()):
+                self.table.takeItem(r, c)
+        for r, a in zip(filas, atributos):
+            linea = f"{a['linea']} ({a['dist_linea']:.2f} m)" if a["linea"] else ""
+            for c, texto in ((3, a["poligono"]), (4, linea)):
+                item = QTableWidgetItem(texto)
+                item.setFlags(Qt.ItemIsEnabled)
+                self.table.setItem(r, c, item)
+        self.table.blockSignals(False)
+
     def _update_web_features(self, mgr):
         if not self.chk_mapbase.isChecked() or not mgr:
             return
-        hemisphere = self.cb_hemisferio.currentText()
-        zone = int(self.cb_zona.currentText())
-        epsg = 32600 + zone if hemisphere.lower().startswith("n") else 32700 + zone
-        transformer = Transformer.from_crs(f"epsg:{epsg}", "epsg:4326", always_xy=True)
-        feats = []
-        for feat in mgr.get_features():
-            latlon = [transformer.transform(x, y) for x, y in feat["coords"]]
-            if feat["type"] == GeometryType.PUNTO:
-                geom = {"type": "Point", "coordinates": latlon[0]}
-            elif feat["type"] == GeometryType.POLILINEA:
-                geom = {"type": "LineString", "coordinates": latlon}
-            else:
-                geom = {"type": "Polygon", "coordinates": [latlon]}
-            feats.append({"type": "Feature", "properties": {"id": feat["id"]}, "geometry": geom})
-
-        geojson = {"type": "FeatureCollection", "features": feats}
-        js = (
-            "window.clearFeatures && window.clearFeatures();" 
-            f"window.addFeature({json.dumps(geojson)})"
+        # Sólo viajan al mapa los features nuevos, modificados o eliminados
+        self.map_bridge.sync(
+            mgr.get_features(),
+            self.cb_hemisferio.currentText(),
+            int(self.cb_zona.currentText()),
         )
-        self.web_view.page().runJavaScript(js)
 
     def _on_guardar(self):
         dirp = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta de proyecto")
@@ -702,19 +1213,41 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Nada para exportar", "No hay geometrías definidas para exportar.")
             return
 
+        # Polígonos autointersectados o con vértices repetidos: avisar antes de exportar
+        problemas = TopologyValidator.validate(features)
+        if problemas:
+            resp = QMessageBox.question(
+                self, "Geometrías inválidas",
+                f"Se encontraron {len(problemas)} problemas topológicos:\n\n"
+                f"{TopologyValidator.summary(problemas)}\n\n¿Exportar de todos modos?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+            )
+            if resp != QMessageBox.Yes:
+                return
+
         hemisphere = self.cb_hemisferio.currentText()
         zone = self.cb_zona.currentText()
 
+        metrics = self._metrics.compute(features, self._metrics_epsg(hemisphere, zone))
+        attributes = SpatialQueries.feature_attributes(mgr) if self.action_consultas.isChecked() else None
+
         try:
             export_successful = False
             if selected_format == ".kml":
-                KMLExporter.export(features, full_path_filename, hemisphere, zone)
+                from exporters.kml_exporter import KMLExporter
+                KMLExporter.export(features, full_path_filename, hemisphere, zone, metrics=metrics,
+                                   attributes=attributes)
                 export_successful = True
             elif selected_format == ".kmz":
-                KMZExporter.export(features, full_path_filename, hemisphere, zone)
+                from exporters.kmz_exporter import KMZExporter
+                KMZExporter.export(features, full_path_filename, hemisphere, zone, metrics=metrics,
+                                   attributes=attributes)
                 export_successful = True
             elif selected_format == ".shp":
-                ShapefileExporter.export(features, full_path_filename, hemisphere, zone)
+                from exporters.shapefile_exporter import ShapefileExporter
+                escritos = ShapefileExporter.export(features, full_path_filename, hemisphere, zone,
+                                                    metrics=metrics, attributes=attributes)
+                full_path_filename = "\n".join(escritos)
                 export_successful = True
             else:
                 QMessageBox.warning(self, "Formato no soportado",
@@ -735,12 +1268,18 @@ class MainWindow(QMainWindow):
         self._on_guardar()
 
     def _on_new(self):
-        self.table.clearContents()
-        self.table.setRowCount(1)
-        first = QTableWidgetItem("1"); first.setFlags(Qt.ItemIsEnabled)
-        self.table.setItem(0,0,first)
+        with self._history.group("Nuevo"):
+            self.table.clearContents()
+            self.table.setRowCount(1)
+            first = QTableWidgetItem("1"); first.setFlags(Qt.ItemIsEnabled)
+            self.table.setItem(0,0,first)
         if self.scene:
-            self.scene.clear()
+            self._scene_sync.clear()
+            self.canvas.lod_items = []
+            self.canvas.label_engine.set_source(None)
+            self.canvas.invalidar_teselas()
+        if self.map_bridge is not None:
+            self.map_bridge.clear()
 
         self.chk_punto.setChecked(False)
         self.chk_polilinea.setChecked(False)
@@ -748,13 +1287,162 @@ class MainWindow(QMainWindow):
         self.le_nombre.clear()
 
     def _on_open(self):
-        filters = "Archivos de Proyecto SIG (*.kml *.kmz *.shp);;Todos los archivos (*)"
+        filters = (f"Proyectos GeoWizard (*{PROJECT_EXTENSION} *{STORE_EXTENSION});;"
+                   "Archivos KML (*.kml);;Archivos de Coordenadas (*.csv *.txt);;Todos los archivos (*)")
         path, _ = QFileDialog.getOpenFileName(
             self, "Abrir Proyecto", "", filters
         )
-        if path:
-            QMessageBox.information(self, "Abrir Proyecto", f"Funcionalidad de abrir proyecto '{path}' aún no implementada.")
-            print(f"Abrir proyecto: {path}")
+        if not path:
+            return
+        if path.lower().endswith(PROJECT_EXTENSION):
+            self._load_project(path)
+        elif path.lower().endswith(STORE_EXTENSION):
+            self._open_store(path)
+        else:
+            with self._journal_paused(), self._history.group("Importar"):
+                self._import_path(path)
+
+    def _project_rows(self):
+        """(etiquetas, coords) de las filas de la tabla con coordenadas válidas,
+        en el mismo orden que usa _build_manager_from_table."""
+        etiquetas, coords = [], []
+        for r in range(self.table.rowCount()):
+            xi = self.table.item(r, 1); yi = self.table.item(r, 2)
+            if xi and yi and xi.text().strip() and yi.text().strip():
+                try:
+                    coords.append((float(xi.text()), float(yi.text())))
+                except ValueError:
+                    continue
+                id_item = self.table.item(r, 0)
+                etiquetas.append(id_item.text() if id_item else str(r + 1))
+        return etiquetas, coords
+
+    def _on_save_project(self):
+        nombre = (self.le_nombre.text().strip() or "proyecto") + PROJECT_EXTENSION
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Guardar Proyecto", nombre,
+            f"Proyectos GeoWizard (*{PROJECT_EXTENSION});;Base de datos GeoWizard (*{STORE_EXTENSION})"
+        )
+        if not path:
+            return
+        if not path.lower().endswith((PROJECT_EXTENSION, STORE_EXTENSION)):
+            path += STORE_EXTENSION if STORE_EXTENSION in selected_filter else PROJECT_EXTENSION
+        # mismo contenido en los dos formatos: .gwz se abre entero con mmap,
+        # .gwdb por partes desde SQLite
+        escribir = write_store if path.lower().endswith(STORE_EXTENSION) else write_project
+
+        etiquetas, coords = self._project_rows()
+        n = len(coords)
+        # Cada geometría activa es un rango sobre las mismas filas, como en
+        # _build_manager_from_table: un punto por fila, una línea y un polígono con todas
+        rangos, tipos = [], []
+        if n and self.chk_punto.isChecked():
+            rangos += [(i, i + 1) for i in range(n)]
+            tipos += [GeometryType.PUNTO] * n
+        if n >= 2 and self.chk_polilinea.isChecked():
+            rangos.append((0, n)); tipos.append(GeometryType.POLILINEA)
+        if n >= 3 and self.chk_poligono.isChecked():
+            rangos.append((0, n)); tipos.append(GeometryType.POLIGONO)
+        metadata = self._project_meta()
+        metadata["name"] = metadata["name"].strip()
+        metadata["zone"] = int(metadata["zone"])
+        metadata["settings"] = self._settings()
+        try:
+            escribir(path, coords, rangos, range(1, len(rangos) + 1), tipos, etiquetas, metadata)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            QMessageBox.critical(self, "Guardar Proyecto", f"No se pudo guardar el proyecto:\n{e}")
+            return
+        QMessageBox.information(self, "Guardar Proyecto", f"Proyecto guardado en:\n{path}")
+
+    def _load_project(self, path):
+        try:
+            proyecto = ProjectFile(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Abrir Proyecto", f"No se pudo abrir el proyecto:\n{e}")
+            return
+
+        if proyecto.n_vertices > self.PROJECT_TABLE_ROWS:
+            # el archivo queda mapeado: la ventana lee las filas visibles y el
+            # lienzo dibuja desde los arreglos
+            self._open_paged(proyecto)
+            return
+
+        with proyecto:
+            meta = proyecto.metadata
+            filas = [[etiqueta, f"{x:.15g}", f"{y:.15g}"]
+                     for etiqueta, x, y in proyecto.rows(0, proyecto.n_vertices)]
+        self._load_rows(filas, meta)
+
+    def _load_rows(self, filas, meta: dict):
+        """Reemplaza el proyecto por las filas [id, x, y] y los metadatos de un proyecto guardado."""
+        # el historial no se extiende a través de proyectos
+        with self._journal_paused(), self._history.suspended():
+            self._on_new()
+            self._apply_settings(meta.get("settings", {}), redraw=False)
+            # fila vacía al final, como la que agrega la edición
+            self._fill_table(filas + [[str(len(filas) + 1), "", ""]])
+            self._apply_meta(meta)
+        self._on_simular()
+
+    # Proyectos .gwz de hasta estas filas se cargan en la tabla; los mayores
+    # se abren en StoreDialog sobre el archivo mapeado
+    PROJECT_TABLE_ROWS = 50000
+    # Proyectos .gwdb de hasta estas filas se cargan en la tabla como un .gwz;
+    # los mayores se abren en StoreDialog, que lee la base por partes
+    STORE_TABLE_ROWS = 200000
+    # Vértices que se dibujan como máximo desde un proyecto abierto por partes
+    STORE_DRAW_VERTICES = 200000
+
+    def _open_store(self, path):
+        try:
+            store = FeatureStore(path)
+            n = store.vertex_count()
+            meta = store.metadata
+        except (OSError, ValueError, sqlite3.Error) as e:
+            QMessageBox.critical(self, "Abrir Proyecto", f"No se pudo abrir el proyecto:\n{e}")
+            return
+
+        if n <= self.STORE_TABLE_ROWS:
+            with store:
+                filas = [[label or "", "" if x is None else f"{x:.15g}", "" if y is None else f"{y:.15g}"]
+                         for label, x, y in store.rows(0, n)]
+            self._load_rows(filas, meta)
+            return
+        self._open_paged(store)
+
+    def _open_paged(self, store):
+        """Muestra un proyecto grande (FeatureStore o ProjectFile) en StoreDialog
+        y dibuja todo lo que quepa; el diálogo cierra el archivo."""
+        # la tabla no debe quedar con el proyecto anterior: el diario, el
+        # historial y "Guardar" la siguen a ella, no al proyecto mostrado
+        self._load_rows([], store.metadata)
+        dialog = StoreDialog(store, self, draw_area=self._draw_store_area)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.resize(480, 600)
+        dialog.show()
+        bounds = store.bounds()
+        self._draw_store_area(store, bounds)
+        if bounds is not None:
+            self.canvas.fitInView(QRectF(bounds[0], bounds[1], bounds[2] - bounds[0], bounds[3] - bounds[1]),
+                                  Qt.KeepAspectRatio)
+
+    def _draw_store_area(self, store, bbox=None):
+        """Dibuja en el lienzo los features del proyecto abierto por partes que
+        caen en su área visible (o en bbox)."""
+        if bbox is None:
+            area = self.canvas.mapToScene(self.canvas.viewport().rect()).boundingRect()
+            bbox = (area.left(), area.top(), area.right(), area.bottom())
+        features, vertices = [], 0
+        for feat in store.features(bbox):
+            vertices += len(feat["coords"])
+            if vertices > self.STORE_DRAW_VERTICES:
+                QMessageBox.information(
+                    self, "Dibujar proyecto",
+                    f"Se dibujaron {len(features)} geometrías; acerque la vista y vuelva a "
+                    "dibujar el área visible para ver el resto.")
+                break
+            features.append(feat)
+        self._sync_canvas(features, True)
 
     def _on_import(self):
         filters = "Archivos KML (*.kml);;Archivos de Coordenadas (*.csv *.txt);;Todos los archivos (*)"
@@ -764,7 +1452,10 @@ class MainWindow(QMainWindow):
 
         if not path:
             return
+        with self._journal_paused(), self._history.group("Importar"):
+            self._import_path(path)
 
+    def _import_path(self, path):
         file_ext = os.path.splitext(path)[1].lower()
 
         if file_ext in ['.csv', '.txt']:
@@ -805,6 +1496,11 @@ class MainWindow(QMainWindow):
                     )
                     return
 
+                # Puntos repetidos o a menos de la tolerancia: se conserva el primero
+                fusiones = []
+                if self.import_dedup:
+                    valid_feats, fusiones = PointDeduplicator.deduplicate(valid_feats, self.import_tolerance)
+
                 # 3) Limpiamos la tabla y creamos tantas filas como valid_feats haya
                 self._on_new()
                 self.table.setRowCount(len(valid_feats))
@@ -834,11 +1530,19 @@ class MainWindow(QMainWindow):
                 try:
                     mgr = self._build_manager_from_table()
                     self._redraw_scene(mgr)
-                    QMessageBox.information(
-                        self,
-                        "Importación CSV Exitosa",
-                        f"{len(valid_feats)} puntos importados desde {os.path.basename(path)}."
-                    )
+                    msg = QMessageBox(self)
+                    msg.setIcon(QMessageBox.Information)
+                    msg.setWindowTitle("Importación CSV Exitosa")
+                    texto = f"{len(valid_feats)} puntos importados desde {os.path.basename(path)}."
+                    if fusiones:
+                        fusionados = sum(len(f["merged"]) for f in fusiones)
+                        texto += (
+                            f"\n{fusionados} puntos duplicados (tolerancia {self.import_tolerance:g} m) "
+                            f"se fusionaron en {len(fusiones)} puntos."
+                        )
+                        msg.setDetailedText(PointDeduplicator.summary(fusiones))
+                    msg.setText(texto)
+                    msg.exec()
                 except (ValueError, TypeError) as e:
                     QMessageBox.critical(
                         self,
@@ -867,14 +1571,9 @@ class MainWindow(QMainWindow):
 
         elif file_ext == '.kml':
             try:
-                hemisphere = self.cb_hemisferio.currentText()
-                zone_str = self.cb_zona.currentText()
-                if not zone_str:
-                    QMessageBox.warning(self, "Zona no seleccionada", "Por favor, seleccione una zona UTM antes de importar KML.")
-                    return
-                zone = int(zone_str)
-
-                imported_features = KMLImporter.import_file(path, hemisphere, zone)
+                from importers.kml_importer import KMLImporter
+                # la zona de cada geometría se detecta por su posición
+                imported_features = KMLImporter.import_file(path, self.cb_hemisferio.currentText(), AUTO_ZONE)
 
                 if not imported_features:
                     QMessageBox.information(self, "Importación KML", "No se importaron geometrías válidas desde el archivo KML.")
@@ -882,6 +1581,15 @@ class MainWindow(QMainWindow):
 
                 self._on_new()
 
+                # la tabla es de una sola zona: la que tiene más vértices; las
+                # geometrías de otras zonas se reproyectan a ella
+                epsg = dominant_epsg(imported_features)
+                zonas = sorted({f["epsg"] for f in imported_features})
+                imported_features = reproject_features(imported_features, epsg)
+                hemisphere, zone = utm_zone(epsg)
+                self.cb_hemisferio.setCurrentText(hemisphere)
+                self.cb_zona.setCurrentText(str(zone))
+
                 row_index = 0  # fila actual en la tabla
 
                 for feat in imported_features:
@@ -922,8 +1630,14 @@ class MainWindow(QMainWindow):
                 try:
                     mgr = self._build_manager_from_table()
                     self._redraw_scene(mgr)
+                    aviso_zona = f"Zona UTM detectada: {zone} ({hemisphere}).\n"
+                    if len(zonas) > 1:
+                        otras = ", ".join(f"{z}{h[0]}" for h, z in map(utm_zone, zonas))
+                        aviso_zona = (f"Las geometrías abarcan las zonas {otras}; se reproyectaron "
+                                      f"a la zona {zone} ({hemisphere}), la de más vértices.\n")
                     QMessageBox.information(self, "Importación KML Exitosa",
                                             f"{len(imported_features)} geometrías importadas desde {os.path.basename(path)}.\n"
+                                            + aviso_zona +
                                             "Active los checkboxes de tipo de geometría (Punto, Polilínea, Polígono)\n"
                                             "para visualizar y procesar los datos importados.")
                 except (ValueError, TypeError) as e:
@@ -940,40 +1654,162 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Formato no Soportado",
                                 f"La importación del formato de archivo '{file_ext}' aún no está implementada.")
 
+    # ─── Deshacer / rehacer ───
+
+    def _history_event(self, metodo, *args):
+        metodo(*args)
+        # fuera de un grupo, lo registrado en una misma vuelta del bucle de
+        # eventos (p. ej. la celda editada y la fila que se agrega) es un paso
+        if self._history.pending and not self._history_commit_pendiente:
+            self._history_commit_pendiente = True
+            QTimer.singleShot(0, self._history_commit)
+
+    def _history_commit(self):
+        self._history_commit_pendiente = False
+        self._history.commit()
+
+    def _update_undo_actions(self):
+        self.action_deshacer.setEnabled(self._history.can_undo())
+        self.action_rehacer.setEnabled(self._history.can_redo())
+        self.action_deshacer.setToolTip(f"Deshacer {self._history.undo_text()}".strip())
+        self.action_rehacer.setToolTip(f"Rehacer {self._history.redo_text()}".strip())
+
+    def _apply_history(self, metodo):
+        # sin itemChanged: no se auto-agregan filas ni se redibuja por celda;
+        # el diario sí registra los cambios (escucha al modelo)
+        self.table.blockSignals(True)
+        try:
+            hecho = metodo()
+        finally:
+            self.table.blockSignals(False)
+        if not hecho:
+            return
+        try:
+            mgr = self._build_manager_from_table()
+            self._redraw_scene(mgr)
+        except (ValueError, TypeError) as e:
+            print(f"Error al construir features para preview tras deshacer: {e}")
+
     def _on_undo(self):
-        QMessageBox.information(self, "Deshacer", "Funcionalidad de Deshacer aún no implementada.")
-        print("Deshacer acción")
+        self._apply_history(self._history.undo)
 
     def _on_redo(self):
-        QMessageBox.information(self, "Rehacer", "Funcionalidad de Rehacer aún no implementada.")
-        print("Rehacer acción")
+        self._apply_history(self._history.redo)
 
-    def _on_settings(self):
-        current = {
+    def _metrics_epsg(self, hemisphere: str, zone):
+        """EPSG con el que medir en modo geodésico, o None para medir en el plano UTM."""
+        return utm_epsg(hemisphere, zone) if self.geodesic else None
+
+    def _settings(self) -> dict:
+        return {
             "dark_mode": self._modo_oscuro,
             "draw_scale": self.draw_scale,
             "point_size": self.point_size,
             "font_size": self.font_size,
+            "cache_tiles": self.cache_tiles,
+            "cache_tiles_mb": self.cache_tiles_mb,
+            "map_cache_mb": self.map_cache_mb,
+            "map_offline": self.map_offline,
+            "geodesic": self.geodesic,
+            "import_dedup": self.import_dedup,
+            "import_tolerance": self.import_tolerance,
+            "undo_budget_mb": self.undo_budget_mb,
         }
-        dialog = ConfigDialog(self, current)
+
+    def _apply_settings(self, vals: dict, redraw: bool = True):
+        self.draw_scale = vals.get("draw_scale", self.draw_scale)
+        self.point_size = vals.get("point_size", self.point_size)
+        self.font_size = vals.get("font_size", self.font_size)
+        self.cache_tiles = vals.get("cache_tiles", self.cache_tiles)
+        self.cache_tiles_mb = vals.get("cache_tiles_mb", self.cache_tiles_mb)
+        self.canvas.set_cached_rendering(self.cache_tiles, self.cache_tiles_mb)
+        self.map_cache_mb = vals.get("map_cache_mb", self.map_cache_mb)
+        self.map_offline = vals.get("map_offline", self.map_offline)
+        self.geodesic = vals.get("geodesic", self.geodesic)
+        self.import_dedup = vals.get("import_dedup", self.import_dedup)
+        self.import_tolerance = vals.get("import_tolerance", self.import_tolerance)
+        self.undo_budget_mb = vals.get("undo_budget_mb", self.undo_budget_mb)
+        self._history.set_budget(self.undo_budget_mb * 1024 * 1024)
+        if self.tile_handler is not None:
+            self.map_tiles.set_max_bytes(self.map_cache_mb * 1024 * 1024)
+            self.tile_handler.offline = self.map_offline
+        self._toggle_modo(vals.get("dark_mode", self._modo_oscuro))
+        if not redraw:
+            return
+        try:
+            mgr = self._build_manager_from_table()
+            self._redraw_scene(mgr)
+        except (ValueError, TypeError) as e:
+            print(f"Error aplicando configuración: {e}")
+
+    def _on_settings(self):
+        dialog = ConfigDialog(self, self._settings())
         if dialog.exec():
-            vals = dialog.get_values()
-            self.draw_scale = vals.get("draw_scale", self.draw_scale)
-            self.point_size = vals.get("point_size", self.point_size)
-            self.font_size = vals.get("font_size", self.font_size)
-            self._toggle_modo(vals.get("dark_mode", self._modo_oscuro))
-            try:
-                mgr = self._build_manager_from_table()
-                self._redraw_scene(mgr)
-            except (ValueError, TypeError) as e:
-                print(f"Error aplicando configuración: {e}")
+            self._apply_settings(dialog.get_values())
+
+    def _features_bounds_wgs84(self):
+        """
+        (sur, oeste, norte, este) de las geometrías de la tabla, o None si no
+        hay. Se calcula de la tabla y no del mapa web, que sólo está al día
+        con el mapa base activado.
+        """
+        try:
+            features = self._build_manager_from_table().get_features()
+        except (ValueError, TypeError):
+            return None
+        epsg = utm_epsg(self.cb_hemisferio.currentText(), self.cb_zona.currentText())
+        lons, lats = [], []
+        for feat in features:
+            if feat.get("coords"):
+                for lon, lat in self._wgs84.get(feat, epsg):
+                    lons.append(lon)
+                    lats.append(lat)
+        if not lons:
+            return None
+        return min(lats), min(lons), max(lats), max(lons)
+
+    def _on_seed_tiles(self):
+        """
+        Descarga en la caché del mapa base las teselas que cubren las
+        geometrías actuales, desde el zoom 0 hasta el elegido.
+        """
+        caja = self._features_bounds_wgs84()
+        if caja is None:
+            QMessageBox.warning(self, "Sin geometrías", "Dibuje o importe geometrías antes de descargar el mapa.")
+            return
+        zmax, ok = QInputDialog.getInt(self, "Descargar mapa", "Zoom máximo:", 16, 0, 19)
+        if not ok:
+            return
+        from core.tile_server import TileSeeder
+        try:
+            seeder = TileSeeder(self._ensure_tile_server(), *caja, 0, zmax, parent=self)
+        except ValueError as e:
+            QMessageBox.warning(self, "Zona demasiado grande", str(e))
+            return
+
+        progreso = QProgressDialog("Descargando teselas...", "Cancelar", 0, seeder.total, self)
+        progreso.setWindowModality(Qt.WindowModal)
+        progreso.canceled.connect(seeder.cancel)
+        seeder.progress.connect(lambda hechas, total: progreso.setValue(hechas))
+
+        def terminado(errores):
+            progreso.close()
+            seeder.deleteLater()
+            if errores:
+                QMessageBox.warning(self, "Descargar mapa", f"{errores} teselas no se pudieron descargar.")
+
+        seeder.finished.connect(terminado)
+        seeder.start()
 
     def _on_help(self):
         dialog = HelpDialog(self)
         dialog.exec()
 
+    # Filas de coordenadas que se muestran en la vista previa del resumen
+    REPORT_PREVIEW_ROWS = 200
+
     def _on_export_html(self):
-        coords = []
+        ids, coords = [], []
         for r in range(self.table.rowCount()):
             xi = self.table.item(r, 1)
             yi = self.table.item(r, 2)
@@ -981,42 +1817,47 @@ class MainWindow(QMainWindow):
                 try:
                     x = float(xi.text())
                     y = float(yi.text())
-                    coords.append((x, y))
                 except ValueError:
                     continue
+                ids.append(self.table.item(r, 0).text() if self.table.item(r, 0) else str(r + 1))
+                coords.append((x, y))
 
-        if len(coords) < 2:
-            QMessageBox.warning(self, "Geometría insuficiente", "Se necesitan al menos 2 puntos para calcular perímetro.")
+        # Métricas de las polilíneas y polígonos que arma la tabla
+        try:
+            mgr = self._build_manager_from_table()
+            epsg = self._metrics_epsg(self.cb_hemisferio.currentText(), self.cb_zona.currentText())
+        except (ValueError, TypeError) as e:
+            QMessageBox.critical(self, "Error", str(e))
             return
+        lineales = [f for f in mgr.get_features()
+                    if f["type"] in (GeometryType.POLILINEA, GeometryType.POLIGONO)]
+        if not lineales:
+            QMessageBox.warning(self, "Geometría insuficiente",
+                                "Active Polilínea o Polígono (con al menos 2 o 3 puntos) para calcular el resumen.")
+            return
+        metricas = self._metrics.compute(lineales, epsg)
+        self._metrics.prune(f["id"] for f in mgr.get_features())
+        sufijo = " (geodésico)" if epsg is not None else ""
+
+        resumen = []
+        for feat in lineales:
+            m = metricas[feat["id"]]
+            # con varias geometrías cada fila indica a cuál corresponde
+            cual = f" ({feat['type']} {feat['id']})" if len(lineales) > 1 else ""
+            if feat["type"] == GeometryType.POLILINEA:
+                resumen.append((f"Longitud{sufijo}{cual}", f"{m['length']:.2f} m"))
+                continue
+            cx, cy = m["centroid"]
+            resumen.append((f"Perímetro{sufijo}{cual}", f"{m['perimeter']:.2f} m"))
+            resumen.append((f"Área{sufijo}{cual}", f"{m['area']:.2f} m²"))
+            resumen.append((f"Centroide{cual}", f"{cx:.2f}, {cy:.2f}"))
 
-        def distancia(a, b):
-            return ((a[0] - b[0])**2 + (a[1] - b[1])**2) ** 0.5
-
-        perimetro = sum(distancia(coords[i], coords[i+1]) for i in range(len(coords)-1))
-        if self.chk_poligono.isChecked() and len(coords) >= 3:
-            perimetro += distancia(coords[-1], coords[0])
-
-        area = 0
-        if self.chk_poligono.isChecked() and len(coords) >= 3:
-            area = 0.5 * abs(sum(coords[i][0]*coords[i+1][1] - coords[i+1][0]*coords[i][1] for i in range(-1, len(coords)-1)))
-
-        # HTML visual
-        html = "<table border='1' cellpadding='4' cellspacing='0'>"
-        html += "<tr><th>ID</th><th>Este (X)</th><th>Norte (Y)</th></tr>"
-        for r in range(len(coords)):
-            id_val = self.table.item(r, 0).text() if self.table.item(r, 0) else str(r+1)
-            html += f"<tr><td>{id_val}</td><td>{coords[r][0]:.2f}</td><td>{coords[r][1]:.2f}</td></tr>"
-
-        # Fila única combinada para Perímetro
-        html += f"<tr><td colspan='3'><b>Perímetro:</b> {perimetro:.2f} m</td></tr>"
-
-        # Fila única combinada para Área (si aplica)
-        if self.chk_poligono.isChecked() and len(coords) >= 3:
-            html += f"<tr><td colspan='3'><b>Área:</b> {area:.2f} m²</td></tr>"
-
-        html += "</table>"
-
+        def filas():
+            return ((fid, x, y) for fid, (x, y) in zip(ids, coords))
 
+        # La vista previa sólo muestra la primera página; copiar y guardar
+        # generan el reporte completo por bloques
+        preview = ReportExporter.to_string(filas(), resumen, "html", self.REPORT_PREVIEW_ROWS)
 
         # Diálogo modal visual
         dlg = QDialog(self)
@@ -1026,16 +1867,43 @@ class MainWindow(QMainWindow):
 
         view = QTextEdit()
         view.setReadOnly(True)
-        view.setHtml(html)
+        view.setHtml(preview)
+        layout.addWidget(view)
+        if len(coords) > self.REPORT_PREVIEW_ROWS:
+            layout.addWidget(QLabel(
+                f"Vista previa: {self.REPORT_PREVIEW_ROWS} de {len(coords)} filas. "
+                "Copiar y guardar incluyen todas."
+            ))
 
         btn_copiar = QPushButton("Copiar código HTML")
-        btn_copiar.clicked.connect(lambda: QApplication.clipboard().setText(html))
+        btn_copiar.clicked.connect(
+            lambda: QApplication.clipboard().setText(ReportExporter.to_string(filas(), resumen, "html"))
+        )
+        btn_copiar_csv = QPushButton("Copiar CSV")
+        btn_copiar_csv.clicked.connect(
+            lambda: QApplication.clipboard().setText(ReportExporter.to_string(filas(), resumen, "csv"))
+        )
+
+        def guardar():
+            nombre, _ = QFileDialog.getSaveFileName(
+                dlg, "Guardar reporte", "", "HTML (*.html);;CSV (*.csv)"
+            )
+            if not nombre:
+                return
+            try:
+                ReportExporter.export(filas(), resumen, nombre)
+            except (OSError, ValueError) as e:
+                QMessageBox.critical(dlg, "Error al guardar", str(e))
+
+        btn_guardar = QPushButton("Guardar reporte...")
+        btn_guardar.clicked.connect(guardar)
 
         btn_cerrar = QPushButton("Cerrar")
         btn_cerrar.clicked.connect(dlg.close)
 
-        layout.addWidget(view)
         layout.addWidget(btn_copiar)
+        layout.addWidget(btn_copiar_csv)
+        layout.addWidget(btn_guardar)
         layout.addWidget(btn_cerrar)
 
         dlg.setLayout(layout)
@@ -1047,20 +1915,33 @@ class MainWindow(QMainWindow):
             self._redraw_scene(mgr)
             if self.chk_mapbase.isChecked():
                 self._update_web_features(mgr)
+                self.map_bridge.request_fit()
             if self.scene.items():
                 self.canvas.fitInView(self.scene.itemsBoundingRect(), Qt.KeepAspectRatio)
         except (ValueError, TypeError) as e:
             QMessageBox.warning(self, "Error", f"No se pudo simular: {e}")
 
     def _on_zoom_in(self):
-        self.canvas.scale(1.2, 1.2)
+        self.canvas.zoom(1.2)
 
     def _on_zoom_out(self):
-        self.canvas.scale(0.8, 0.8)
+        self.canvas.zoom(0.8)
+
+    def closeEvent(self, event):
+        if self.map_tiles is not None:
+            self.map_tiles.close()
+        # cierre limpio: no hay nada que recuperar en el próximo inicio
+        if self._journal_lock is not None:
+            self._journal.discard()
+            self._journal_lock.unlock()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     import sys
+    from core.web_scheme import register_scheme
+    register_scheme()
     app = QApplication(sys.argv)
+    app.setApplicationName("GeoWizard")
     win = MainWindow()
     win.show()
     sys.exit(app.exec())
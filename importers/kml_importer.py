@@ -1,8 +1,11 @@
 import xml.etree.ElementTree as ET
-from pyproj import Transformer, ProjError
+from pyproj import ProjError
+import math
 import os # Para el bloque de pruebas
 import re
 
+from core.crs import AUTO_ZONE, WGS84_EPSG, project_parts
+
 
 # from core.coordinate_manager import GeometryType # Para usar constantes de tipo GeometryType.PUNTO etc.
 
@@ -40,14 +43,16 @@ class KMLImporter:
         return points
 
     @staticmethod
-    def import_file(filepath: str, target_hemisphere: str, target_zone: int) -> list[dict]:
+    def import_file(filepath: str, target_hemisphere: str, target_zone) -> list[dict]:
         """
         Importa geometrías desde un archivo KML, transformándolas al sistema UTM especificado.
 
         Args:
             filepath: Ruta al archivo KML.
             target_hemisphere: Hemisferio de destino ("Norte" o "Sur").
-            target_zone: Zona UTM de destino (entero, 1-60).
+            target_zone: Zona UTM de destino (entero, 1-60) o AUTO_ZONE para
+                         detectar la zona y el hemisferio de cada geometría;
+                         en ese caso cada feature lleva su "epsg".
 
         Returns:
             Una lista de diccionarios de features.
@@ -60,7 +65,9 @@ class KMLImporter:
         features = []
         sequential_id_counter = 1
 
-        try:
+        if str(target_zone).lower() == AUTO_ZONE:
+            target_epsg = None
+        else:
             zone_int = int(target_zone) # Asegurar que target_zone sea int
             if not (1 <= zone_int <= 60):
                 raise ValueError(f"Zona UTM '{target_zone}' inválida. Debe estar entre 1 y 60.")
@@ -68,11 +75,10 @@ class KMLImporter:
                 raise ValueError(f"Hemisferio '{target_hemisphere}' no reconocido. Debe ser 'Norte' o 'Sur'.")
 
             target_epsg = 32600 + zone_int if target_hemisphere.lower() == 'norte' else 32700 + zone_int
-            transformer = Transformer.from_crs("EPSG:4326", f"EPSG:{target_epsg}", always_xy=True)
-        except ValueError as e:
-            raise e
-        except ProjError as e:
-            raise RuntimeError(f"Error al inicializar el transformador de coordenadas para zona {target_zone}{target_hemisphere}: {e}")
+
+        # (id, tipo, coordenadas lon/lat) de cada Placemark; se transforman
+        # todas juntas al final, un solo transform por zona de destino
+        pendientes = []
 
         try:
             tree = ET.parse(filepath)
@@ -147,40 +153,42 @@ class KMLImporter:
                     print(f"Advertencia: No se pudieron parsear coordenadas para Placemark ID {feature_id}. Omitiendo.")
                     continue
 
-                transformed_coords_utm = []
-                valid_geometry_after_transform = True
-                for lon, lat in lon_lat_coords:
-                    try:
-                        utm_x, utm_y = transformer.transform(lon, lat)
-                        transformed_coords_utm.append((utm_x, utm_y))
-                    except ProjError as pe:
-                        print(f"Advertencia: Error al transformar coordenada ({lon},{lat}) para Placemark ID {feature_id}. Error: {pe}. Omitiendo feature completo.")
-                        valid_geometry_after_transform = False
-                        break
-
-                if not valid_geometry_after_transform or not transformed_coords_utm:
-                    continue
-
-                if app_geom_type == "Punto" and len(transformed_coords_utm) != 1:
+                if app_geom_type == "Punto" and len(lon_lat_coords) != 1:
                     print(f"Advertencia: Feature Punto ID {feature_id} no resultó en 1 coordenada. Omitiendo.")
                     continue
-                elif app_geom_type == "Polilínea" and len(transformed_coords_utm) < 2:
+                elif app_geom_type == "Polilínea" and len(lon_lat_coords) < 2:
                     print(f"Advertencia: Feature Polilínea ID {feature_id} resultó en <2 coordenadas. Omitiendo.")
                     continue
-                elif app_geom_type == "Polígono" and len(transformed_coords_utm) < 3: # 3 puntos base para un polígono
+                elif app_geom_type == "Polígono" and len(lon_lat_coords) < 3: # 3 puntos base para un polígono
                     print(f"Advertencia: Feature Polígono ID {feature_id} resultó en <3 coordenadas base. Omitiendo.")
                     continue
 
-                features.append({
+                pendientes.append((feature_id, app_geom_type, lon_lat_coords))
+
+            try:
+                proyectadas = project_parts([p[2] for p in pendientes], WGS84_EPSG, target_epsg)
+            except ProjError as e:
+                raise RuntimeError(f"Error al transformar las coordenadas a UTM: {e}")
+
+            for (feature_id, app_geom_type, _), (epsg, transformed_coords_utm) in zip(pendientes, proyectadas):
+                if not all(math.isfinite(v) for c in transformed_coords_utm for v in c):
+                    print(f"Advertencia: Error al transformar coordenadas para Placemark ID {feature_id}. Omitiendo feature completo.")
+                    continue
+                feat = {
                     "id": feature_id,
                     "type": app_geom_type,
                     "coords": transformed_coords_utm
-                })
+                }
+                if target_epsg is None:
+                    feat["epsg"] = epsg
+                features.append(feat)
 
         except ET.ParseError as e:
             raise RuntimeError(f"Error al parsear el archivo KML: {filepath}. Archivo malformado o no es KML. Detalle: {e}")
         except FileNotFoundError:
             raise FileNotFoundError(f"Archivo no encontrado: {filepath}")
+        except RuntimeError:
+            raise
         except Exception as e:
             raise RuntimeError(f"Error inesperado al importar el archivo KML '{filepath}': {e}")
 
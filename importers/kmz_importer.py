@@ -0,0 +1,34 @@
+# importers/kmz_importer.py
+import zipfile
+
+from importers.kml_importer import KMLImporter
+
+
+class KMZImporter:
+    @staticmethod
+    def import_file(filepath: str, target_hemisphere: str, target_zone) -> list[dict]:
+        """
+        Importa geometrías desde un KMZ: toma el KML principal del archivo
+        comprimido (doc.kml o, si no existe, el primer .kml) y lo procesa con
+        KMLImporter sin extraerlo a disco (target_zone admite AUTO_ZONE, como
+        en KMLImporter).
+
+        Raises:
+            FileNotFoundError: Si el archivo no se encuentra.
+            RuntimeError: Si no es un ZIP válido o no contiene ningún KML.
+            ValueError: Para parámetros de zona/hemisferio inválidos.
+        """
+        try:
+            kmz = zipfile.ZipFile(filepath)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Archivo no encontrado: {filepath}")
+        except zipfile.BadZipFile as e:
+            raise RuntimeError(f"El archivo '{filepath}' no es un KMZ válido: {e}")
+
+        with kmz:
+            nombres = [n for n in kmz.namelist() if n.lower().endswith(".kml")]
+            if not nombres:
+                raise RuntimeError(f"El archivo KMZ '{filepath}' no contiene ningún KML.")
+            principal = "doc.kml" if "doc.kml" in nombres else nombres[0]
+            with kmz.open(principal) as kml:
+                return KMLImporter.import_file(kml, target_hemisphere, target_zone)
@@ -0,0 +1,124 @@
+# importers/shapefile_importer.py
+import fiona
+from pyproj import CRS
+
+from core.crs import AUTO_ZONE, get_transformer, is_utm_epsg, project_parts, utm_epsg
+
+
+class ShapefileImporter:
+    # Tipos de geometría de fiona -> tipos de la aplicación
+    GEOMETRY_TYPES = {
+        "Point": "Punto",
+        "LineString": "Polilínea",
+        "Polygon": "Polígono",
+    }
+
+    @staticmethod
+    def _partes(geometry: dict):
+        """(tipo de la aplicación, coordenadas) de cada parte de la geometría;
+        las geometrías Multi* se separan en un feature por parte."""
+        tipo = geometry["type"]
+        coords = geometry["coordinates"]
+        if tipo.startswith("Multi"):
+            tipo = tipo[len("Multi"):]
+        else:
+            coords = [coords]
+        app_type = ShapefileImporter.GEOMETRY_TYPES.get(tipo)
+        if app_type is None:
+            return
+        for parte in coords:
+            if tipo == "Point":
+                puntos = [parte]
+            elif tipo == "Polygon":
+                # sólo el anillo exterior, sin el vértice de cierre
+                puntos = list(parte[0]) if parte else []
+                if len(puntos) > 1 and tuple(puntos[0]) == tuple(puntos[-1]):
+                    puntos = puntos[:-1]
+            else:
+                puntos = list(parte)
+            yield app_type, [(float(c[0]), float(c[1])) for c in puntos]
+
+    @staticmethod
+    def import_file(filepath: str, target_hemisphere: str, target_zone) -> list[dict]:
+        """
+        Importa geometrías desde un Shapefile y las reproyecta a la zona UTM
+        indicada si el CRS de la capa es otro (sin .prj se asume que ya está
+        en esa zona). Con target_zone=AUTO_ZONE la zona de cada geometría se
+        detecta por su posición y cada feature lleva su "epsg"; para eso la
+        capa debe tener .prj.
+
+        El ID se toma del campo 'id' si es entero. Los registros sin él, los
+        que repiten uno ya usado y las partes de geometrías Multi* se numeran
+        en orden a continuación del mayor ID del campo, así no hay repetidos.
+
+        Raises:
+            FileNotFoundError: Si el archivo no se encuentra.
+            RuntimeError: Para errores de lectura o reproyección.
+            ValueError: Para parámetros de zona/hemisferio inválidos.
+        """
+        auto = str(target_zone).lower() == AUTO_ZONE
+        target_epsg = None if auto else utm_epsg(target_hemisphere, target_zone)
+        features = []
+
+        try:
+            with fiona.open(filepath) as layer:
+                transformer = None
+                source_epsg = None
+                if layer.crs_wkt:
+                    source_epsg = CRS.from_wkt(layer.crs_wkt).to_epsg()
+                    if source_epsg is None:
+                        raise RuntimeError(f"No se pudo identificar el CRS de '{filepath}'.")
+                    if not auto and source_epsg != target_epsg:
+                        transformer = get_transformer(source_epsg, target_epsg)
+                elif auto:
+                    raise ValueError(f"'{filepath}' no tiene .prj: indique la zona UTM.")
+
+                for record in layer:
+                    geometry = record["geometry"]
+                    if geometry is None:
+                        continue
+                    fid = record["properties"].get("id") if "id" in record["properties"] else None
+                    partes = list(ShapefileImporter._partes(geometry))
+                    if not partes:
+                        print(f"Advertencia: Geometría '{geometry['type']}' no soportada. Omitiendo.")
+                        continue
+                    for app_type, coords in partes:
+                        # las partes de un Multi* y los registros sin id entero se numeran al final
+                        feature_id = fid if isinstance(fid, int) and len(partes) == 1 else None
+                        if transformer is not None and coords:
+                            xs, ys = transformer.transform([c[0] for c in coords], [c[1] for c in coords])
+                            coords = list(zip(xs, ys))
+                        minimo = {"Punto": 1, "Polilínea": 2, "Polígono": 3}[app_type]
+                        if len(coords) < minimo:
+                            print(f"Advertencia: Feature {app_type} ID {fid} tiene menos de {minimo} coordenadas. Omitiendo.")
+                            continue
+                        features.append({"id": feature_id, "type": app_type, "coords": coords})
+
+                # IDs únicos: los que faltan o se repiten siguen al mayor del campo 'id'
+                siguiente = max((f["id"] for f in features if f["id"] is not None), default=0) + 1
+                usados = set()
+                for feat in features:
+                    if feat["id"] is None or feat["id"] in usados:
+                        feat["id"] = siguiente
+                        siguiente += 1
+                    usados.add(feat["id"])
+
+                if auto and features:
+                    # un lote por zona detectada; una capa ya en UTM conserva su zona
+                    destino = source_epsg if is_utm_epsg(source_epsg) else None
+                    for feat, (epsg, coords) in zip(features, project_parts(
+                            [f["coords"] for f in features], source_epsg, destino)):
+                        feat["coords"] = coords
+                        feat["epsg"] = epsg
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Archivo no encontrado: {filepath}")
+        except fiona.errors.DriverError as e:
+            if "No such file" in str(e) or "does not exist" in str(e):
+                raise FileNotFoundError(f"Archivo no encontrado: {filepath}")
+            raise RuntimeError(f"Error al abrir el Shapefile '{filepath}': {e}")
+        except (RuntimeError, ValueError):
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error inesperado al importar el Shapefile '{filepath}': {e}")
+
+        return features
@@ -0,0 +1,51 @@
+# importers/store_importer.py
+import os
+
+from core.crs import AUTO_ZONE, utm_epsg, get_transformer
+from core.feature_store import FeatureStore
+
+
+class StoreImporter:
+    @staticmethod
+    def iter_file(filepath: str, target_hemisphere: str, target_zone):
+        """
+        Genera los features de un proyecto .gwdb de a uno, reproyectados a la
+        zona UTM indicada si el proyecto se guardó en otra (ver import_file).
+        Con target_zone=AUTO_ZONE se conserva la zona del proyecto y cada
+        feature lleva su "epsg".
+        """
+        auto = str(target_zone).lower() == AUTO_ZONE
+        target_epsg = None if auto else utm_epsg(target_hemisphere, target_zone)
+        if not os.path.exists(filepath):
+            # sqlite crearía una base vacía
+            raise FileNotFoundError(f"Archivo no encontrado: {filepath}")
+        with FeatureStore(filepath) as store:
+            meta = store.metadata
+            transformer = None
+            source_epsg = None
+            if "zone" in meta and "hemisphere" in meta:
+                source_epsg = utm_epsg(meta["hemisphere"], meta["zone"])
+                if not auto and source_epsg != target_epsg:
+                    transformer = get_transformer(source_epsg, target_epsg)
+            elif auto:
+                raise ValueError(f"El proyecto '{filepath}' no guarda su zona: indique la zona UTM.")
+            for feat in store.features():
+                if transformer is not None:
+                    xs, ys = transformer.transform([c[0] for c in feat["coords"]], [c[1] for c in feat["coords"]])
+                    feat["coords"] = list(zip(xs, ys))
+                elif auto:
+                    feat["epsg"] = source_epsg
+                yield feat
+
+    @staticmethod
+    def import_file(filepath: str, target_hemisphere: str, target_zone) -> list[dict]:
+        """
+        Importa los features de un proyecto .gwdb. Las coordenadas están en la
+        zona UTM guardada en sus metadatos; si es otra, se reproyectan (sin
+        metadatos se asume que ya están en la zona indicada).
+
+        Raises:
+            FileNotFoundError: Si el archivo no se encuentra.
+            ValueError: Si no es un proyecto válido o la zona/hemisferio lo son.
+        """
+        return list(StoreImporter.iter_file(filepath, target_hemisphere, target_zone))
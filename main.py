@@ -1,11 +1,57 @@
 import sys
+import time
+
+# Referencia para medir el arranque (python main.py --perfil-arranque)
+_INICIO = time.perf_counter()
+
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from gui import MainWindow
+from core.web_scheme import register_scheme
+
+PERFIL_ARG = "--perfil-arranque"
+
+
+class StartupProfile:
+    """Tiempos de las etapas del arranque, acumulados desde _INICIO."""
+
+    def __init__(self):
+        self.etapas = []
+
+    def mark(self, etapa: str):
+        self.etapas.append((etapa, time.perf_counter() - _INICIO))
+
+    def report(self) -> str:
+        lineas = []
+        anterior = 0.0
+        for etapa, t in self.etapas:
+            lineas.append(f"{etapa:<28}{(t - anterior) * 1000:9.1f} ms{t * 1000:10.1f} ms")
+            anterior = t
+        return "\n".join(lineas)
+
 
 def main():
-    app = QApplication(sys.argv)
+    perfil = StartupProfile()
+    perfil.mark("Importaciones")
+    # El esquema geowizard:// debe registrarse antes de crear la aplicación
+    register_scheme()
+    app = QApplication([a for a in sys.argv if a != PERFIL_ARG])
+    app.setApplicationName("GeoWizard")
+    perfil.mark("QApplication")
     window = MainWindow()
+    perfil.mark("MainWindow")
     window.show()
+    perfil.mark("show()")
+
+    if PERFIL_ARG in sys.argv:
+        # Modo de medición: se informa al procesar el primer ciclo de eventos
+        # (ventana ya pintada) y se sale
+        def terminar():
+            perfil.mark("Primer ciclo de eventos")
+            print(perfil.report(), file=sys.stderr)
+            app.quit()
+        QTimer.singleShot(0, terminar)
+
     sys.exit(app.exec())
 
 if __name__ == "__main__":
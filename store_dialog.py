@@ -0,0 +1,80 @@
+import os
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+    QTableView, QHeaderView, QPushButton,
+    QDialogButtonBox, QFileDialog, QMessageBox
+)
+
+from core.store_model import StoreTableModel
+from exporters.csv_exporter import CSVExporter
+
+class StoreDialog(QDialog):
+    """
+    Proyecto (.gwdb o .gwz) demasiado grande para la tabla principal. La
+    tabla lee el archivo por ventanas y, en un .gwdb, las ediciones de X/Y
+    se guardan en él al momento; el lienzo dibuja sólo lo que cae en su
+    área visible.
+    """
+    def __init__(self, store, parent=None, draw_area=None):
+        super().__init__(parent)
+        self.store = store
+        self._draw_area = draw_area
+        self.setWindowTitle(f"Proyecto: {os.path.basename(store.path)}")
+        self._build_ui()
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.info_label = QLabel(
+            f"{self.store.vertex_count()} filas, {self.store.feature_count()} geometrías"
+            + (" (sólo lectura)" if self.store.read_only else "")
+        )
+        layout.addWidget(self.info_label)
+
+        self.model = StoreTableModel(self.store, self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        # alto de fila fijo: la vista no tiene que medir cada fila
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        layout.addWidget(self.view)
+
+        acciones = QHBoxLayout()
+        btn_area = QPushButton("Dibujar área visible")
+        btn_area.setToolTip("Dibujar en el lienzo las geometrías del área que muestra")
+        btn_area.clicked.connect(self._on_draw_area)
+        btn_area.setEnabled(self._draw_area is not None)
+        acciones.addWidget(btn_area)
+        btn_csv = QPushButton("Exportar CSV…")
+        btn_csv.clicked.connect(self._export_csv)
+        acciones.addWidget(btn_csv)
+        acciones.addStretch()
+        layout.addLayout(acciones)
+
+        # Botón Cerrar
+        buttons = QDialogButtonBox(QDialogButtonBox.Close, parent=self)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def _on_draw_area(self):
+        self._draw_area(self.store)
+
+    def _export_csv(self):
+        nombre = os.path.splitext(os.path.basename(self.store.path))[0] + ".csv"
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar CSV", nombre, "Archivos CSV (*.csv)")
+        if not path:
+            return
+        if not path.lower().endswith(".csv"):
+            path += ".csv"
+        try:
+            # los features se escriben a medida que se leen de la base
+            CSVExporter.export(self.store.features(), path)
+        except (RuntimeError, ValueError) as e:
+            QMessageBox.critical(self, "Exportar CSV", f"No se pudo exportar:\n{e}")
+            return
+        QMessageBox.information(self, "Exportar CSV", f"Exportado a:\n{path}")
+
+    def done(self, result):
+        super().done(result)
+        self.view.setModel(None)
+        self.store.close()